@@ -16,6 +16,7 @@ from io import StringIO
 from database import get_db
 from models import User, Conversation, Message, UserMemory, UserPreference, SystemLog
 from schemas import User as UserSchema
+from conversation_manager import forget_conversation_owner, forget_user_conversation_owners
 
 logger = logging.getLogger(__name__)
 
@@ -176,6 +177,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         # Delete all associated data (handled by cascade)
         db.delete(user)
         db.commit()
+        forget_user_conversation_owners(user_id)
         
         logger.info(f"Admin deleted user: {user.username}")
         return {"message": "User deleted successfully"}
@@ -412,6 +414,7 @@ def delete_conversation(conversation_id: int, db: Session = Depends(get_db)):
         # Delete all messages (handled by cascade)
         db.delete(conversation)
         db.commit()
+        forget_conversation_owner(conversation_id)
         
         logger.info(f"Admin deleted conversation {conversation_id}")
         return {"message": "Conversation deleted successfully"}
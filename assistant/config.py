@@ -8,11 +8,18 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./assistant.db"
+    async_database_url: Optional[str] = None  # Derived from database_url for SQLite and PostgreSQL when unset
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_timeout: int = 5  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Recycle connections after 30 minutes
 
     # LMStudio Integration
     lmstudio_base_url: str = "http://localhost:1234"
     lmstudio_model: str = "local-model"
     lmstudio_timeout: int = 600  # 10 minutes to accommodate slow local LMStudio responses
+    lmstudio_cache_prompt: bool = True  # Ask llama.cpp-based servers to reuse the KV cache of a shared prompt prefix
+    lmstudio_coalesce_requests: bool = False  # Send identical concurrent temperature 0 requests to LMStudio only once
 
     # API Settings
     api_host: str = "0.0.0.0"
@@ -41,6 +48,11 @@ class Settings(BaseSettings):
     default_temperature: float = 0.7
     default_max_tokens: int = 2048
     
+    # Response Cache Settings (debug chat)
+    response_cache_enabled: bool = False  # Reuse replies to repeated prompts instead of calling the LLM
+    response_cache_threshold: float = 0.95  # Minimum cosine similarity of user message embeddings
+    response_cache_max_entries: int = 256
+    
     # Memory Extraction Settings
     memory_extraction_temperature: float = 0.1  # Low temperature for consistent extraction
     memory_extraction_max_tokens: int = 500
@@ -2,9 +2,12 @@
 Conversation Management Service - Enhanced Version with Consolidated User Profiles
 """
 import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, and_, update
 from datetime import datetime, timedelta
 from collections import Counter
 from models import Conversation, Message, User, ConversationSummary
@@ -16,6 +19,48 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Conversation owners never change, so a confirmed owner is cached per process;
+# hard deletes forget their entries and the TTL bounds deletes made elsewhere
+CONVERSATION_OWNER_TTL_SECONDS = 300
+CONVERSATION_OWNER_CACHE_MAX_ENTRIES = 10000
+_conversation_owner_cache: "OrderedDict[int, Tuple[float, int]]" = OrderedDict()
+_conversation_owner_lock = threading.Lock()  # Sync delete routes invalidate from worker threads
+
+
+def get_cached_conversation_owner(conversation_id: int) -> Optional[int]:
+    """Return the cached owner of a conversation, if still fresh"""
+    with _conversation_owner_lock:
+        cached = _conversation_owner_cache.get(conversation_id)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[0] >= CONVERSATION_OWNER_TTL_SECONDS:
+            del _conversation_owner_cache[conversation_id]
+            return None
+        _conversation_owner_cache.move_to_end(conversation_id)
+        return cached[1]
+
+
+def cache_conversation_owner(conversation_id: int, user_id: int):
+    """Remember a confirmed conversation owner, evicting the least recently used entry"""
+    with _conversation_owner_lock:
+        _conversation_owner_cache[conversation_id] = (time.monotonic(), user_id)
+        _conversation_owner_cache.move_to_end(conversation_id)
+        if len(_conversation_owner_cache) > CONVERSATION_OWNER_CACHE_MAX_ENTRIES:
+            _conversation_owner_cache.popitem(last=False)
+
+
+def forget_conversation_owner(conversation_id: int):
+    """Drop a deleted conversation from the owner cache"""
+    with _conversation_owner_lock:
+        _conversation_owner_cache.pop(conversation_id, None)
+
+
+def forget_user_conversation_owners(user_id: int):
+    """Drop every cached conversation owned by a deleted user"""
+    with _conversation_owner_lock:
+        for conversation_id in [cid for cid, (_, owner) in _conversation_owner_cache.items() if owner == user_id]:
+            del _conversation_owner_cache[conversation_id]
+
 
 class ConversationManager:
     """Manages conversations and message history with enhanced context building"""
@@ -52,6 +97,31 @@ class ConversationManager:
             )
         ).first()
 
+    def get_conversation_with_user(
+        self,
+        conversation_id: Optional[int],
+        user_id: int
+    ) -> Tuple[Optional[User], Optional[Conversation]]:
+        """Get a user and one of their conversations in a single query
+
+        The user is None when it doesn't exist; the conversation is None when
+        conversation_id is not given or the user has no such active conversation.
+        """
+        if conversation_id is None:
+            return self.db.query(User).filter(User.id == user_id).first(), None
+
+        row = self.db.query(User, Conversation).outerjoin(
+            Conversation,
+            and_(
+                Conversation.user_id == User.id,
+                Conversation.id == conversation_id,
+                Conversation.is_active == True
+            )
+        ).filter(User.id == user_id).first()
+        if row is None:
+            return None, None
+        return row[0], row[1]
+
     def get_user_conversations(self, user_id: int, limit: int = 50) -> List[Conversation]:
         """Get all conversations for a user"""
         return self.db.query(Conversation).filter(
@@ -66,13 +136,15 @@ class ConversationManager:
         conversation_id: int,
         role: MessageRole,
         content: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        debug_enabled: bool = False
     ) -> Message:
         """Add a message to a conversation"""
         message = Message(
             conversation_id=conversation_id,
             role=role,
-            content=content
+            content=content,
+            debug_enabled=debug_enabled
         )
 
         # Add metadata if provided
@@ -84,12 +156,12 @@ class ConversationManager:
 
         self.db.add(message)
 
-        # Update conversation timestamp
-        conversation = self.db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).first()
-        if conversation:
-            conversation.updated_at = datetime.now()
+        # Update conversation timestamp in the same commit, without loading it first
+        self.db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(updated_at=datetime.now())
+        )
 
         self.db.commit()
         self.db.refresh(message)
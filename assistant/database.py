@@ -1,7 +1,11 @@
 """
 Database initialization and connection management
 """
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import contextmanager
@@ -12,14 +16,87 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Create database engine
+pool_options = {
+    "pool_pre_ping": True,
+    "pool_recycle": settings.db_pool_recycle,
+}
+if ":memory:" not in settings.database_url:
+    # In-memory SQLite uses a single-connection pool that takes no sizing options
+    pool_options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_use_lifo=True,
+    )
+
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    **pool_options
 )
 
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL with relaxed fsyncs so frequent small commits stay cheap"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the plain URLs DATABASE_URL is usually given as
+ASYNC_DRIVER_SCHEMES = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+}
+
+
+def _async_url(database_url: str) -> str:
+    """Point a sync database URL at the matching async driver"""
+    for scheme, async_scheme in ASYNC_DRIVER_SCHEMES.items():
+        if database_url.startswith(scheme):
+            return async_scheme + database_url[len(scheme):]
+    return database_url
+
+
+# Async session factory for routes that have moved off the sync session; built on
+# first use so the rest of the app runs without an async driver installed
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Create the async engine and session factory on first use"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        async_database_url = settings.async_database_url or _async_url(settings.database_url)
+        try:
+            async_engine = create_async_engine(
+                async_database_url,
+                # aiosqlite opens a connection per checkout and takes no pool sizing options
+                **({} if async_database_url.startswith("sqlite") else pool_options)
+            )
+        except (ImportError, InvalidRequestError) as e:
+            raise RuntimeError(
+                f"No usable async driver for {make_url(async_database_url).drivername} ({e}). "
+                "Install it (pip install asyncpg for PostgreSQL) or set ASYNC_DATABASE_URL "
+                "to a URL whose async driver is installed."
+            ) from e
+
+        if async_engine.dialect.name == "sqlite":
+            event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+        _async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_session_factory
+
 
 def init_database():
     """Initialize database tables"""
@@ -55,6 +132,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for FastAPI to get an async database session"""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
 def get_db_direct():
     """Get a database session directly (not as a context manager)"""
     return SessionLocal()
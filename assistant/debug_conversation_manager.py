@@ -6,6 +6,7 @@ import logging
 import time
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 
 from enhanced_conversation_manager import EnhancedConversationManager
@@ -13,7 +14,7 @@ from enhanced_message_schemas import (
     StepTracker, IntermediaryStepType, EnhancedMessage, LLMRequest, LLMResponse,
     ToolCall, ToolResult, ChatRequestWithDebug, ChatResponseWithDebug
 )
-from mcp_integration import get_mcp_tools_for_assistant, handle_mcp_tool_call
+from mcp_integration import get_cached_mcp_tools, handle_mcp_tool_call
 
 logger = logging.getLogger(__name__)
 
@@ -46,8 +47,7 @@ class DebugConversationManager(EnhancedConversationManager):
             
             # Verify user exists
             from models import User
-            user = self.db.query(User).filter(User.id == request.user_id).first()
-            if not user:
+            if not self.db.query(exists().where(User.id == request.user_id)).scalar():
                 step_tracker.complete_step(step_id, success=False, error_message="User not found")
                 raise ValueError("User not found")
             
@@ -111,7 +111,7 @@ class DebugConversationManager(EnhancedConversationManager):
                 "Loading MCP tools for assistant"
             )
             
-            available_tools = get_mcp_tools_for_assistant()
+            available_tools, llm_tools = get_cached_mcp_tools()
             
             step_tracker.complete_step(step_id, {
                 "tools_count": len(available_tools),
@@ -134,12 +134,7 @@ class DebugConversationManager(EnhancedConversationManager):
             
             # Add tools if available
             if available_tools:
-                llm_request_params["tools"] = [
-                    {
-                        "type": "function",
-                        "function": tool["function"]
-                    } for tool in available_tools
-                ]
+                llm_request_params["tools"] = llm_tools
                 llm_request_params["tool_choice"] = "auto"
             
             # Create LLM request object for debugging
@@ -170,11 +165,12 @@ class DebugConversationManager(EnhancedConversationManager):
             llm_call_start = time.time()
             llm_response = await lmstudio_client.chat_completion(**llm_request_params)
             llm_call_time = int((time.time() - llm_call_start) * 1000)
+            initial_message = llm_response["choices"][0]["message"]
             
             step_tracker.complete_step(step_id, {
                 "processing_time_ms": llm_call_time,
                 "response_tokens": llm_response.get("usage", {}).get("total_tokens", 0),
-                "has_tool_calls": "tool_calls" in llm_response.get("choices", [{}])[0].get("message", {})
+                "has_tool_calls": "tool_calls" in initial_message
             })
             
             # Step 7: Process tool calls if present
@@ -182,7 +178,6 @@ class DebugConversationManager(EnhancedConversationManager):
             tool_results = []
             final_response = llm_response
             
-            initial_message = llm_response["choices"][0]["message"]
             if initial_message.get("tool_calls"):
                 step_id = step_tracker.start_step(
                     IntermediaryStepType.TOOL_CALL,
@@ -268,7 +263,7 @@ class DebugConversationManager(EnhancedConversationManager):
                         "content": initial_message.get("content", "")
                     }
                     
-                    followup_context = context + [followup_message] + tool_call_results
+                    followup_context = [*context, followup_message, *tool_call_results]
                     
                     followup_start = time.time()
                     final_response = await lmstudio_client.chat_completion(
@@ -4,11 +4,13 @@ Enhanced Debug Data Processing Module
 Ensures debug data is properly flagged and attached to messages
 """
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Mapping, Optional, Any, Sequence
 from datetime import datetime
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from models import Message, DebugStep, LLMRequest, DebugSession
 from schemas import Message as MessageSchema
+from debug_persistence_manager import load_request_messages
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +24,70 @@ class DebugDataProcessor:
     def process_debug_data_for_message(self, message: Message) -> MessageSchema:
         """Process and attach debug data to a message"""
         try:
-            # Convert to Pydantic model
-            message_schema = MessageSchema.model_validate(message)
+            # Get debug steps for this message as plain mappings of the fields used
+            steps = self.db.execute(
+                select(
+                    DebugStep.step_id,
+                    DebugStep.step_type,
+                    DebugStep.timestamp,
+                    DebugStep.title,
+                    DebugStep.description,
+                    DebugStep.input_data,
+                    DebugStep.duration_ms,
+                    DebugStep.success,
+                    DebugStep.error_message
+                ).where(
+                    DebugStep.message_id == message.id
+                ).order_by(DebugStep.step_order)
+            ).mappings().all()
+            
+            # Get LLM requests for this message
+            llm_requests = self.db.query(LLMRequest).filter(
+                LLMRequest.message_id == message.id
+            ).order_by(LLMRequest.timestamp).all()
+            
+            llm_request = None
+            if llm_requests:
+                # Use the most recent LLM request
+                latest = llm_requests[-1]
+                llm_request = {
+                    "model": latest.model,
+                    "request_messages": load_request_messages(self.db, [latest])[latest.id],
+                    "temperature": latest.temperature,
+                    "max_tokens": latest.max_tokens,
+                    "tools_available": latest.tools_available,
+                    "stream": latest.stream,
+                    "timestamp": latest.timestamp,
+                    "request_id": latest.request_id,
+                    "processing_time_ms": latest.processing_time_ms,
+                    "response_data": latest.response_data,
+                    "token_usage": latest.token_usage,
+                    "tool_calls": latest.tool_calls,
+                    "tool_results": latest.tool_results
+                }
+            
+            return self.build_debug_message_schema(message, steps, llm_request, len(llm_requests))
+            
+        except Exception as e:
+            logger.error("Error processing debug data for message %s: %s", message.id, e)
+            return self._debug_error_schema(message, e)
+    
+    def build_debug_message_schema(
+        self,
+        message: Message,
+        steps: Sequence[Mapping[str, Any]],
+        llm_request: Optional[Dict[str, Any]] = None,
+        llm_requests_count: Optional[int] = None
+    ) -> MessageSchema:
+        """Attach debug data to a message from step and LLM request fields
+        
+        Takes the same fields the debug persistence manager stores, so a request
+        can build its response from the rows it is about to write instead of
+        reading them back.
+        """
+        try:
+            # Debug fields are collected here and applied once, without re-validating them
+            extras: Dict[str, Any] = {}
             
             # Initialize debug data flag
             has_debug_data = False
@@ -35,89 +99,78 @@ class DebugDataProcessor:
                 "tool_results": False
             }
             
-            # Get debug steps for this message
-            debug_steps = self.db.query(DebugStep).filter(
-                DebugStep.message_id == message.id
-            ).order_by(DebugStep.step_order).all()
-            
-            if debug_steps:
+            if steps:
                 # Convert debug steps to intermediary steps format
                 intermediary_steps = []
-                for step in debug_steps:
+                for step in steps:
                     step_data = {
-                        "step_id": step.step_id,
-                        "step_type": step.step_type,
-                        "timestamp": step.timestamp.isoformat(),
-                        "title": step.title,
-                        "description": step.description or "",
-                        "data": step.input_data or {},
-                        "duration_ms": step.duration_ms or 0,
-                        "success": step.success,
-                        "error_message": step.error_message
+                        "step_id": step["step_id"],
+                        "step_type": step["step_type"],
+                        "timestamp": step["timestamp"].isoformat(),
+                        "title": step["title"],
+                        "description": step.get("description") or "",
+                        "data": step.get("input_data") or {},
+                        "duration_ms": step.get("duration_ms") or 0,
+                        "success": step.get("success", True),
+                        "error_message": step.get("error_message")
                     }
                     intermediary_steps.append(step_data)
                 
                 # Attach to message
-                message_schema.intermediary_steps = intermediary_steps
+                extras["intermediary_steps"] = intermediary_steps
                 has_debug_data = True
                 debug_fields["intermediary_steps"] = True
                 
-                logger.info(f"Attached {len(intermediary_steps)} debug steps to message {message.id}")
-            
-            # Get LLM requests for this message
-            llm_requests = self.db.query(LLMRequest).filter(
-                LLMRequest.message_id == message.id
-            ).order_by(LLMRequest.timestamp).all()
+                logger.info("Attached %s debug steps to message %s", len(intermediary_steps), message.id)
             
-            if llm_requests:
-                # Get the most recent LLM request
-                llm_request = llm_requests[-1]
+            if llm_request:
+                tools_available = llm_request.get("tools_available")
                 
                 # Convert to LLM request format
                 llm_request_data = {
-                    "model": llm_request.model,
-                    "messages": llm_request.request_messages,
-                    "temperature": llm_request.temperature,
-                    "max_tokens": llm_request.max_tokens,
-                    "tools": llm_request.tools_available,
-                    "tool_choice": "auto" if llm_request.tools_available else None,
-                    "stream": llm_request.stream,
-                    "timestamp": llm_request.timestamp.isoformat(),
-                    "request_id": llm_request.request_id,
-                    "processing_time_ms": llm_request.processing_time_ms
+                    "model": llm_request["model"],
+                    "messages": llm_request["request_messages"],
+                    "temperature": llm_request.get("temperature"),
+                    "max_tokens": llm_request.get("max_tokens"),
+                    "tools": tools_available,
+                    "tool_choice": "auto" if tools_available else None,
+                    "stream": llm_request.get("stream", False),
+                    "timestamp": llm_request["timestamp"].isoformat(),
+                    "request_id": llm_request["request_id"],
+                    "processing_time_ms": llm_request.get("processing_time_ms")
                 }
                 
                 # Attach to message
-                message_schema.llm_request = llm_request_data
+                extras["llm_request"] = llm_request_data
                 has_debug_data = True
                 debug_fields["llm_request"] = True
                 
                 # Convert to LLM response format
                 llm_response_data = {
-                    "response": llm_request.response_data,
-                    "timestamp": llm_request.timestamp.isoformat(),
-                    "processing_time_ms": llm_request.processing_time_ms or 0,
-                    "token_usage": llm_request.token_usage,
-                    "request_id": llm_request.request_id
+                    "response": llm_request.get("response_data"),
+                    "timestamp": llm_request["timestamp"].isoformat(),
+                    "processing_time_ms": llm_request.get("processing_time_ms") or 0,
+                    "token_usage": llm_request.get("token_usage"),
+                    "request_id": llm_request["request_id"]
                 }
                 
                 # Attach to message
-                message_schema.llm_response = llm_response_data
+                extras["llm_response"] = llm_response_data
                 debug_fields["llm_response"] = True
                 
                 # Add tool calls and results if available
-                if llm_request.tool_calls:
-                    message_schema.tool_calls = llm_request.tool_calls
+                if llm_request.get("tool_calls"):
+                    extras["tool_calls"] = llm_request["tool_calls"]
                     debug_fields["tool_calls"] = True
                 
-                if llm_request.tool_results:
-                    message_schema.tool_results = llm_request.tool_results
+                if llm_request.get("tool_results"):
+                    extras["tool_results"] = llm_request["tool_results"]
                     debug_fields["tool_results"] = True
                 
-                logger.info(f"Attached LLM request/response data to message {message.id}")
+                logger.info("Attached LLM request/response data to message %s", message.id)
             
             # Set debug enabled flag
-            message_schema.debug_enabled = has_debug_data
+            extras["debug_enabled"] = has_debug_data
             
             # Create comprehensive debug data
             debug_data = {
@@ -125,24 +178,27 @@ class DebugDataProcessor:
                 "has_debug_data": has_debug_data,
                 "debug_fields": debug_fields,
                 "timestamp": datetime.now().isoformat(),
-                "debug_steps_count": len(debug_steps),
-                "llm_requests_count": len(llm_requests),
+                "debug_steps_count": len(steps),
+                "llm_requests_count": llm_requests_count if llm_requests_count is not None else int(bool(llm_request)),
                 "processing_complete": True
             }
             
             # Attach debug data to message
-            message_schema.debug_data = debug_data
+            extras["debug_data"] = debug_data
             
-            logger.info(f"Debug data processing complete for message {message.id}: has_debug_data={has_debug_data}")
+            logger.info("Debug data processing complete for message %s: has_debug_data=%s", message.id, has_debug_data)
             
-            return message_schema
+            return MessageSchema.model_validate(message).model_copy(update=extras)
             
         except Exception as e:
-            logger.error(f"Error processing debug data for message {message.id}: {e}")
-            # Return message with error debug data
-            message_schema = MessageSchema.model_validate(message)
-            message_schema.debug_enabled = True
-            message_schema.debug_data = {
+            logger.error("Error processing debug data for message %s: %s", message.id, e)
+            return self._debug_error_schema(message, e)
+    
+    def _debug_error_schema(self, message: Message, error: Exception) -> MessageSchema:
+        """Return message with error debug data"""
+        return MessageSchema.model_validate(message).model_copy(update={
+            "debug_enabled": True,
+            "debug_data": {
                 "debug_enabled": True,
                 "has_debug_data": False,
                 "debug_fields": {
@@ -152,10 +208,10 @@ class DebugDataProcessor:
                     "tool_calls": False,
                     "tool_results": False
                 },
-                "error": f"Debug data processing failed: {str(e)}",
+                "error": f"Debug data processing failed: {str(error)}",
                 "timestamp": datetime.now().isoformat()
             }
-            return message_schema
+        })
     
     def ensure_debug_data_completeness(self, message_id: int) -> bool:
         """Ensure debug data is complete for a message"""
@@ -163,12 +219,12 @@ class DebugDataProcessor:
             # Get the message
             message = self.db.query(Message).filter(Message.id == message_id).first()
             if not message:
-                logger.warning(f"Message {message_id} not found for debug data check")
+                logger.warning("Message %s not found for debug data check", message_id)
                 return False
             
             # Check if debug was enabled for this message
             if not message.debug_enabled:
-                logger.info(f"Debug not enabled for message {message_id}")
+                logger.info("Debug not enabled for message %s", message_id)
                 return False
             
             # Check for debug steps
@@ -205,15 +261,63 @@ class DebugDataProcessor:
                 message.debug_data = debug_data
                 self.db.commit()
                 
-                logger.info(f"Updated debug data completeness for message {message_id}")
+                logger.info("Updated debug data completeness for message %s", message_id)
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error checking debug data completeness for message {message_id}: {e}")
+            logger.error("Error checking debug data completeness for message %s: %s", message_id, e)
             return False
     
+    def ensure_debug_data_completeness_for_messages(self, messages: List[Message]) -> int:
+        """Ensure debug data is complete for a batch of debug-enabled messages
+        
+        Step and LLM request counts are fetched with one grouped query each
+        and all updates are committed together.
+        """
+        message_ids = [message.id for message in messages]
+        if not message_ids:
+            return 0
+        
+        step_counts = dict(self.db.query(DebugStep.message_id, func.count(DebugStep.id)).filter(
+            DebugStep.message_id.in_(message_ids)
+        ).group_by(DebugStep.message_id).all())
+        
+        llm_request_counts = dict(self.db.query(LLMRequest.message_id, func.count(LLMRequest.id)).filter(
+            LLMRequest.message_id.in_(message_ids)
+        ).group_by(LLMRequest.message_id).all())
+        
+        updated_count = 0
+        timestamp = datetime.now().isoformat()
+        
+        for message in messages:
+            debug_steps = step_counts.get(message.id, 0)
+            llm_requests = llm_request_counts.get(message.id, 0)
+            
+            if debug_steps > 0 or llm_requests > 0:
+                message.debug_data = {
+                    "debug_enabled": True,
+                    "has_debug_data": True,
+                    "debug_fields": {
+                        "intermediary_steps": debug_steps > 0,
+                        "llm_request": llm_requests > 0,
+                        "llm_response": llm_requests > 0,
+                        "tool_calls": False,  # Will be set during processing
+                        "tool_results": False  # Will be set during processing
+                    },
+                    "timestamp": timestamp,
+                    "debug_steps_count": debug_steps,
+                    "llm_requests_count": llm_requests,
+                    "completeness_check": True
+                }
+                updated_count += 1
+        
+        if updated_count:
+            self.db.commit()
+        
+        return updated_count
+    
     def batch_process_debug_data(self, conversation_id: int) -> int:
         """Batch process debug data for all messages in a conversation"""
         try:
@@ -223,17 +327,13 @@ class DebugDataProcessor:
                 Message.debug_enabled == True
             ).all()
             
-            processed_count = 0
+            processed_count = self.ensure_debug_data_completeness_for_messages(messages)
             
-            for message in messages:
-                if self.ensure_debug_data_completeness(message.id):
-                    processed_count += 1
-            
-            logger.info(f"Batch processed debug data for {processed_count} messages in conversation {conversation_id}")
+            logger.info("Batch processed debug data for %s messages in conversation %s", processed_count, conversation_id)
             return processed_count
             
         except Exception as e:
-            logger.error(f"Error batch processing debug data for conversation {conversation_id}: {e}")
+            logger.error("Error batch processing debug data for conversation %s: %s", conversation_id, e)
             return 0
 
 
@@ -249,11 +349,7 @@ def migrate_existing_debug_data(db: Session):
         Message.debug_data.is_(None)
     ).all()
     
-    fixed_count = 0
-    
-    for message in messages_needing_fix:
-        if debug_processor.ensure_debug_data_completeness(message.id):
-            fixed_count += 1
+    fixed_count = debug_processor.ensure_debug_data_completeness_for_messages(messages_needing_fix)
     
-    logger.info(f"Migration complete: Fixed debug data for {fixed_count} messages")
+    logger.info("Migration complete: Fixed debug data for %s messages", fixed_count)
     return fixed_count
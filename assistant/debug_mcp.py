@@ -3,11 +3,14 @@
 MCP Integration Debug Script
 """
 import asyncio
-import json
+import io
+import logging
 import sys
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import httpx
+import orjson
 from pathlib import Path
 
 # Add the current directory to Python path
@@ -16,92 +19,151 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from mcp_client_manager import MCPClientManager, MCPServerConfig, MCPServerType
 from mcp_integration import get_mcp_tools_for_assistant, handle_mcp_tool_call
 
+logger = logging.getLogger(__name__)
+
+# Status probes bundled by /mcp/debug/bundle, keyed by their results entry
+PROBE_ENDPOINTS = {
+    "system_status": "/status",
+    "mcp_status": "/mcp/status",
+    "servers": "/mcp/servers",
+    "tools": "/mcp/tools"
+}
+
+# Directly initialized MCP manager, reused across debug runs in the same process
+_manager: Optional[MCPClientManager] = None
+_manager_lock = asyncio.Lock()
+
+# Tool/resource listing from _manager: (cached_at, tools, resources)
+INVENTORY_TTL_SECONDS = 30
+_inventory_cache: Optional[Tuple[float, List[Any], List[Any]]] = None
+
+async def get_direct_manager(fresh: bool = False) -> MCPClientManager:
+    """Get the shared MCP manager, initializing it on first use or when fresh is set"""
+    global _manager, _inventory_cache
+    async with _manager_lock:
+        if fresh and _manager is not None:
+            await _manager.disconnect_all_servers()
+            _manager = None
+        if _manager is None:
+            manager = MCPClientManager()
+            await manager.initialize()
+            _manager = manager
+            _inventory_cache = None
+        return _manager
+
+def get_manager_inventory(manager: MCPClientManager) -> Tuple[List[Any], List[Any]]:
+    """Get the manager's tools and resources, cached for INVENTORY_TTL_SECONDS"""
+    global _inventory_cache
+    if _inventory_cache is None or time.time() - _inventory_cache[0] >= INVENTORY_TTL_SECONDS:
+        _inventory_cache = (time.time(), manager.get_all_tools(), manager.get_all_resources())
+    return _inventory_cache[1], _inventory_cache[2]
+
 class MCPDebugger:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", fresh_manager: bool = False):
         self.base_url = base_url
-        self.client = httpx.AsyncClient()
+        self.fresh_manager = fresh_manager
+        self.client: Optional[httpx.AsyncClient] = None
+    
+    async def __aenter__(self) -> "MCPDebugger":
+        # One keep-alive HTTP/2 pool shared by every probe; concurrent
+        # probes multiplex over a single connection
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=1,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+            ),
+            timeout=10.0
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.client.aclose()
+        self.client = None
         
-    async def check_system_status(self) -> Dict[str, Any]:
-        """Check system status"""
+    async def _request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Issue a request and return the decoded body, or an error dict"""
         try:
-            response = await self.client.get(f"{self.base_url}/status")
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
+            response = await self.client.request(method, path, json=json)
+            if not response.is_success:
+                return {"error": f"HTTP {response.status_code}", "body": response.text}
+            return orjson.loads(response.content)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.debug(f"{method} {path} failed", exc_info=True)
             return {"error": str(e)}
     
+    async def _get(self, path: str) -> Dict[str, Any]:
+        return await self._request("GET", path)
+    
+    async def _post(self, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._request("POST", path, json=json)
+    
+    async def check_system_status(self) -> Dict[str, Any]:
+        """Check system status"""
+        return await self._get(PROBE_ENDPOINTS["system_status"])
+    
     async def check_mcp_status(self) -> Dict[str, Any]:
         """Check MCP status"""
-        try:
-            response = await self.client.get(f"{self.base_url}/mcp/status")
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        return await self._get(PROBE_ENDPOINTS["mcp_status"])
     
     async def list_mcp_servers(self) -> Dict[str, Any]:
         """List MCP servers"""
-        try:
-            response = await self.client.get(f"{self.base_url}/mcp/servers")
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        return await self._get(PROBE_ENDPOINTS["servers"])
     
     async def list_mcp_tools(self) -> Dict[str, Any]:
         """List MCP tools"""
+        return await self._get(PROBE_ENDPOINTS["tools"])
+    
+    async def fetch_probes(self) -> Dict[str, Any]:
+        """Fetch every status probe concurrently"""
+        responses = await asyncio.gather(*(self._get(path) for path in PROBE_ENDPOINTS.values()))
+        return dict(zip(PROBE_ENDPOINTS, responses))
+    
+    async def fetch_bundle(self) -> Optional[Dict[str, Any]]:
+        """Fetch system status, MCP status, servers and tools in one request
+
+        Returns None when the server predates the bundle endpoint.
+        """
         try:
-            response = await self.client.get(f"{self.base_url}/mcp/tools")
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+            response = await self.client.get("/mcp/debug/bundle")
+            if response.status_code == 404:
+                return None
+            if not response.is_success:
+                error = {"error": f"HTTP {response.status_code}", "body": response.text}
+                return {key: error for key in PROBE_ENDPOINTS}
+            return orjson.loads(response.content)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.debug("Debug bundle request failed", exc_info=True)
+            return {key: {"error": str(e)} for key in PROBE_ENDPOINTS}
     
     async def test_mcp_tool(self, tool_name: str, arguments: Dict[str, Any], server_id: Optional[str] = None) -> Dict[str, Any]:
         """Test MCP tool"""
-        try:
-            payload = {
-                "tool_name": tool_name,
-                "arguments": arguments
-            }
-            if server_id:
-                payload["server_id"] = server_id
-                
-            response = await self.client.post(f"{self.base_url}/mcp/tools/call", json=payload)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        payload = {
+            "tool_name": tool_name,
+            "arguments": arguments
+        }
+        if server_id:
+            payload["server_id"] = server_id
+        
+        return await self._post("/mcp/tools/call", json=payload)
     
     async def add_test_server(self, server_config: Dict[str, Any]) -> Dict[str, Any]:
         """Add a test server"""
-        try:
-            response = await self.client.post(f"{self.base_url}/mcp/servers", json=server_config)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        return await self._post("/mcp/servers", json=server_config)
     
     async def connect_server(self, server_id: str) -> Dict[str, Any]:
         """Connect to a server"""
-        try:
-            response = await self.client.post(f"{self.base_url}/mcp/servers/{server_id}/connect")
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return {"error": str(e)}
+        return await self._post(f"/mcp/servers/{server_id}/connect")
     
     async def test_direct_mcp_manager(self) -> Dict[str, Any]:
         """Test MCP manager directly"""
         try:
-            # Initialize MCP manager
-            manager = MCPClientManager()
-            await manager.initialize()
+            manager = await get_direct_manager(fresh=self.fresh_manager)
             
             # Get status
             status = manager.get_server_status()
-            tools = manager.get_all_tools()
-            resources = manager.get_all_resources()
+            tools, resources = get_manager_inventory(manager)
             
             return {
                 "status": status,
@@ -119,21 +181,15 @@ class MCPDebugger:
         
         print("🔍 Starting MCP Debug Sequence...")
         
-        # 1. Check system status
-        print("1. Checking system status...")
-        results["system_status"] = await self.check_system_status()
-        
-        # 2. Check MCP status
-        print("2. Checking MCP status...")
-        results["mcp_status"] = await self.check_mcp_status()
-        
-        # 3. List servers
-        print("3. Listing MCP servers...")
-        results["servers"] = await self.list_mcp_servers()
-        
-        # 4. List tools
-        print("4. Listing MCP tools...")
-        results["tools"] = await self.list_mcp_tools()
+        # 1-4. Fetch system status, MCP status, servers and tools in one round-trip
+        print("1-4. Fetching debug bundle...")
+        bundle = await self.fetch_bundle()
+        if bundle is not None:
+            results.update(bundle)
+        else:
+            # Older servers without the bundle endpoint
+            print("1-4. Checking system status, MCP status, servers and tools...")
+            results.update(await self.fetch_probes())
         
         # 5. Test direct manager
         print("5. Testing direct MCP manager...")
@@ -157,82 +213,85 @@ class MCPDebugger:
     
     def print_results(self, results: Dict[str, Any]):
         """Print debug results in a formatted way"""
-        print("\\n" + "="*60)
-        print("🔍 MCP DEBUG RESULTS")
-        print("="*60)
+        # Build the report in memory and write it to stdout in one call
+        buf = io.StringIO()
+        
+        print("\\n" + "="*60, file=buf)
+        print("🔍 MCP DEBUG RESULTS", file=buf)
+        print("="*60, file=buf)
         
         # System Status
-        print("\\n📊 SYSTEM STATUS:")
+        print("\\n📊 SYSTEM STATUS:", file=buf)
         if "error" in results.get("system_status", {}):
-            print(f"  ❌ Error: {results['system_status']['error']}")
+            print(f"  ❌ Error: {results['system_status']['error']}", file=buf)
         else:
             sys_status = results.get("system_status", {})
-            print(f"  • Status: {sys_status.get('status', 'unknown')}")
-            print(f"  • LMStudio Connected: {sys_status.get('lmstudio_connected', False)}")
-            print(f"  • MCP Servers: {sys_status.get('mcp_servers_connected', 0)}/{sys_status.get('mcp_servers_total', 0)}")
-            print(f"  • MCP Tools: {sys_status.get('mcp_tools_available', 0)}")
+            print(f"  • Status: {sys_status.get('status', 'unknown')}", file=buf)
+            print(f"  • LMStudio Connected: {sys_status.get('lmstudio_connected', False)}", file=buf)
+            print(f"  • MCP Servers: {sys_status.get('mcp_servers_connected', 0)}/{sys_status.get('mcp_servers_total', 0)}", file=buf)
+            print(f"  • MCP Tools: {sys_status.get('mcp_tools_available', 0)}", file=buf)
         
         # MCP Status
-        print("\\n🔌 MCP STATUS:")
+        print("\\n🔌 MCP STATUS:", file=buf)
         if "error" in results.get("mcp_status", {}):
-            print(f"  ❌ Error: {results['mcp_status']['error']}")
+            print(f"  ❌ Error: {results['mcp_status']['error']}", file=buf)
         else:
             mcp_status = results.get("mcp_status", {})
             if mcp_status.get("success"):
                 data = mcp_status.get("data", {})
-                print(f"  • Total Servers: {data.get('total_servers', 0)}")
-                print(f"  • Connected Servers: {data.get('connected_servers', 0)}")
+                print(f"  • Total Servers: {data.get('total_servers', 0)}", file=buf)
+                print(f"  • Connected Servers: {data.get('connected_servers', 0)}", file=buf)
                 servers = data.get("servers", {})
                 for server_id, server_info in servers.items():
-                    print(f"    - {server_id}: {server_info.get('status', 'unknown')} ({server_info.get('tools_count', 0)} tools)")
+                    print(f"    - {server_id}: {server_info.get('status', 'unknown')} ({server_info.get('tools_count', 0)} tools)", file=buf)
         
         # Servers
-        print("\\n🖥️  MCP SERVERS:")
+        print("\\n🖥️  MCP SERVERS:", file=buf)
         if "error" in results.get("servers", {}):
-            print(f"  ❌ Error: {results['servers']['error']}")
+            print(f"  ❌ Error: {results['servers']['error']}", file=buf)
         else:
             servers = results.get("servers", {})
             if servers.get("success"):
                 server_list = servers.get("data", {}).get("servers", [])
                 if server_list:
                     for server in server_list:
-                        print(f"  • {server['name']} ({server['server_id']})")
-                        print(f"    Status: {server['status']}")
-                        print(f"    Tools: {server['capabilities']['tools']}")
+                        print(f"  • {server['name']} ({server['server_id']})", file=buf)
+                        print(f"    Status: {server['status']}", file=buf)
+                        print(f"    Tools: {server['capabilities']['tools']}", file=buf)
                         if server.get('error'):
-                            print(f"    Error: {server['error']}")
+                            print(f"    Error: {server['error']}", file=buf)
                 else:
-                    print("  📝 No servers configured")
+                    print("  📝 No servers configured", file=buf)
         
         # Tools
-        print("\\n⚡ MCP TOOLS:")
+        print("\\n⚡ MCP TOOLS:", file=buf)
         if "error" in results.get("tools", {}):
-            print(f"  ❌ Error: {results['tools']['error']}")
+            print(f"  ❌ Error: {results['tools']['error']}", file=buf)
         else:
             tools = results.get("tools", {})
             if tools.get("success"):
                 tool_list = tools.get("data", {}).get("tools", [])
                 if tool_list:
                     for tool in tool_list:
-                        print(f"  • {tool['name']} (from {tool['server_id']})")
-                        print(f"    Description: {tool['description']}")
+                        print(f"  • {tool['name']} (from {tool['server_id']})", file=buf)
+                        print(f"    Description: {tool['description']}", file=buf)
                 else:
-                    print("  📝 No tools available")
+                    print("  📝 No tools available", file=buf)
         
         # Direct Manager Test
-        print("\\n🔧 DIRECT MANAGER TEST:")
+        print("\\n🔧 DIRECT MANAGER TEST:", file=buf)
         if "error" in results.get("direct_manager", {}):
-            print(f"  ❌ Error: {results['direct_manager']['error']}")
+            print(f"  ❌ Error: {results['direct_manager']['error']}", file=buf)
         else:
             direct = results.get("direct_manager", {})
-            print(f"  • Tools Count: {direct.get('tools_count', 0)}")
-            print(f"  • Resources Count: {direct.get('resources_count', 0)}")
-            print(f"  • Server Status: {direct.get('status', {})}")
+            print(f"  • Tools Count: {direct.get('tools_count', 0)}", file=buf)
+            print(f"  • Resources Count: {direct.get('resources_count', 0)}", file=buf)
+            print(f"  • Server Status: {direct.get('status', {})}", file=buf)
         
-        print("\\n" + "="*60)
+        print("\\n" + "="*60, file=buf)
         
         # Recommendations
-        print("\\n💡 RECOMMENDATIONS:")
+        print("\\n💡 RECOMMENDATIONS:", file=buf)
         
         # Check if MCP is working
         mcp_working = (
@@ -241,44 +300,47 @@ class MCPDebugger:
         )
         
         if not mcp_working:
-            print("  ❌ MCP integration is not working properly")
-            print("  📋 To fix:")
-            print("     1. Ensure the assistant is running: python main.py")
-            print("     2. Check that MCP files are in place")
-            print("     3. Verify requirements are installed: pip install -r requirements.txt")
+            print("  ❌ MCP integration is not working properly", file=buf)
+            print("  📋 To fix:", file=buf)
+            print("     1. Ensure the assistant is running: python main.py", file=buf)
+            print("     2. Check that MCP files are in place", file=buf)
+            print("     3. Verify requirements are installed: pip install -r requirements.txt", file=buf)
         else:
             servers_connected = results.get("mcp_status", {}).get("data", {}).get("connected_servers", 0)
             if servers_connected == 0:
-                print("  ⚠️  MCP is working but no servers are connected")
-                print("  📋 To add servers:")
-                print("     1. Edit mcp_servers.json to configure servers")
-                print("     2. Enable at least one server by setting 'enabled': true")
-                print("     3. Ensure Node.js is installed for stdio servers")
-                print("     4. Test with: npx -y @modelcontextprotocol/server-filesystem /tmp")
+                print("  ⚠️  MCP is working but no servers are connected", file=buf)
+                print("  📋 To add servers:", file=buf)
+                print("     1. Edit mcp_servers.json to configure servers", file=buf)
+                print("     2. Enable at least one server by setting 'enabled': true", file=buf)
+                print("     3. Ensure Node.js is installed for stdio servers", file=buf)
+                print("     4. Test with: npx -y @modelcontextprotocol/server-filesystem /tmp", file=buf)
             else:
-                print("  ✅ MCP integration is working correctly!")
+                print("  ✅ MCP integration is working correctly!", file=buf)
                 tools_count = results.get("tools", {}).get("data", {}).get("total_count", 0)
-                print(f"     • {servers_connected} servers connected")
-                print(f"     • {tools_count} tools available")
-                print("     • Ready for use in conversations")
+                print(f"     • {servers_connected} servers connected", file=buf)
+                print(f"     • {tools_count} tools available", file=buf)
+                print("     • Ready for use in conversations", file=buf)
+        
+        print("\\n🔗 NEXT STEPS:", file=buf)
+        print("  1. Check the frontend debug panel for real-time status", file=buf)
+        print("  2. Try chatting with the assistant to test tool usage", file=buf)
+        print("  3. Monitor assistant.log for detailed error messages", file=buf)
+        print("\\n", file=buf)
         
-        print("\\n🔗 NEXT STEPS:")
-        print("  1. Check the frontend debug panel for real-time status")
-        print("  2. Try chatting with the assistant to test tool usage")
-        print("  3. Monitor assistant.log for detailed error messages")
-        print("\\n")
+        sys.stdout.write(buf.getvalue())
+
 
 async def main():
     """Main debug function"""
-    debugger = MCPDebugger()
-    
     try:
-        results = await debugger.run_full_debug()
-        debugger.print_results(results)
+        async with MCPDebugger(fresh_manager="--fresh" in sys.argv[1:]) as debugger:
+            results = await debugger.run_full_debug()
+            debugger.print_results(results)
         
         # Save results to file
-        with open("mcp_debug_results.json", "w") as f:
-            json.dump(results, f, indent=2, default=str)
+        Path("mcp_debug_results.json").write_bytes(
+            orjson.dumps(results, option=orjson.OPT_INDENT_2, default=str)
+        )
         print("📄 Debug results saved to mcp_debug_results.json")
         
     except KeyboardInterrupt:
@@ -287,8 +349,6 @@ async def main():
         print(f"\\n❌ Debug failed: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        await debugger.client.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
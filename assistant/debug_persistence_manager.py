@@ -1,21 +1,98 @@
 """
 Debug Persistence Manager for storing and retrieving debug data
 """
+import os
 import uuid
+import hashlib
 import json
+import time
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import threading
+import orjson
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc, func, select, case, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from models import (
-    DebugSession, DebugStep, LLMRequest, Message, Conversation, 
+    DebugSession, DebugStep, LLMRequest, LLMMessageBlob, Message, Conversation, 
     User, UserPreference
 )
 
 logger = logging.getLogger(__name__)
 
+# Step types counted towards DebugSession.total_tools_used
+TOOL_STEP_TYPES = ('tool_call', 'tool_result')
+
+# Unreferenced message blobs deleted per statement during cleanup
+BLOB_SWEEP_BATCH_SIZE = 500
+
+
+def uuid7() -> str:
+    """Generate a time-ordered UUID (version 7) as a string
+
+    The leading 48 bits are the Unix time in milliseconds, so new ids sort
+    after older ones and inserts append to the end of the id indexes
+    instead of scattering across them like uuid4.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
+def message_hash(message: Dict[str, Any]) -> str:
+    """Content hash of a request message, stable across dict key order"""
+    payload = orjson.dumps(message, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=32).hexdigest()
+
+
+def load_request_messages(db: Session, llm_requests: List[LLMRequest]) -> Dict[int, List[Dict[str, Any]]]:
+    """Resolve the request messages of several LLM requests with one blob query
+
+    Returns a mapping of LLMRequest.id to its message list. Older rows
+    that stored their messages inline are returned as they are.
+    """
+    hashes = {
+        hash_value
+        for llm_request in llm_requests
+        for hash_value in (llm_request.request_message_hashes or [])
+    }
+    payloads = dict(
+        db.query(LLMMessageBlob.hash, LLMMessageBlob.payload).filter(
+            LLMMessageBlob.hash.in_(hashes)
+        ).all()
+    ) if hashes else {}
+
+    return {
+        llm_request.id: (
+            [payloads.get(hash_value) for hash_value in llm_request.request_message_hashes]
+            if llm_request.request_message_hashes is not None
+            else llm_request.request_messages
+        )
+        for llm_request in llm_requests
+    }
+
+
+# Per-process cache of debug mode preferences: user_id -> (cached_at, enabled),
+# least recently used first
+DEBUG_PREFERENCE_TTL_SECONDS = 60
+DEBUG_PREFERENCE_CACHE_MAX_ENTRIES = 1024
+_debug_preference_cache: "OrderedDict[int, Tuple[float, bool]]" = OrderedDict()
+_debug_preference_lock = threading.Lock()  # Sync routes read and write the cache from worker threads
+
+
+def _cache_debug_preference(user_id: int, enabled: bool):
+    """Remember a user's debug preference, evicting the least recently used entry when full"""
+    with _debug_preference_lock:
+        _debug_preference_cache[user_id] = (time.monotonic(), enabled)
+        _debug_preference_cache.move_to_end(user_id)
+        if len(_debug_preference_cache) > DEBUG_PREFERENCE_CACHE_MAX_ENTRIES:
+            _debug_preference_cache.popitem(last=False)
+
 
 class DebugPersistenceManager:
     """Manages persistent storage and retrieval of debug data"""
@@ -25,7 +102,7 @@ class DebugPersistenceManager:
 
     def create_debug_session(self, conversation_id: int, user_id: int) -> DebugSession:
         """Create a new debug session"""
-        session_id = str(uuid.uuid4())
+        session_id = uuid7()
 
         debug_session = DebugSession(
             conversation_id=conversation_id,
@@ -37,7 +114,6 @@ class DebugPersistenceManager:
 
         self.db.add(debug_session)
         self.db.commit()
-        self.db.refresh(debug_session)
 
         logger.info(f"Created debug session {session_id} for conversation {conversation_id}")
         return debug_session
@@ -90,33 +166,71 @@ class DebugPersistenceManager:
         step_metadata: Optional[Dict[str, Any]] = None
     ) -> DebugStep:
         """Store a debug step"""
-        step_id = str(uuid.uuid4())
+        return self.store_debug_steps([{
+            "message_id": message_id,
+            "debug_session_id": debug_session_id,
+            "step_type": step_type,
+            "step_order": step_order,
+            "title": title,
+            "description": description,
+            "duration_ms": duration_ms,
+            "success": success,
+            "error_message": error_message,
+            "input_data": input_data,
+            "output_data": output_data,
+            "step_metadata": step_metadata
+        }])[0]
+
+    def store_debug_steps(self, steps: List[Dict[str, Any]]) -> List[DebugStep]:
+        """Store a batch of debug steps in a single transaction
+
+        Each entry takes the same fields as store_debug_step, plus an
+        optional step_id and timestamp when the caller generated them up
+        front. Session statistics are bumped by the batch delta instead of
+        re-scanning the debug_steps table.
+        """
+        # One timestamp for the whole batch
+        now = datetime.now()
+        debug_steps = [
+            DebugStep(**{"step_id": uuid7(), "timestamp": now, **step})
+            for step in steps
+        ]
+
+        if not debug_steps:
+            return debug_steps
+
+        self.db.add_all(debug_steps)
+        self.db.flush()
+
+        steps_by_session: Dict[int, List[DebugStep]] = {}
+        for debug_step in debug_steps:
+            steps_by_session.setdefault(debug_step.debug_session_id, []).append(debug_step)
+
+        for debug_session_id, session_steps in steps_by_session.items():
+            self._increment_debug_session_stats(debug_session_id, session_steps)
 
-        debug_step = DebugStep(
-            message_id=message_id,
-            debug_session_id=debug_session_id,
-            step_id=step_id,
-            step_type=step_type,
-            step_order=step_order,
-            title=title,
-            description=description,
-            timestamp=datetime.now(),
-            duration_ms=duration_ms,
-            success=success,
-            error_message=error_message,
-            input_data=input_data,
-            output_data=output_data,
-            step_metadata=step_metadata
-        )
-
-        self.db.add(debug_step)
         self.db.commit()
-        self.db.refresh(debug_step)
 
-        # Update debug session stats
-        self.update_debug_session_stats(debug_session_id)
+        return debug_steps
+
+    def _increment_debug_session_stats(self, debug_session_id: int, steps: List[DebugStep]):
+        """Add a batch of newly stored steps to the session counters"""
+        tool_count = sum(1 for step in steps if step.step_type in TOOL_STEP_TYPES)
+        duration_ms = sum(step.duration_ms or 0 for step in steps)
+
+        message_count = select(func.count(Message.id)).where(
+            Message.conversation_id == DebugSession.conversation_id,
+            Message.debug_enabled == True
+        ).scalar_subquery()
 
-        return debug_step
+        self.db.query(DebugSession).filter(
+            DebugSession.id == debug_session_id
+        ).update({
+            DebugSession.total_messages: message_count,
+            DebugSession.total_steps: DebugSession.total_steps + len(steps),
+            DebugSession.total_tools_used: DebugSession.total_tools_used + tool_count,
+            DebugSession.total_processing_time: DebugSession.total_processing_time + duration_ms / 1000.0
+        }, synchronize_session=False)
 
     def store_llm_request(
         self,
@@ -132,21 +246,29 @@ class DebugPersistenceManager:
         tools_available: Optional[List[Dict[str, Any]]] = None,
         tools_used: Optional[List[str]] = None,
         tool_calls: Optional[List[Dict[str, Any]]] = None,
-        tool_results: Optional[List[Dict[str, Any]]] = None
+        tool_results: Optional[List[Dict[str, Any]]] = None,
+        request_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+        commit: bool = True
     ) -> LLMRequest:
-        """Store an LLM request/response"""
-        request_id = str(uuid.uuid4())
-
+        """Store an LLM request/response
+
+        Request messages are stored once per distinct message in
+        llm_message_blobs and referenced by hash, so each turn of a
+        conversation doesn't store the whole history again. Pass
+        commit=False to leave the row for a later commit, such as the
+        one in store_debug_steps.
+        """
         llm_request = LLMRequest(
             message_id=message_id,
-            request_id=request_id,
+            request_id=request_id or uuid7(),
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
             stream=stream,
-            request_messages=request_messages,
+            request_message_hashes=self._store_message_blobs(request_messages),
             response_data=response_data,
-            timestamp=datetime.now(),
+            timestamp=timestamp or datetime.now(),
             processing_time_ms=processing_time_ms,
             token_usage=token_usage,
             tools_available=tools_available,
@@ -156,11 +278,89 @@ class DebugPersistenceManager:
         )
 
         self.db.add(llm_request)
-        self.db.commit()
-        self.db.refresh(llm_request)
+        if commit:
+            self.db.commit()
 
         return llm_request
 
+    def _store_message_blobs(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """Store any request messages not seen before and return their hashes in order"""
+        hashes = [message_hash(message) for message in messages]
+        unique = dict(zip(hashes, messages))
+        if not unique:
+            return hashes
+
+        # Touching the blobs doubles as the existence check: a blob that
+        # cleanup deletes first is no longer touched and gets stored again,
+        # and one touched first is newer than the cleanup cutoff
+        now = datetime.now()
+        dialect = self.db.get_bind().dialect
+        touch = update(LLMMessageBlob).where(
+            LLMMessageBlob.hash.in_(unique)
+        ).values(last_used_at=now).execution_options(synchronize_session=False)
+        if dialect.update_returning:
+            existing = set(self.db.scalars(touch.returning(LLMMessageBlob.hash)))
+        else:
+            self.db.execute(touch)
+            existing = set(
+                self.db.scalars(select(LLMMessageBlob.hash).where(LLMMessageBlob.hash.in_(unique)))
+            )
+        new_blobs = [
+            {"hash": hash_value, "payload": message, "last_used_at": now}
+            for hash_value, message in unique.items()
+            if hash_value not in existing
+        ]
+        if new_blobs:
+            # Another request may store the same message concurrently
+            if dialect.name == "postgresql":
+                stmt = postgresql_insert(LLMMessageBlob).on_conflict_do_nothing()
+            elif dialect.name == "sqlite":
+                stmt = sqlite_insert(LLMMessageBlob).on_conflict_do_nothing()
+            else:
+                stmt = LLMMessageBlob.__table__.insert()
+            self.db.execute(stmt, new_blobs)
+
+        return hashes
+
+    def bulk_ingest_steps(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert many debug steps via bulk_insert_mappings
+
+        Intended for replaying or importing debug data. This bypasses the
+        ORM unit of work, so event listeners do not fire, step_id and
+        timestamp are filled in here, and session statistics are left to
+        update_debug_session_stats.
+        """
+        now = datetime.now()
+        mappings = [
+            {"step_id": uuid7(), "timestamp": now, **row}
+            for row in rows
+        ]
+
+        self.db.bulk_insert_mappings(DebugStep, mappings)
+        self.db.commit()
+
+        return len(mappings)
+
+    def bulk_ingest_llm_requests(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert many LLM requests via bulk_insert_mappings
+
+        Same caveats as bulk_ingest_steps: request_id and timestamp are
+        filled in here and no ORM events fire. Inline request_messages are
+        moved into the message blob store like in store_llm_request.
+        """
+        now = datetime.now()
+        mappings = []
+        for row in rows:
+            mapping = {"request_id": uuid7(), "timestamp": now, **row}
+            if mapping.get("request_messages") is not None:
+                mapping["request_message_hashes"] = self._store_message_blobs(mapping.pop("request_messages"))
+            mappings.append(mapping)
+
+        self.db.bulk_insert_mappings(LLMRequest, mappings)
+        self.db.commit()
+
+        return len(mappings)
+
     def update_debug_session_stats(self, debug_session_id: int):
         """Update debug session statistics"""
         debug_session = self.db.query(DebugSession).filter(
@@ -174,23 +374,14 @@ class DebugPersistenceManager:
                 Message.debug_enabled == True
             ).count()
 
-            # Count steps in this session
-            step_count = self.db.query(DebugStep).filter(
-                DebugStep.debug_session_id == debug_session_id
-            ).count()
-
-            # Count tools used
-            tool_count = self.db.query(DebugStep).filter(
-                DebugStep.debug_session_id == debug_session_id,
-                DebugStep.step_type.in_(['tool_call', 'tool_result'])
-            ).count()
-
-            # Calculate total processing time
-            total_processing_time = self.db.query(
-                func.sum(DebugStep.duration_ms)
+            # Count steps, tool steps and total duration in one pass
+            step_count, tool_count, total_processing_time = self.db.query(
+                func.count(DebugStep.id),
+                func.coalesce(func.sum(case((DebugStep.step_type.in_(TOOL_STEP_TYPES), 1), else_=0)), 0),
+                func.coalesce(func.sum(DebugStep.duration_ms), 0)
             ).filter(
                 DebugStep.debug_session_id == debug_session_id
-            ).scalar() or 0
+            ).one()
 
             debug_session.total_messages = message_count
             debug_session.total_steps = step_count
@@ -201,7 +392,30 @@ class DebugPersistenceManager:
 
     def get_conversation_debug_data(self, conversation_id: int, user_id: int) -> Dict[str, Any]:
         """Get all debug data for a conversation"""
-        # Verify conversation access
+        debug_data = self._get_conversation_debug_header(conversation_id, user_id)
+        debug_data["messages"] = list(self._iter_message_debug_data(conversation_id))
+
+        return debug_data
+
+    def iter_conversation_debug_data(self, conversation_id: int, user_id: int) -> Iterator[bytes]:
+        """Get all debug data for a conversation as NDJSON lines
+
+        The first line holds the conversation and debug session data, each
+        following line one message with its debug steps and LLM requests.
+        Access is checked before the iterator is returned so callers can
+        report a missing conversation before streaming starts.
+        """
+        header = self._get_conversation_debug_header(conversation_id, user_id)
+
+        def generate() -> Iterator[bytes]:
+            yield orjson.dumps(header) + b"\n"
+            for message_data in self._iter_message_debug_data(conversation_id):
+                yield orjson.dumps(message_data) + b"\n"
+
+        return generate()
+
+    def _get_conversation_debug_header(self, conversation_id: int, user_id: int) -> Dict[str, Any]:
+        """Verify conversation access and collect its debug sessions"""
         conversation = self.db.query(Conversation).filter(
             Conversation.id == conversation_id,
             Conversation.user_id == user_id
@@ -210,59 +424,63 @@ class DebugPersistenceManager:
         if not conversation:
             raise ValueError("Conversation not found or access denied")
 
-        # Get debug sessions
         debug_sessions = self.db.query(DebugSession).filter(
             DebugSession.conversation_id == conversation_id,
             DebugSession.user_id == user_id
         ).order_by(desc(DebugSession.started_at)).all()
 
-        # Get messages with debug data
-        messages = self.db.query(Message).filter(
-            Message.conversation_id == conversation_id,
-            Message.debug_enabled == True
-        ).order_by(Message.timestamp).all()
-
-        debug_data = {
+        return {
             "conversation_id": conversation_id,
             "conversation_title": conversation.title,
-            "debug_sessions": [],
-            "messages": []
+            "debug_sessions": [
+                {
+                    "session_id": session.session_id,
+                    "started_at": session.started_at.isoformat(),
+                    "ended_at": session.ended_at.isoformat() if session.ended_at else None,
+                    "is_active": session.is_active,
+                    "total_messages": session.total_messages,
+                    "total_steps": session.total_steps,
+                    "total_tools_used": session.total_tools_used,
+                    "total_processing_time": session.total_processing_time
+                }
+                for session in debug_sessions
+            ]
         }
 
-        # Process debug sessions
-        for session in debug_sessions:
-            session_data = {
-                "session_id": session.session_id,
-                "started_at": session.started_at.isoformat(),
-                "ended_at": session.ended_at.isoformat() if session.ended_at else None,
-                "is_active": session.is_active,
-                "total_messages": session.total_messages,
-                "total_steps": session.total_steps,
-                "total_tools_used": session.total_tools_used,
-                "total_processing_time": session.total_processing_time
-            }
-            debug_data["debug_sessions"].append(session_data)
-
-        # Process messages with debug data
-        for message in messages:
-            message_data = {
-                "message_id": message.id,
-                "role": message.role,
-                "content": message.content,
-                "timestamp": message.timestamp.isoformat(),
-                "processing_time": message.processing_time,
-                "token_count": message.token_count,
-                "debug_steps": [],
-                "llm_requests": []
-            }
-
-            # Get debug steps for this message
-            debug_steps = self.db.query(DebugStep).filter(
-                DebugStep.message_id == message.id
-            ).order_by(DebugStep.step_order).all()
+    def _iter_message_debug_data(self, conversation_id: int) -> Iterator[Dict[str, Any]]:
+        """Iterate debug-enabled messages serialized with their steps and LLM requests
+
+        Messages are fetched 50 at a time; the request message blobs of each
+        batch are resolved together, since requests in one conversation share
+        most of their history.
+        """
+        result = self.db.execute(
+            select(Message).options(
+                selectinload(Message.debug_steps),
+                selectinload(Message.llm_requests)
+            ).where(
+                Message.conversation_id == conversation_id,
+                Message.debug_enabled == True
+            ).order_by(Message.timestamp).execution_options(yield_per=50)
+        )
+        for messages in result.scalars().partitions():
+            request_messages = load_request_messages(
+                self.db, [llm_request for message in messages for llm_request in message.llm_requests]
+            )
+            for message in messages:
+                yield self._message_debug_data(message, request_messages)
 
-            for step in debug_steps:
-                step_data = {
+    def _message_debug_data(self, message: Message, request_messages: Dict[int, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Serialize a message with its debug steps and LLM requests"""
+        return {
+            "message_id": message.id,
+            "role": message.role,
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat(),
+            "processing_time": message.processing_time,
+            "token_count": message.token_count,
+            "debug_steps": [
+                {
                     "step_id": step.step_id,
                     "step_type": step.step_type,
                     "step_order": step.step_order,
@@ -276,15 +494,10 @@ class DebugPersistenceManager:
                     "output_data": step.output_data,
                     "metadata": step.step_metadata
                 }
-                message_data["debug_steps"].append(step_data)
-
-            # Get LLM requests for this message
-            llm_requests = self.db.query(LLMRequest).filter(
-                LLMRequest.message_id == message.id
-            ).order_by(LLMRequest.timestamp).all()
-
-            for request in llm_requests:
-                request_data = {
+                for step in message.debug_steps
+            ],
+            "llm_requests": [
+                {
                     "request_id": request.request_id,
                     "model": request.model,
                     "temperature": request.temperature,
@@ -297,27 +510,31 @@ class DebugPersistenceManager:
                     "tools_used": request.tools_used,
                     "tool_calls": request.tool_calls,
                     "tool_results": request.tool_results,
-                    "request_messages": request.request_messages,
+                    "request_messages": request_messages[request.id],
                     "response_data": request.response_data
                 }
-                message_data["llm_requests"].append(request_data)
-
-            debug_data["messages"].append(message_data)
-
-        return debug_data
+                for request in message.llm_requests
+            ]
+        }
 
     def get_user_debug_preference(self, user_id: int) -> bool:
         """Get user's debug mode preference"""
+        with _debug_preference_lock:
+            cached = _debug_preference_cache.get(user_id)
+            if cached and time.monotonic() - cached[0] < DEBUG_PREFERENCE_TTL_SECONDS:
+                _debug_preference_cache.move_to_end(user_id)
+                return cached[1]
+
         preference = self.db.query(UserPreference).filter(
             UserPreference.user_id == user_id,
             UserPreference.category == "debug_mode",
             UserPreference.key == "enabled"
         ).first()
 
-        if preference:
-            return preference.value.get("enabled", False)
+        enabled = preference.value.get("enabled", False) if preference else False
+        _cache_debug_preference(user_id, enabled)
 
-        return False
+        return enabled
 
     def set_user_debug_preference(self, user_id: int, enabled: bool):
         """Set user's debug mode preference"""
@@ -340,6 +557,7 @@ class DebugPersistenceManager:
             self.db.add(preference)
 
         self.db.commit()
+        _cache_debug_preference(user_id, enabled)
         logger.info(f"Set debug mode preference for user {user_id}: {enabled}")
 
     def get_debug_session_summary(self, conversation_id: int, user_id: int) -> Dict[str, Any]:
@@ -413,32 +631,63 @@ class DebugPersistenceManager:
 
         cutoff_date = datetime.now() - timedelta(days=days_old)
 
-        # Get old debug sessions
-        old_sessions = self.db.query(DebugSession).filter(
+        old_sessions = self.db.query(DebugSession.id).filter(
             DebugSession.started_at < cutoff_date,
             DebugSession.is_active == False
-        ).all()
+        )
 
-        count = 0
-        for session in old_sessions:
-            # Delete related debug steps
-            self.db.query(DebugStep).filter(
-                DebugStep.debug_session_id == session.id
-            ).delete()
+        # Delete related debug steps before their sessions
+        steps_deleted = self.db.query(DebugStep).filter(
+            DebugStep.debug_session_id.in_(old_sessions.scalar_subquery())
+        ).delete(synchronize_session=False)
 
-            # Delete the session
-            self.db.delete(session)
-            count += 1
+        sessions_deleted = self.db.query(DebugSession).filter(
+            DebugSession.started_at < cutoff_date,
+            DebugSession.is_active == False
+        ).delete(synchronize_session=False)
 
-        # Clean up old LLM requests
-        old_llm_requests = self.db.query(LLMRequest).filter(
+        # Clean up old LLM requests, then the message blobs only they referred to
+        requests_deleted = self.db.query(LLMRequest).filter(
             LLMRequest.timestamp < cutoff_date
-        ).all()
-
-        for request in old_llm_requests:
-            self.db.delete(request)
+        ).delete(synchronize_session=False)
+        blobs_deleted = self._sweep_message_blobs(cutoff_date)
 
         self.db.commit()
-        logger.info(f"Cleaned up {count} old debug sessions and {len(old_llm_requests)} old LLM requests")
+        logger.info(
+            "Cleaned up %s old debug sessions, %s debug steps, %s old LLM requests "
+            "and %s unreferenced message blobs",
+            sessions_deleted, steps_deleted, requests_deleted, blobs_deleted
+        )
 
-        return count + len(old_llm_requests)
+        return steps_deleted + sessions_deleted + requests_deleted
+
+    def _sweep_message_blobs(self, cutoff_date: datetime) -> int:
+        """Delete message blobs unused since cutoff_date that no LLM request refers to
+
+        Marks every hash the surviving requests reference, then sweeps the
+        rest. Storing a request touches its blobs' last_used_at before the
+        request is inserted, so a blob a request is about to reference is
+        never older than the cutoff.
+        """
+        referenced = set()
+        for hashes in self.db.scalars(
+            select(LLMRequest.request_message_hashes).execution_options(yield_per=1000)
+        ):
+            if hashes:
+                referenced.update(hashes)
+
+        unreferenced = [
+            hash_value
+            for hash_value in self.db.scalars(
+                select(LLMMessageBlob.hash).where(LLMMessageBlob.last_used_at < cutoff_date)
+            )
+            if hash_value not in referenced
+        ]
+        blobs_deleted = 0
+        for start in range(0, len(unreferenced), BLOB_SWEEP_BATCH_SIZE):
+            # Re-check the age in the delete in case a request touched the blob meanwhile
+            blobs_deleted += self.db.query(LLMMessageBlob).filter(
+                LLMMessageBlob.hash.in_(unreferenced[start:start + BLOB_SWEEP_BATCH_SIZE]),
+                LLMMessageBlob.last_used_at < cutoff_date
+            ).delete(synchronize_session=False)
+        return blobs_deleted
@@ -2,10 +2,16 @@
 Database migration script for debug persistence features
 """
 import logging
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, JSON, inspect
+from datetime import datetime
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, JSON, inspect, text, false
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.sql import func
 from config import settings
 from database import engine
+from models import CompressedJSON, JSONVariant
 
 logger = logging.getLogger(__name__)
 
@@ -14,131 +20,247 @@ def migrate_debug_persistence():
     
     metadata = MetaData()
     
-    # Check if tables already exist
+    # Reflect the columns of tables that may need altering once up front
     inspector = inspect(engine)
-    existing_tables = inspector.get_table_names()
-    
-    tables_to_create = []
+    table_columns = {
+        table_name: {column['name'] for column in columns}
+        for (_, table_name), columns in inspector.get_multi_columns(
+            filter_names=['messages', 'debug_steps', 'llm_requests', 'llm_message_blobs']
+        ).items()
+    }
+    existing_columns = table_columns.get('messages', set())
     
     # Debug Sessions table
-    if 'debug_sessions' not in existing_tables:
-        debug_sessions = Table(
-            'debug_sessions',
-            metadata,
-            Column('id', Integer, primary_key=True, index=True),
-            Column('conversation_id', Integer, ForeignKey('conversations.id'), nullable=False),
-            Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
-            Column('session_id', String(100), nullable=False, index=True),
-            Column('started_at', DateTime, default=func.now()),
-            Column('ended_at', DateTime, nullable=True),
-            Column('is_active', Boolean, default=True),
-            Column('total_messages', Integer, default=0),
-            Column('total_steps', Integer, default=0),
-            Column('total_tools_used', Integer, default=0),
-            Column('total_processing_time', Float, default=0.0),
-        )
-        tables_to_create.append(debug_sessions)
+    debug_sessions = Table(
+        'debug_sessions',
+        metadata,
+        Column('id', Integer, primary_key=True, index=True),
+        Column('conversation_id', Integer, ForeignKey('conversations.id'), nullable=False),
+        Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+        Column('session_id', String(100), nullable=False, index=True),
+        Column('started_at', DateTime, default=func.now()),
+        Column('ended_at', DateTime, nullable=True),
+        Column('is_active', Boolean, default=True),
+        Column('total_messages', Integer, default=0),
+        Column('total_steps', Integer, default=0),
+        Column('total_tools_used', Integer, default=0),
+        Column('total_processing_time', Float, default=0.0),
+    )
     
     # Debug Steps table
-    if 'debug_steps' not in existing_tables:
-        debug_steps = Table(
-            'debug_steps',
-            metadata,
-            Column('id', Integer, primary_key=True, index=True),
-            Column('message_id', Integer, ForeignKey('messages.id'), nullable=False),
-            Column('debug_session_id', Integer, ForeignKey('debug_sessions.id'), nullable=False),
-            Column('step_id', String(100), nullable=False, index=True),
-            Column('step_type', String(50), nullable=False),
-            Column('step_order', Integer, nullable=False),
-            Column('title', String(200), nullable=False),
-            Column('description', Text, nullable=True),
-            Column('timestamp', DateTime, default=func.now()),
-            Column('duration_ms', Integer, nullable=True),
-            Column('success', Boolean, default=True),
-            Column('error_message', Text, nullable=True),
-            Column('input_data', JSON, nullable=True),
-            Column('output_data', JSON, nullable=True),
-            Column('metadata', JSON, nullable=True),
-        )
-        tables_to_create.append(debug_steps)
+    debug_steps = Table(
+        'debug_steps',
+        metadata,
+        Column('id', Integer, primary_key=True, index=True),
+        Column('message_id', Integer, ForeignKey('messages.id'), nullable=False),
+        Column('debug_session_id', Integer, ForeignKey('debug_sessions.id'), nullable=False),
+        Column('step_id', String(100), nullable=False, index=True),
+        Column('step_type', String(50), nullable=False),
+        Column('step_order', Integer, nullable=False),
+        Column('title', String(200), nullable=False),
+        Column('description', Text, nullable=True),
+        Column('timestamp', DateTime, default=func.now()),
+        Column('duration_ms', Integer, nullable=True),
+        Column('success', Boolean, default=True),
+        Column('error_message', Text, nullable=True),
+        Column('input_data', CompressedJSON, nullable=True),
+        Column('output_data', CompressedJSON, nullable=True),
+        Column('step_metadata', JSONVariant, nullable=True),
+    )
     
     # LLM Requests table
-    if 'llm_requests' not in existing_tables:
-        llm_requests = Table(
-            'llm_requests',
-            metadata,
-            Column('id', Integer, primary_key=True, index=True),
-            Column('message_id', Integer, ForeignKey('messages.id'), nullable=False),
-            Column('request_id', String(100), nullable=False, index=True),
-            Column('model', String(100), nullable=False),
-            Column('temperature', Float, nullable=True),
-            Column('max_tokens', Integer, nullable=True),
-            Column('stream', Boolean, default=False),
-            Column('request_messages', JSON, nullable=False),
-            Column('response_data', JSON, nullable=False),
-            Column('timestamp', DateTime, default=func.now()),
-            Column('processing_time_ms', Integer, nullable=True),
-            Column('token_usage', JSON, nullable=True),
-            Column('tools_available', JSON, nullable=True),
-            Column('tools_used', JSON, nullable=True),
-            Column('tool_calls', JSON, nullable=True),
-            Column('tool_results', JSON, nullable=True),
-        )
-        tables_to_create.append(llm_requests)
+    llm_requests = Table(
+        'llm_requests',
+        metadata,
+        Column('id', Integer, primary_key=True, index=True),
+        Column('message_id', Integer, ForeignKey('messages.id'), nullable=False),
+        Column('request_id', String(100), nullable=False, index=True),
+        Column('model', String(100), nullable=False),
+        Column('temperature', Float, nullable=True),
+        Column('max_tokens', Integer, nullable=True),
+        Column('stream', Boolean, default=False),
+        Column('request_messages', CompressedJSON, nullable=True),
+        Column('request_message_hashes', JSONVariant, nullable=True),
+        Column('response_data', CompressedJSON, nullable=False),
+        Column('timestamp', DateTime, default=func.now()),
+        Column('processing_time_ms', Integer, nullable=True),
+        Column('token_usage', JSONVariant, nullable=True),
+        Column('tools_available', CompressedJSON, nullable=True),
+        Column('tools_used', JSONVariant, nullable=True),
+        Column('tool_calls', CompressedJSON, nullable=True),
+        Column('tool_results', CompressedJSON, nullable=True),
+    )
+    
+    # Content-addressed request messages shared between LLM requests
+    llm_message_blobs = Table(
+        'llm_message_blobs',
+        metadata,
+        Column('hash', String(64), primary_key=True),
+        Column('payload', CompressedJSON, nullable=False),
+        Column('last_used_at', DateTime, default=func.now(), index=True),
+    )
     
     # Add new columns to existing messages table
+    debug_columns = [
+        Column('debug_enabled', Boolean, server_default=false()),
+        Column('debug_data', JSONVariant, nullable=True),
+    ]
+    missing_columns = [column for column in debug_columns if column.name not in existing_columns]
+
+    if existing_columns and missing_columns:
+        try:
+            with engine.begin() as conn:
+                op = Operations(MigrationContext.configure(conn))
+                with op.batch_alter_table('messages') as batch_op:
+                    for column in missing_columns:
+                        batch_op.add_column(column)
+            logger.info(f"Added {', '.join(c.name for c in missing_columns)} to messages table")
+        except Exception as e:
+            logger.error(f"Failed to add columns to messages table: {e}")
+    
+    # Older debug_steps tables used a 'metadata' column, which clashes with
+    # the declarative Base.metadata attribute and can't be mapped by the ORM
+    debug_step_columns = table_columns.get('debug_steps', set())
+    if 'metadata' in debug_step_columns and 'step_metadata' not in debug_step_columns:
+        try:
+            with engine.begin() as conn:
+                op = Operations(MigrationContext.configure(conn))
+                with op.batch_alter_table('debug_steps') as batch_op:
+                    batch_op.alter_column('metadata', new_column_name='step_metadata')
+            logger.info("Renamed debug_steps.metadata to step_metadata")
+        except Exception as e:
+            logger.error(f"Failed to rename debug_steps.metadata column: {e}")
+    
+    # Create any missing tables; checkfirst skips the ones that already exist
     try:
-        inspector = inspect(engine)
-        existing_columns = [col['name'] for col in inspector.get_columns('messages')]
-        
-        with engine.connect() as conn:
-            if 'debug_enabled' not in existing_columns:
-                conn.execute('ALTER TABLE messages ADD COLUMN debug_enabled BOOLEAN DEFAULT FALSE')
-                logger.info("Added debug_enabled column to messages table")
-            
-            if 'debug_data' not in existing_columns:
-                conn.execute('ALTER TABLE messages ADD COLUMN debug_data JSON')
-                logger.info("Added debug_data column to messages table")
-            
-            conn.commit()
+        with engine.begin() as conn:
+            # The foreign key targets must be known to sort and create the tables
+            metadata.reflect(bind=conn, only=['users', 'conversations', 'messages'])
+            metadata.create_all(
+                bind=conn,
+                tables=[debug_sessions, debug_steps, llm_requests, llm_message_blobs],
+                checkfirst=True
+            )
+        logger.info("Debug persistence tables are in place")
     except Exception as e:
-        logger.error(f"Failed to add columns to messages table: {e}")
-    
-    # Create new tables
-    if tables_to_create:
+        logger.error(f"Failed to create debug persistence tables: {e}")
+        raise
+
+    # Older llm_requests tables store request messages inline and require them
+    llm_request_columns = table_columns.get('llm_requests', set())
+    if llm_request_columns and 'request_message_hashes' not in llm_request_columns:
         try:
-            metadata.create_all(bind=engine, tables=tables_to_create)
-            logger.info(f"Created {len(tables_to_create)} debug persistence tables")
+            with engine.begin() as conn:
+                op = Operations(MigrationContext.configure(conn))
+                with op.batch_alter_table('llm_requests') as batch_op:
+                    batch_op.add_column(Column('request_message_hashes', JSONVariant, nullable=True))
+                    batch_op.alter_column('request_messages', existing_type=CompressedJSON, nullable=True)
+            logger.info("Added request_message_hashes to llm_requests table")
         except Exception as e:
-            logger.error(f"Failed to create debug persistence tables: {e}")
-            raise
-    else:
-        logger.info("All debug persistence tables already exist")
+            logger.error(f"Failed to update llm_requests table: {e}")
+
+    # Older llm_message_blobs tables can't tell the cleanup sweep how recently a blob was used
+    blob_columns = table_columns.get('llm_message_blobs', set())
+    if blob_columns and 'last_used_at' not in blob_columns:
+        try:
+            with engine.begin() as conn:
+                op = Operations(MigrationContext.configure(conn))
+                with op.batch_alter_table('llm_message_blobs') as batch_op:
+                    batch_op.add_column(Column('last_used_at', DateTime, nullable=True))
+                    batch_op.create_index('ix_llm_message_blobs_last_used_at', ['last_used_at'])
+                # Start existing blobs' clock now; a later cleanup sweeps the unreferenced ones
+                conn.execute(llm_message_blobs.update().values(last_used_at=datetime.now()))
+            logger.info("Added last_used_at to llm_message_blobs table")
+        except Exception as e:
+            logger.error(f"Failed to update llm_message_blobs table: {e}")
+
+    # Create lookup indexes (also covers tables created before the indexes existed)
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS ix_debug_sessions_conv_user_active ON debug_sessions(conversation_id, user_id, is_active)",
+        "CREATE INDEX IF NOT EXISTS ix_debug_steps_session_id_order ON debug_steps(debug_session_id, step_order)",
+        "CREATE INDEX IF NOT EXISTS ix_llm_requests_message_time ON llm_requests(message_id, timestamp)",
+        # Superseded by ix_llm_requests_message_time
+        "DROP INDEX IF EXISTS ix_llm_requests_message_id"
+    ]
+    if engine.dialect.name == "postgresql":
+        # json has no default GIN operator class, so convert the columns first
+        _convert_json_columns_to_jsonb([debug_steps, llm_requests, llm_message_blobs])
+        indexes.append("CREATE INDEX IF NOT EXISTS ix_debug_steps_metadata ON debug_steps USING gin (step_metadata)")
+
+    # One transaction per statement: on PostgreSQL a failed statement
+    # aborts its transaction and would roll back the indexes before it
+    for index_sql in indexes:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(index_sql))
+        except Exception as e:
+            logger.warning(f"Could not update index: {e}")
+
+def _convert_json_columns_to_jsonb(tables):
+    """Convert PostgreSQL json columns created before the switch to JSONB"""
+    jsonb_columns = {
+        table.name: {column.name for column in table.columns if isinstance(column.type, (JSON, CompressedJSON))}
+        for table in tables
+    }
+    jsonb_columns['messages'] = {'debug_data'}
+
+    reflected = inspect(engine).get_multi_columns(filter_names=list(jsonb_columns))
+    for (_, table_name), columns in reflected.items():
+        json_columns = [
+            column['name'] for column in columns
+            if column['name'] in jsonb_columns[table_name]
+            and isinstance(column['type'], JSON) and not isinstance(column['type'], JSONB)
+        ]
+        if not json_columns:
+            continue
+        # Alter all of a table's columns in one statement so it is rewritten once
+        alter_sql = f"ALTER TABLE {table_name} " + ", ".join(
+            f"ALTER COLUMN {name} TYPE jsonb USING {name}::jsonb" for name in json_columns
+        )
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(alter_sql))
+            logger.info(f"Converted {', '.join(json_columns)} in {table_name} to jsonb")
+        except Exception as e:
+            logger.error(f"Failed to convert {table_name} columns to jsonb: {e}")
 
 def rollback_debug_persistence():
     """Remove debug persistence tables (for testing purposes)"""
     metadata = MetaData()
-    metadata.reflect(bind=engine)
+    tables_to_drop = ['debug_steps', 'llm_requests', 'llm_message_blobs', 'debug_sessions']
     
-    tables_to_drop = ['debug_steps', 'llm_requests', 'debug_sessions']
+    # Only reflect the debug tables, not the whole schema
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+    try:
+        metadata.reflect(bind=engine, only=[name for name in tables_to_drop if name in existing_tables])
+    except InvalidRequestError as e:
+        logger.error(f"Failed to reflect debug persistence tables: {e}")
+        return
     
-    for table_name in tables_to_drop:
-        if table_name in metadata.tables:
-            try:
-                metadata.tables[table_name].drop(engine)
-                logger.info(f"Dropped table {table_name}")
-            except Exception as e:
-                logger.error(f"Failed to drop table {table_name}: {e}")
+    existing_columns = {
+        column['name']
+        for columns in inspector.get_multi_columns(filter_names=['messages']).values()
+        for column in columns
+    }
+    columns_to_drop = [name for name in ('debug_enabled', 'debug_data') if name in existing_columns]
     
-    # Remove columns from messages table
+    # Drop tables and columns in a single transaction
     try:
-        with engine.connect() as conn:
-            conn.execute('ALTER TABLE messages DROP COLUMN debug_enabled')
-            conn.execute('ALTER TABLE messages DROP COLUMN debug_data')
-            conn.commit()
-            logger.info("Removed debug columns from messages table")
+        with engine.begin() as conn:
+            for table_name in tables_to_drop:
+                if table_name in metadata.tables:
+                    metadata.tables[table_name].drop(conn)
+                    logger.info(f"Dropped table {table_name}")
+            
+            if columns_to_drop:
+                op = Operations(MigrationContext.configure(conn))
+                with op.batch_alter_table('messages') as batch_op:
+                    for column_name in columns_to_drop:
+                        batch_op.drop_column(column_name)
+                logger.info("Removed debug columns from messages table")
     except Exception as e:
-        logger.error(f"Failed to remove columns from messages table: {e}")
+        logger.error(f"Failed to roll back debug persistence: {e}")
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -1,42 +1,74 @@
 """
 Enhanced Debug routes with persistence capabilities
 """
+import copy
 import logging
 import time
 import os
 import sys
 import asyncio
 import subprocess
-from typing import List, Dict, Any, Optional
-from fastapi import HTTPException, Depends, BackgroundTasks, status, APIRouter, Response
+from datetime import datetime
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import BackgroundTasks, HTTPException, Depends, status, APIRouter, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, exists, func, select
 from httpx import TimeoutException
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
-from database import get_db
-from models import User, Conversation, Message
+from database import get_db, get_async_db, get_db_direct
+from models import User, Conversation, Message, MemoryExtractionJob
 from schemas import Message as MessageSchema
 from enhanced_schemas import (
     ToolUsageTrace, ToolUsageAnalytics, SystemDebugInfo,
     ChatRequestWithDebug, ChatResponseWithDebug
 )
-from tool_usage_manager import ToolUsageManager
+from tool_usage_manager import ToolUsageManager, tool_usage_manager
 from enhanced_conversation_manager import EnhancedConversationManager
-from debug_persistence_manager import DebugPersistenceManager
+from conversation_manager import cache_conversation_owner, get_cached_conversation_owner
+from debug_persistence_manager import DebugPersistenceManager, uuid7
 from debug_data_processor import DebugDataProcessor
 from memory_manager import MemoryManager, EnhancedMemoryManager
 from lmstudio_client import lmstudio_client
 from config import settings
-from mcp_integration import get_mcp_tools_for_assistant
+from mcp_integration import get_cached_mcp_tools, invalidate_mcp_tools_cache
+from response_cache import SemanticResponseCache, response_cache
+from script_worker import SCRIPT_TIMEOUT_SECONDS, run_script, run_script_inproc, run_script_subprocess
 
 logger = logging.getLogger(__name__)
 
 # Create router
-debug_router = APIRouter(prefix="/debug", tags=["debug"])
-
-# Global tool usage manager
-tool_usage_manager = None
+debug_router = APIRouter(prefix="/debug", tags=["debug"], default_response_class=ORJSONResponse)
+
+# Trace-heavy responses are dumped once in pydantic-core and written with orjson,
+# skipping FastAPI's dump/re-validate pass over the response_model
+_tool_trace_list = TypeAdapter(List[ToolUsageTrace])
+
+# Existence checks are built once; the engine's compiled cache then serves their SQL
+_USER_EXISTS = select(exists().where(User.id == bindparam("user_id")))
+_CONVERSATION_OWNED = select(exists().where(
+    Conversation.id == bindparam("conversation_id"),
+    Conversation.user_id == bindparam("user_id")
+))
+
+def _orjson_response(model: BaseModel) -> ORJSONResponse:
+    """Serialize an already validated response model straight to orjson"""
+    return ORJSONResponse(content=model.model_dump(mode="json"))
+
+# Trace listings are paged by cursor; the body stays a plain list and the cursor
+# for the next page, if any, is returned in a header
+MAX_TRACE_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _trace_page_response(traces: List[ToolUsageTrace], next_cursor: Optional[int]) -> ORJSONResponse:
+    """Serialize a page of traces with the cursor of the page after it"""
+    return ORJSONResponse(
+        content=_tool_trace_list.dump_python(traces, mode="json"),
+        headers={NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor is not None else None
+    )
 
 # Models for debug scripts
 class DebugScript(BaseModel):
@@ -64,22 +96,39 @@ class DebugDataResponse(BaseModel):
     has_debug_data: bool
     debug_data: Dict[str, Any]
 
-def get_tool_usage_manager(db: Session = Depends(get_db)) -> ToolUsageManager:
+def _maybe_trace(tool_manager: ToolUsageManager, trace_id: Optional[str], **step_kwargs):
+    """Trace a step when tracing is on, otherwise just run the body"""
+    if trace_id is None:
+        return nullcontext()
+    return tool_manager.trace_step(trace_id, **step_kwargs)
+
+def get_tool_usage_manager() -> ToolUsageManager:
     """Get tool usage manager instance"""
-    global tool_usage_manager
-    if tool_usage_manager is None:
-        tool_usage_manager = ToolUsageManager(db)
     return tool_usage_manager
 
 def get_enhanced_conversation_manager(db: Session = Depends(get_db)) -> EnhancedConversationManager:
     return EnhancedConversationManager(db)
 
-def get_enhanced_memory_manager(db: Session = Depends(get_db)) -> EnhancedMemoryManager:
-    return EnhancedMemoryManager(db)
-
 def get_debug_persistence_manager(db: Session = Depends(get_db)) -> DebugPersistenceManager:
     return DebugPersistenceManager(db)
 
+def store_debug_data(steps: List[Dict[str, Any]], llm_requests: List[Dict[str, Any]]):
+    """Write a debug chat's buffered steps and LLM requests in one transaction"""
+    db = get_db_direct()
+    try:
+        debug_persistence = DebugPersistenceManager(db)
+        for llm_request in llm_requests:
+            debug_persistence.store_llm_request(**llm_request, commit=False)
+        if steps:
+            debug_persistence.store_debug_steps(steps)
+        else:
+            db.commit()
+    except Exception as e:
+        logger.exception("Failed to store debug data: %s", e)
+        db.rollback()
+    finally:
+        db.close()
+
 # Enhanced chat endpoint with comprehensive tool usage tracing and persistence
 @debug_router.post("/chat", response_model=ChatResponseWithDebug)
 async def chat_with_debug_tracing(
@@ -87,69 +136,90 @@ async def chat_with_debug_tracing(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     conv_manager: EnhancedConversationManager = Depends(get_enhanced_conversation_manager),
-    enhanced_memory: EnhancedMemoryManager = Depends(get_enhanced_memory_manager),
     tool_manager: ToolUsageManager = Depends(get_tool_usage_manager),
     debug_persistence: DebugPersistenceManager = Depends(get_debug_persistence_manager)
 ):
     """Enhanced chat endpoint with comprehensive tool usage tracing and persistence"""
     start_time = time.time()
     trace_id = None
-    debug_session = None
+    # Debug steps and LLM requests are buffered and written in one transaction
+    # after the response is sent (or right away when the chat fails)
+    pending_debug_steps: List[Dict[str, Any]] = []
+    pending_llm_requests: List[Dict[str, Any]] = []
+
+    # Ids and timestamps are generated up front so the response can be built
+    # from the buffer before the rows are written
+    def add_debug_step(**step):
+        pending_debug_steps.append(dict(step, step_id=uuid7(), timestamp=datetime.now()))
+
+    def add_llm_request(**llm_request):
+        pending_llm_requests.append(dict(llm_request, request_id=uuid7(), timestamp=datetime.now()))
+
+    def flush_debug_steps():
+        if pending_debug_steps or pending_llm_requests:
+            store_debug_data(pending_debug_steps[:], pending_llm_requests[:])
+            pending_debug_steps.clear()
+            pending_llm_requests.clear()
 
     try:
         # Initialize debug data processor
         debug_processor = DebugDataProcessor(db)
         
-        # Verify user exists
-        user = db.query(User).filter(User.id == request.user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+        # The managers share a sync Session; run their writes in a worker thread
+        # so they don't block the event loop. Only plain ids come back, since the
+        # commits expire the ORM objects and reading them here would reload them
+        def start_chat():
+            # Verify user exists and get or create conversation
+            user, conversation = conv_manager.get_conversation_with_user(
+                request.conversation_id or None, request.user_id
             )
-
-        # Get or create conversation
-        if request.conversation_id:
-            conversation = conv_manager.get_conversation(request.conversation_id, request.user_id)
-            if not conversation:
+            if not user:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Conversation not found"
+                    detail="User not found"
                 )
-        else:
-            conversation = conv_manager.create_conversation(request.user_id)
 
-        # Initialize debug session if debug tracing is enabled
-        if request.enable_tool_trace:
-            debug_session = debug_persistence.get_or_create_debug_session(
-                conversation.id, request.user_id
-            )
+            if request.conversation_id:
+                if not conversation:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Conversation not found"
+                    )
+            else:
+                conversation = conv_manager.create_conversation(request.user_id)
 
-            # Initialize tool usage tracing
-            trace_id = tool_manager.create_trace(
-                conversation_id=conversation.id,
-                user_id=request.user_id
+            conversation_id = conversation.id
+
+            # Initialize debug session if debug tracing is enabled
+            debug_session_id = None
+            if request.enable_tool_trace:
+                debug_session_id = debug_persistence.get_or_create_debug_session(
+                    conversation_id, request.user_id
+                ).id
+
+            # Add user message, debug-enabled if tracing is on
+            user_message = conv_manager.add_message(
+                conversation_id,
+                "user",
+                request.message,
+                debug_enabled=request.enable_tool_trace
             )
+            return conversation_id, debug_session_id, user_message.id
 
-        # Add user message
-        user_message = conv_manager.add_message(
-            conversation.id,
-            "user",
-            request.message
-        )
+        conversation_id, debug_session_id, user_message_id = await asyncio.to_thread(start_chat)
 
-        # Mark message as debug-enabled if tracing is on
+        # Initialize tool usage tracing
         if request.enable_tool_trace:
-            user_message.debug_enabled = True
-            db.commit()
-
-        # Update trace with message ID
-        if trace_id:
-            tool_manager.active_traces[trace_id].message_id = user_message.id
+            trace_id = tool_manager.create_trace(
+                conversation_id=conversation_id,
+                user_id=request.user_id,
+                message_id=user_message_id
+            )
 
         # Step 1: Context Building with tracing
-        if trace_id:
-            async with tool_manager.trace_step(
+        async def build_context(available_tools):
+            async with _maybe_trace(
+                tool_manager,
                 trace_id,
                 tool_name="context_builder",
                 tool_type="internal",
@@ -158,17 +228,18 @@ async def chat_with_debug_tracing(
                 input_data={"max_messages": settings.max_conversation_history}
             ):
                 context = await conv_manager.build_tool_enhanced_context(
-                    conversation.id,
+                    conversation_id,
                     request.user_id,
                     max_messages=settings.max_conversation_history,
-                    include_historical_context=True
+                    include_historical_context=True,
+                    available_tools=available_tools
                 )
 
                 # Store debug step
-                if debug_session:
-                    debug_persistence.store_debug_step(
-                        message_id=user_message.id,
-                        debug_session_id=debug_session.id,
+                if debug_session_id is not None:
+                    add_debug_step(
+                        message_id=user_message_id,
+                        debug_session_id=debug_session_id,
                         step_type="context_building",
                         step_order=1,
                         title="Context Building",
@@ -177,121 +248,55 @@ async def chat_with_debug_tracing(
                         input_data={"max_messages": settings.max_conversation_history},
                         output_data={"context_size": len(context)}
                     )
-        else:
-            context = await conv_manager.build_tool_enhanced_context(
-                conversation.id,
-                request.user_id,
-                max_messages=settings.max_conversation_history,
-                include_historical_context=True
-            )
+            return context
 
         # Step 2: Tool Discovery with tracing
-        if trace_id:
-            async with tool_manager.trace_step(
+        async def discover_tools():
+            async with _maybe_trace(
+                tool_manager,
                 trace_id,
                 tool_name="mcp_tool_discovery",
                 tool_type="mcp",
                 step_type="discovery",
                 description="Discovering available MCP tools"
             ):
-                available_tools = get_mcp_tools_for_assistant()
+                tools = get_cached_mcp_tools()
 
                 # Store debug step
-                if debug_session:
-                    debug_persistence.store_debug_step(
-                        message_id=user_message.id,
-                        debug_session_id=debug_session.id,
+                if debug_session_id is not None:
+                    add_debug_step(
+                        message_id=user_message_id,
+                        debug_session_id=debug_session_id,
                         step_type="tool_discovery",
                         step_order=2,
                         title="Tool Discovery",
                         description="Discovering available MCP tools",
                         success=True,
-                        output_data={"tools_discovered": len(available_tools)}
+                        output_data={"tools_discovered": len(tools[0])}
                     )
-        else:
-            available_tools = get_mcp_tools_for_assistant()
+            return tools
+
+        # Tool discovery is a cache lookup; do it first so context building reuses the tools
+        available_tools, llm_tools = await discover_tools()
+        context = await build_context(available_tools)
 
         # Step 3: LLM Request with tracing
         debug_context = {}  # Always create debug context
-        
-        if trace_id:
-            async with tool_manager.trace_step(
-                trace_id,
-                tool_name="lmstudio_llm",
-                tool_type="llm",
-                step_type="inference",
-                description="Making LLM inference call",
-                input_data={
-                    "model": settings.lmstudio_model,
-                    "context_size": len(context),
-                    "tools_available": len(available_tools)
-                }
-            ):
-                # Prepare LLM request
-                llm_request_params = {
-                    "messages": context,
-                    "temperature": request.temperature,
-                    "max_tokens": request.max_tokens,
-                    "stream": False,
-                    "debug_context": debug_context
-                }
-
-                # Add tools if available
-                if available_tools:
-                    llm_request_params["tools"] = [
-                        {
-                            "type": "function",
-                            "function": tool["function"]
-                        } for tool in available_tools
-                    ]
-                    llm_request_params["tool_choice"] = "auto"
-
-                # Get LLM response
-                llm_response = await lmstudio_client.chat_completion(**llm_request_params)
 
-                # Store LLM request/response with debug data
-                if debug_session:
-                    debug_persistence.store_llm_request(
-                        message_id=user_message.id,
-                        model=settings.lmstudio_model,
-                        request_messages=context,
-                        response_data=llm_response,
-                        temperature=request.temperature,
-                        max_tokens=request.max_tokens,
-                        stream=False,
-                        processing_time_ms=debug_context.get('llm_processing_time_ms', int((time.time() - start_time) * 1000)),
-                        token_usage=llm_response.get("usage"),
-                        tools_available=available_tools
-                    )
-
-                    # Store debug step with full request payload
-                    debug_persistence.store_debug_step(
-                        message_id=user_message.id,
-                        debug_session_id=debug_session.id,
-                        step_type="llm_request",
-                        step_order=3,
-                        title="LLM Request",
-                        description="Making LLM inference call",
-                        success=True,
-                        input_data={
-                            "model": settings.lmstudio_model,
-                            "context_size": len(context),
-                            "tools_available": len(available_tools),
-                            "full_request_payload": debug_context.get('llm_request_payload', {}),
-                            "temperature": request.temperature,
-                            "max_tokens": request.max_tokens,
-                            "messages": context
-                        },
-                        output_data={
-                            "token_usage": llm_response.get("usage"),
-                            "has_tool_calls": bool(llm_response.get("choices", [{}])[0].get("message", {}).get("tool_calls")),
-                            "processing_time_ms": debug_context.get('llm_processing_time_ms'),
-                            "full_response": debug_context.get('llm_response_raw', {}),
-                            "response_tokens": debug_context.get('llm_response_tokens', 0)
-                        }
-                    )
-        else:
-            # Standard processing without tracing - still capture debug data
+        async with _maybe_trace(
+            tool_manager,
+            trace_id,
+            tool_name="lmstudio_llm",
+            tool_type="llm",
+            step_type="inference",
+            description="Making LLM inference call",
+            input_data={
+                "model": settings.lmstudio_model,
+                "context_size": len(context),
+                "tools_available": len(available_tools)
+            }
+        ):
+            # Prepare LLM request
             llm_request_params = {
                 "messages": context,
                 "temperature": request.temperature,
@@ -300,106 +305,151 @@ async def chat_with_debug_tracing(
                 "debug_context": debug_context
             }
 
+            # Add tools if available
             if available_tools:
-                llm_request_params["tools"] = [
-                    {
-                        "type": "function",
-                        "function": tool["function"]
-                    } for tool in available_tools
-                ]
+                llm_request_params["tools"] = llm_tools
                 llm_request_params["tool_choice"] = "auto"
 
-            llm_response = await lmstudio_client.chat_completion(**llm_request_params)
-            
-            # Store LLM request/response even without tracing if debug is enabled
-            if debug_session:
-                debug_persistence.store_llm_request(
-                    message_id=user_message.id,
+            # Get LLM response, from the response cache when a similar prompt was already answered
+            llm_response = None
+            cache_scope = None
+            message_vector = None
+            if settings.response_cache_enabled:
+                cache_scope = SemanticResponseCache.scope_key(
+                    context,
+                    model=settings.lmstudio_model,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    tools=[tool["function"].get("name") for tool in llm_tools]
+                )
+                llm_response, message_vector = await response_cache.lookup(cache_scope, request.message)
+            cache_hit = llm_response is not None
+            if not cache_hit:
+                llm_response = await lmstudio_client.chat_completion(**llm_request_params)
+                if cache_scope:
+                    # Cached after the response is sent, reusing the lookup's embedding
+                    background_tasks.add_task(
+                        response_cache.store,
+                        cache_scope,
+                        request.message,
+                        copy.deepcopy(llm_response),
+                        message_vector
+                    )
+            initial_message = llm_response.get("choices", [{}])[0].get("message", {})
+            has_tool_calls = bool(initial_message.get("tool_calls"))
+
+            # Store LLM request/response with debug data
+            if debug_session_id is not None:
+                add_llm_request(
+                    message_id=user_message_id,
                     model=settings.lmstudio_model,
                     request_messages=context,
                     response_data=llm_response,
                     temperature=request.temperature,
                     max_tokens=request.max_tokens,
                     stream=False,
-                    processing_time_ms=debug_context.get('llm_processing_time_ms', 0),
+                    processing_time_ms=debug_context.get('llm_processing_time_ms', int((time.time() - start_time) * 1000)),
                     token_usage=llm_response.get("usage"),
                     tools_available=available_tools
                 )
 
-        # Step 4: Tool Processing with tracing
-        if trace_id:
-            async with tool_manager.trace_step(
-                trace_id,
-                tool_name="tool_processor",
-                tool_type="internal",
-                step_type="processing",
-                description="Processing tool calls from LLM response"
-            ):
-                processed_response = await conv_manager.process_llm_response_with_tools(
-                    llm_response, conversation.id
+                # Store debug step with full request payload
+                add_debug_step(
+                    message_id=user_message_id,
+                    debug_session_id=debug_session_id,
+                    step_type="llm_request",
+                    step_order=3,
+                    title="LLM Request",
+                    description="Making LLM inference call",
+                    success=True,
+                    input_data={
+                        "model": settings.lmstudio_model,
+                        "context_size": len(context),
+                        "tools_available": len(available_tools),
+                        "full_request_payload": debug_context.get('llm_request_payload', {}),
+                        "temperature": request.temperature,
+                        "max_tokens": request.max_tokens,
+                        "messages": context
+                    },
+                    output_data={
+                        "token_usage": llm_response.get("usage"),
+                        "has_tool_calls": has_tool_calls,
+                        "processing_time_ms": debug_context.get('llm_processing_time_ms'),
+                        "full_response": debug_context.get('llm_response_raw', {}),
+                        "response_tokens": debug_context.get('llm_response_tokens', 0),
+                        "cache_hit": cache_hit
+                    }
                 )
 
-                # Store debug step
-                if debug_session:
-                    debug_persistence.store_debug_step(
-                        message_id=user_message.id,
-                        debug_session_id=debug_session.id,
-                        step_type="tool_processing",
-                        step_order=4,
-                        title="Tool Processing",
-                        description="Processing tool calls from LLM response",
-                        success=True,
-                        input_data={"has_tool_calls": bool(llm_response.get("choices", [{}])[0].get("message", {}).get("tool_calls"))},
-                        output_data={
-                            "requires_followup": processed_response.get("requires_followup", False),
-                            "tool_results_count": len(processed_response.get("tool_results", []))
-                        }
-                    )
-        else:
+        # Step 4: Tool Processing with tracing
+        async with _maybe_trace(
+            tool_manager,
+            trace_id,
+            tool_name="tool_processor",
+            tool_type="internal",
+            step_type="processing",
+            description="Processing tool calls from LLM response"
+        ):
             processed_response = await conv_manager.process_llm_response_with_tools(
-                llm_response, conversation.id
+                llm_response, conversation_id
             )
 
+            # Store debug step
+            if debug_session_id is not None:
+                add_debug_step(
+                    message_id=user_message_id,
+                    debug_session_id=debug_session_id,
+                    step_type="tool_processing",
+                    step_order=4,
+                    title="Tool Processing",
+                    description="Processing tool calls from LLM response",
+                    success=True,
+                    input_data={"has_tool_calls": has_tool_calls},
+                    output_data={
+                        "requires_followup": processed_response.get("requires_followup", False),
+                        "tool_results_count": len(processed_response.get("tool_results", []))
+                    }
+                )
+
         # Handle follow-up if needed
         final_response = llm_response
         if processed_response.get("requires_followup"):
-            if trace_id:
-                async with tool_manager.trace_step(
-                    trace_id,
-                    tool_name="followup_processor",
-                    tool_type="internal",
-                    step_type="processing",
-                    description="Processing follow-up LLM call with tool results"
-                ):
-                    tool_results = processed_response.get("tool_results", [])
-                    initial_message = llm_response["choices"][0]["message"]
-                    followup_message = {
-                        "role": "assistant",
-                        "tool_calls": initial_message.get("tool_calls", []),
-                        "content": initial_message.get("content", "")
-                    }
-                    followup_context = context + [followup_message] + tool_results
-                    final_response = await lmstudio_client.chat_completion(
-                        messages=followup_context,
-                        temperature=request.temperature,
-                        max_tokens=request.max_tokens,
-                        stream=False,
-                        debug_context=debug_context
-                    )
+            async with _maybe_trace(
+                tool_manager,
+                trace_id,
+                tool_name="followup_processor",
+                tool_type="internal",
+                step_type="processing",
+                description="Processing follow-up LLM call with tool results"
+            ):
+                tool_results = processed_response.get("tool_results", [])
+                followup_message = {
+                    "role": "assistant",
+                    "tool_calls": initial_message.get("tool_calls", []),
+                    "content": initial_message.get("content", "")
+                }
+                followup_context = [*context, followup_message, *tool_results]
+                final_response = await lmstudio_client.chat_completion(
+                    messages=followup_context,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    stream=False,
+                    debug_context=debug_context
+                )
 
-                    # Store followup debug step
-                    if debug_session:
-                        debug_persistence.store_debug_step(
-                            message_id=user_message.id,
-                            debug_session_id=debug_session.id,
-                            step_type="followup_processing",
-                            step_order=5,
-                            title="Follow-up Processing",
-                            description="Processing follow-up LLM call with tool results",
-                            success=True,
-                            input_data={"tool_results_count": len(tool_results)},
-                            output_data={"final_response_token_usage": final_response.get("usage")}
-                        )
+                # Store followup debug step
+                if debug_session_id is not None:
+                    add_debug_step(
+                        message_id=user_message_id,
+                        debug_session_id=debug_session_id,
+                        step_type="followup_processing",
+                        step_order=5,
+                        title="Follow-up Processing",
+                        description="Processing follow-up LLM call with tool results",
+                        success=True,
+                        input_data={"tool_results_count": len(tool_results)},
+                        output_data={"final_response_token_usage": final_response.get("usage")}
+                    )
 
         # Extract response content
         final_message = final_response["choices"][0]["message"]
@@ -408,99 +458,112 @@ async def chat_with_debug_tracing(
         if not response_content and final_message.get("tool_calls"):
             response_content = "[Tool calls executed - see tool results above]"
 
-        # Store assistant message
         processing_time = time.time() - start_time
-        assistant_message = conv_manager.add_message(
-            conversation.id,
-            "assistant",
-            response_content,
-            metadata={
-                "model_used": settings.lmstudio_model,
-                "temperature": request.temperature or settings.default_temperature,
-                "processing_time": processing_time,
-                "token_count": final_response.get("usage", {}).get("total_tokens"),
-                "mcp_tools_available": len(available_tools),
-                "tool_calls_made": len(processed_response.get("tool_results", [])),
-                "trace_id": trace_id if trace_id else None
-            }
-        )
 
-        # Mark assistant message as debug-enabled if tracing is on
-        if request.enable_tool_trace:
-            assistant_message.debug_enabled = True
-            db.commit()
+        # Store the reply, build its schema and queue memory extraction in one worker
+        # thread; the schema is built before the queueing commit expires the message
+        def finish_chat():
+            # Store assistant message, debug-enabled if tracing is on
+            assistant_message = conv_manager.add_message(
+                conversation_id,
+                "assistant",
+                response_content,
+                metadata={
+                    "model_used": settings.lmstudio_model,
+                    "temperature": request.temperature or settings.default_temperature,
+                    "processing_time": processing_time,
+                    "token_count": final_response.get("usage", {}).get("total_tokens"),
+                    "mcp_tools_available": len(available_tools),
+                    "tool_calls_made": len(processed_response.get("tool_results", [])),
+                    "trace_id": trace_id
+                },
+                debug_enabled=request.enable_tool_trace
+            )
+
+            # Attach debug data to the message straight from the buffer
+            if request.enable_tool_trace and debug_session_id is not None:
+                message_schema = debug_processor.build_debug_message_schema(
+                    assistant_message,
+                    sorted(pending_debug_steps, key=lambda step: step["step_order"]),
+                    pending_llm_requests[-1] if pending_llm_requests else None
+                )
+            else:
+                # Convert SQLAlchemy Message model to Pydantic Message model for serialization
+                message_schema = MessageSchema.model_validate(assistant_message)
+
+                # Set debug_enabled flag when debug is requested
+                if request.enable_tool_trace:
+                    message_schema.debug_enabled = True
+
+            # Queue memory extraction for the worker pool
+            if request.user_id:
+                try:
+                    enqueue_memory_extraction(
+                        db,
+                        request.user_id,
+                        request.message,
+                        response_content,
+                        conversation_id
+                    )
+                except Exception as e:
+                    logger.exception("Failed to queue memory extraction: %s", e)
+                    db.rollback()
+            return message_schema
+
+        message_schema = await asyncio.to_thread(finish_chat)
 
         # Finalize trace
         trace = None
         if trace_id:
             trace = tool_manager.finalize_trace(trace_id)
 
-        # Background memory extraction
-        if request.user_id:
-            background_tasks.add_task(
-                extract_and_store_enhanced_memories,
-                request.user_id,
-                request.message,
-                response_content,
-                conversation.id,
-                enhanced_memory
-            )
-
-        # Process debug data using the debug data processor
-        if request.enable_tool_trace and debug_session:
-            # Wait a moment for the database to be updated
-            import asyncio
-            await asyncio.sleep(0.1)
-            
-            # Ensure debug data completeness for this message
-            debug_processor.ensure_debug_data_completeness(assistant_message.id)
-            
-            # Process and attach debug data to the message
-            message_schema = debug_processor.process_debug_data_for_message(assistant_message)
-            
-            logger.info(f"Processed debug data for message {assistant_message.id} using DebugDataProcessor")
-        else:
-            # Convert SQLAlchemy Message model to Pydantic Message model for serialization
-            message_schema = MessageSchema.model_validate(assistant_message)
-            
-            # Set debug_enabled flag when debug is requested
-            if request.enable_tool_trace:
-                message_schema.debug_enabled = True
-
-        return ChatResponseWithDebug(
+        # Every field is already a validated model or a value of the declared type
+        response = _orjson_response(ChatResponseWithDebug.model_construct(
             message=message_schema,
-            conversation_id=conversation.id,
+            conversation_id=conversation_id,
             processing_time=processing_time,
             token_count=final_response.get("usage", {}).get("total_tokens"),
             tool_trace=trace,
-            debug_enabled=request.enable_tool_trace,
-            # Debug response fields based on processed message
-            total_steps=len(message_schema.intermediary_steps or []),
-            successful_steps=len([s for s in (message_schema.intermediary_steps or []) if s.get("success", True)]),
-            failed_steps=len([s for s in (message_schema.intermediary_steps or []) if not s.get("success", True)]),
-            tools_used=processed_response.get("tool_results", [])
-        )
+            debug_enabled=request.enable_tool_trace
+        ))
+
+        # Write the buffered debug data once the response has been sent
+        if pending_debug_steps or pending_llm_requests:
+            background_tasks.add_task(store_debug_data, pending_debug_steps[:], pending_llm_requests[:])
+            pending_debug_steps.clear()
+            pending_llm_requests.clear()
+        return response
 
+    except HTTPException:
+        raise
     except TimeoutException as e:
-        logger.error(f"LMStudio timeout error: {e}")
-        if trace_id:
-            tool_manager.finalize_trace(trace_id)
+        logger.exception("LMStudio timeout error: %s", e)
+        try:
+            await asyncio.to_thread(flush_debug_steps)
+        except Exception as flush_error:
+            logger.exception("Failed to store debug steps: %s", flush_error)
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
             detail="LMStudio timeout - please try again"
         )
     except Exception as e:
-        logger.error(f"Debug chat error: {e}")
-        if trace_id:
-            tool_manager.finalize_trace(trace_id)
+        logger.exception("Debug chat error: %s", e)
+        try:
+            await asyncio.to_thread(flush_debug_steps)
+        except Exception as flush_error:
+            logger.exception("Failed to store debug steps: %s", flush_error)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Chat processing failed: {str(e)}"
         )
+    finally:
+        # Finalizing is a no-op once done, so this only catches paths that bailed out early
+        if trace_id:
+            tool_manager.finalize_trace(trace_id)
 
 # Debug data persistence endpoints
 @debug_router.get("/conversations/{conversation_id}/data", response_model=DebugDataResponse)
-async def get_conversation_debug_data(
+def get_conversation_debug_data(
     conversation_id: int,
     user_id: int,
     db: Session = Depends(get_db),
@@ -510,25 +573,48 @@ async def get_conversation_debug_data(
     try:
         debug_data = debug_persistence.get_conversation_debug_data(conversation_id, user_id)
 
-        return DebugDataResponse(
+        return _orjson_response(DebugDataResponse.model_construct(
             conversation_id=conversation_id,
             has_debug_data=len(debug_data["messages"]) > 0,
             debug_data=debug_data
-        )
+        ))
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Failed to get debug data: {e}")
+        logger.exception("Failed to get debug data: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get debug data: {str(e)}"
         )
 
+@debug_router.get("/conversations/{conversation_id}/data/stream")
+def stream_conversation_debug_data(
+    conversation_id: int,
+    user_id: int,
+    db: Session = Depends(get_db),
+    debug_persistence: DebugPersistenceManager = Depends(get_debug_persistence_manager)
+):
+    """Stream persistent debug data for a conversation as NDJSON, one message per line"""
+    try:
+        lines = debug_persistence.iter_conversation_debug_data(conversation_id, user_id)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.exception("Failed to stream debug data: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to stream debug data: {str(e)}"
+        )
+
 @debug_router.get("/conversations/{conversation_id}/summary")
-async def get_conversation_debug_summary(
+def get_conversation_debug_summary(
     conversation_id: int,
     user_id: int,
     db: Session = Depends(get_db),
@@ -539,14 +625,14 @@ async def get_conversation_debug_summary(
         summary = debug_persistence.get_debug_session_summary(conversation_id, user_id)
         return {"success": True, "data": summary}
     except Exception as e:
-        logger.error(f"Failed to get debug summary: {e}")
+        logger.exception("Failed to get debug summary: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get debug summary: {str(e)}"
         )
 
 @debug_router.get("/users/{user_id}/preference")
-async def get_user_debug_preference(
+def get_user_debug_preference(
     user_id: int,
     db: Session = Depends(get_db),
     debug_persistence: DebugPersistenceManager = Depends(get_debug_persistence_manager)
@@ -556,14 +642,14 @@ async def get_user_debug_preference(
         enabled = debug_persistence.get_user_debug_preference(user_id)
         return {"success": True, "data": {"enabled": enabled}}
     except Exception as e:
-        logger.error(f"Failed to get debug preference: {e}")
+        logger.exception("Failed to get debug preference: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get debug preference: {str(e)}"
         )
 
 @debug_router.post("/users/{user_id}/preference")
-async def set_user_debug_preference(
+def set_user_debug_preference(
     user_id: int,
     preference: DebugPreferenceUpdate,
     db: Session = Depends(get_db),
@@ -572,8 +658,7 @@ async def set_user_debug_preference(
     """Set user's debug mode preference"""
     try:
         # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        if not db.scalar(_USER_EXISTS, {"user_id": user_id}):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
@@ -584,14 +669,14 @@ async def set_user_debug_preference(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to set debug preference: {e}")
+        logger.exception("Failed to set debug preference: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to set debug preference: {str(e)}"
         )
 
 @debug_router.post("/sessions/{session_id}/end")
-async def end_debug_session(
+def end_debug_session(
     session_id: str,
     db: Session = Depends(get_db),
     debug_persistence: DebugPersistenceManager = Depends(get_debug_persistence_manager)
@@ -609,14 +694,14 @@ async def end_debug_session(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to end debug session: {e}")
+        logger.exception("Failed to end debug session: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to end debug session: {str(e)}"
         )
 
 @debug_router.post("/cleanup")
-async def cleanup_old_debug_data(
+def cleanup_old_debug_data(
     days_old: int = 30,
     db: Session = Depends(get_db),
     debug_persistence: DebugPersistenceManager = Depends(get_debug_persistence_manager)
@@ -626,39 +711,56 @@ async def cleanup_old_debug_data(
         count = debug_persistence.cleanup_old_debug_data(days_old)
         return {"success": True, "message": f"Cleaned up {count} old debug records"}
     except Exception as e:
-        logger.error(f"Failed to cleanup debug data: {e}")
+        logger.exception("Failed to cleanup debug data: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to cleanup debug data: {str(e)}"
         )
 
+@debug_router.post("/mcp/cache/invalidate")
+async def invalidate_mcp_tool_cache():
+    """Drop the cached MCP tool list so the next request rebuilds it"""
+    invalidate_mcp_tools_cache()
+    tools, _ = get_cached_mcp_tools()
+    return {"success": True, "message": f"MCP tool cache rebuilt with {len(tools)} tools"}
+
 # Existing endpoints (keep all existing functionality)
+async def _verify_conversation_ownership(db: AsyncSession, conversation_id: int, user_id: int) -> bool:
+    """Check that a conversation belongs to a user, from the owner cache when possible"""
+    owner_id = get_cached_conversation_owner(conversation_id)
+    if owner_id is not None:
+        return owner_id == user_id
+    owned = await db.scalar(
+        _CONVERSATION_OWNED, {"conversation_id": conversation_id, "user_id": user_id}
+    )
+    if owned:
+        cache_conversation_owner(conversation_id, user_id)
+    return owned
+
 @debug_router.get("/conversations/{conversation_id}/tool-usage", response_model=ToolUsageAnalytics)
 async def get_tool_usage_analytics(
     conversation_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     tool_manager: ToolUsageManager = Depends(get_tool_usage_manager)
 ):
     """Get comprehensive tool usage analytics for a conversation"""
     try:
-        # Verify conversation belongs to user
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id == user_id
-        ).first()
-
-        if not conversation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found"
-            )
-
-        analytics = tool_manager.get_analytics(conversation_id)
+        # The owner's traces prove ownership; only hit the database without them
+        analytics = tool_manager.get_analytics_for_owner(conversation_id, user_id)
+        if analytics is None:
+            if not await _verify_conversation_ownership(db, conversation_id, user_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Conversation not found"
+                )
+            analytics = tool_manager.get_analytics(conversation_id)
         return analytics
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to get tool usage analytics: {e}")
+        logger.exception("Failed to get tool usage analytics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get analytics: {str(e)}"
@@ -669,28 +771,27 @@ async def get_conversation_tool_traces(
     conversation_id: int,
     user_id: int,
     limit: int = 10,
-    db: Session = Depends(get_db),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     tool_manager: ToolUsageManager = Depends(get_tool_usage_manager)
 ):
-    """Get tool usage traces for a conversation"""
+    """Get tool usage traces for a conversation, newest first, a page at a time"""
     try:
-        # Verify conversation belongs to user
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id == user_id
-        ).first()
-
-        if not conversation:
+        # The owner's traces prove ownership; only hit the database without them
+        traces, next_cursor = tool_manager.get_conversation_trace_page(
+            conversation_id, min(limit, MAX_TRACE_PAGE_SIZE), user_id=user_id, before=cursor
+        )
+        if not traces and not await _verify_conversation_ownership(db, conversation_id, user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Conversation not found"
             )
+        return _trace_page_response(traces, next_cursor)
 
-        traces = tool_manager.get_conversation_traces(conversation_id, limit)
-        return traces
-
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to get tool traces: {e}")
+        logger.exception("Failed to get tool traces: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get traces: {str(e)}"
@@ -700,79 +801,122 @@ async def get_conversation_tool_traces(
 async def get_user_tool_traces(
     user_id: int,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    cursor: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     tool_manager: ToolUsageManager = Depends(get_tool_usage_manager)
 ):
-    """Get tool usage traces for a user"""
+    """Get tool usage traces for a user, newest first, a page at a time"""
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        # Traces imply the user exists; only hit the database without them
+        traces, next_cursor = tool_manager.get_user_trace_page(
+            user_id, min(limit, MAX_TRACE_PAGE_SIZE), before=cursor
+        )
+        if not traces and not await db.scalar(_USER_EXISTS, {"user_id": user_id}):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        return _trace_page_response(traces, next_cursor)
 
-        traces = tool_manager.get_user_traces(user_id, limit)
-        return traces
-
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to get user traces: {e}")
+        logger.exception("Failed to get user traces: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get traces: {str(e)}"
         )
 
+# User and active conversation counts for system-info; dashboard polling does not
+# need them fresher than every half minute
+SYSTEM_COUNTS_TTL_SECONDS = 30.0
+_system_counts_cache: Dict[str, Any] = {"timestamp": 0.0, "counts": None}
+_SYSTEM_COUNTS = select(
+    select(func.count(User.id)).scalar_subquery().label("total_users"),
+    select(func.count(Conversation.id)).where(
+        Conversation.is_active == True
+    ).scalar_subquery().label("active_conversations")
+)
+
+async def _get_system_counts(db: AsyncSession) -> Tuple[int, int]:
+    """Count users and active conversations in one round trip, cached briefly"""
+    now = time.monotonic()
+    if _system_counts_cache["counts"] is None or now - _system_counts_cache["timestamp"] >= SYSTEM_COUNTS_TTL_SECONDS:
+        counts = (await db.execute(_SYSTEM_COUNTS)).one()
+        _system_counts_cache["counts"] = (counts.total_users, counts.active_conversations)
+        _system_counts_cache["timestamp"] = now
+    return _system_counts_cache["counts"]
+
+def _get_mcp_server_status() -> List[Dict[str, Any]]:
+    """Summarize MCP server status, or an empty list when it is unavailable"""
+    try:
+        from mcp_integration import mcp_manager
+        if not mcp_manager:
+            return []
+        return [
+            {
+                "server_id": server_id,
+                "status": status_info["status"],
+                "tools_count": status_info["tools_count"],
+                "last_seen": status_info.get("last_seen", "unknown")
+            }
+            for server_id, status_info in mcp_manager.get_server_status().items()
+        ]
+    except Exception as e:
+        logger.exception("Failed to get MCP status: %s", e)
+        return []
+
 @debug_router.get("/system-info", response_model=SystemDebugInfo)
 async def get_system_debug_info(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     tool_manager: ToolUsageManager = Depends(get_tool_usage_manager)
 ):
     """Get comprehensive system debug information"""
     try:
         # Get system status
-        lmstudio_connected = await lmstudio_client.health_check()
-        total_users = db.query(func.count(User.id)).scalar()
-        active_conversations = db.query(func.count(Conversation.id)).filter(
-            Conversation.is_active == True
-        ).scalar()
-
-        # Get MCP status
-        mcp_servers = []
+        lmstudio_connected, counts = await asyncio.gather(
+            lmstudio_client.health_check(),
+            _get_system_counts(db),
+            return_exceptions=True
+        )
+        if isinstance(lmstudio_connected, BaseException):
+            logger.error("LMStudio health check failed: %s", lmstudio_connected, exc_info=lmstudio_connected)
+            lmstudio_connected = False
+
+        database_connected = not isinstance(counts, BaseException)
+        if database_connected:
+            total_users, active_conversations = counts
+        else:
+            logger.error("Failed to count users and conversations: %s", counts, exc_info=counts)
+            total_users = active_conversations = 0
+
+        # The remaining sections are in-memory reads; each falls back on its own
+        mcp_servers = _get_mcp_server_status()
+
         try:
-            from mcp_integration import mcp_manager
-            if mcp_manager:
-                mcp_status = mcp_manager.get_server_status()
-                mcp_servers = [
-                    {
-                        "server_id": server_id,
-                        "status": status_info["status"],
-                        "tools_count": status_info["tools_count"],
-                        "last_seen": status_info.get("last_seen", "unknown")
-                    }
-                    for server_id, status_info in mcp_status.items()
-                ]
+            available_tools, _ = get_cached_mcp_tools()
+            tool_list = [
+                {
+                    "name": tool.get("function", {}).get("name", "unknown"),
+                    "server_id": tool.get("mcp_server_id", "unknown"),
+                    "description": tool.get("function", {}).get("description", "")
+                }
+                for tool in available_tools
+            ]
         except Exception as e:
-            logger.error(f"Failed to get MCP status: {e}")
+            logger.exception("Failed to list available tools: %s", e)
+            tool_list = []
 
-        # Get available tools
-        available_tools = get_mcp_tools_for_assistant()
-        tool_list = [
-            {
-                "name": tool.get("function", {}).get("name", "unknown"),
-                "server_id": tool.get("mcp_server_id", "unknown"),
-                "description": tool.get("function", {}).get("description", "")
-            }
-            for tool in available_tools
-        ]
-
-        # Get tool usage debug info
-        tool_debug_info = tool_manager.get_system_debug_info()
+        try:
+            tool_debug_info = tool_manager.get_system_debug_info()
+        except Exception as e:
+            logger.exception("Failed to get tool usage debug info: %s", e)
+            tool_debug_info = {}
 
-        return SystemDebugInfo(
+        return _orjson_response(SystemDebugInfo(
             system_status={
                 "lmstudio_connected": lmstudio_connected,
-                "database_connected": True,
+                "database_connected": database_connected,
                 "total_users": total_users,
                 "active_conversations": active_conversations,
                 "api_version": settings.api_version
@@ -786,77 +930,94 @@ async def get_system_debug_info(
                 "success_rate": 0
             },
             recent_errors=[]
-        )
+        ))
 
     except Exception as e:
-        logger.error(f"Failed to get system debug info: {e}")
+        logger.exception("Failed to get system debug info: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get debug info: {str(e)}"
         )
 
 # Debug script endpoints (keep existing functionality)
-def get_debug_scripts() -> List[DebugScript]:
-    """Get list of available debug scripts"""
-    scripts = []
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # Define known debug scripts with descriptions
-    known_scripts = {
-        "verify_memory_system.py": {
-            "description": "Verify that all memory aspects are working correctly",
-            "type": "verify"
-        },
-        "enhanced_verify_memory_system.py": {
-            "description": "Verify that all memory aspects are working correctly",
-            "type": "verify"
-        },
-        "verify_admin_implementation.py": {
-            "description": "Verify admin functionality implementation",
-            "type": "verify"
-        },
-        "check_memory_status.py": {
-            "description": "Check the status of the memory system",
-            "type": "check"
-        },
-        "debug_mcp.py": {
-            "description": "Debug MCP functionality",
-            "type": "debug"
-        },
-        "test_mcp.py": {
-            "description": "Test MCP functionality",
-            "type": "test"
-        },
-        "test_filesystem_server.py": {
-            "description": "Test filesystem server functionality",
-            "type": "test"
-        },
-        "test_mcp_fix.py": {
-            "description": "Test MCP fixes",
-            "type": "test"
-        },
-        "enhanced_migration.py": {
-            "description": "Run enhanced database migration",
-            "type": "migration"
-        },
-        "memory_system_test.py": {
-            "description": "Test memory system functionality",
-            "type": "test"
-        }
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Known debug scripts with descriptions; "inproc" scripts are quick, trusted checks
+# that run inside the API process instead of a worker
+KNOWN_DEBUG_SCRIPTS = {
+    "verify_memory_system.py": {
+        "description": "Verify that all memory aspects are working correctly",
+        "type": "verify"
+    },
+    "enhanced_verify_memory_system.py": {
+        "description": "Verify that all memory aspects are working correctly",
+        "type": "verify"
+    },
+    "verify_admin_implementation.py": {
+        "description": "Verify admin functionality implementation",
+        "type": "verify",
+        "inproc": True  # Only checks files on disk, safe to run in the API process
+    },
+    "check_memory_status.py": {
+        "description": "Check the status of the memory system",
+        "type": "check"
+    },
+    "debug_mcp.py": {
+        "description": "Debug MCP functionality",
+        "type": "debug"
+    },
+    "test_mcp.py": {
+        "description": "Test MCP functionality",
+        "type": "test"
+    },
+    "test_filesystem_server.py": {
+        "description": "Test filesystem server functionality",
+        "type": "test"
+    },
+    "test_mcp_fix.py": {
+        "description": "Test MCP fixes",
+        "type": "test"
+    },
+    "enhanced_migration.py": {
+        "description": "Run enhanced database migration",
+        "type": "migration"
+    },
+    "memory_system_test.py": {
+        "description": "Test memory system functionality",
+        "type": "test"
     }
-
-    # Find all Python files that match known debug scripts
-    for script_name, script_info in known_scripts.items():
-        script_path = os.path.join(script_dir, script_name)
-        if os.path.exists(script_path):
-            scripts.append(DebugScript(
+}
+
+# Available scripts by name, rebuilt when the script directory changes
+_debug_scripts_cache: Dict[str, DebugScript] = {}
+_debug_scripts_dir_mtime: Optional[float] = None
+
+def get_debug_scripts_by_name() -> Dict[str, DebugScript]:
+    """Get available debug scripts keyed by name"""
+    global _debug_scripts_cache, _debug_scripts_dir_mtime
+    dir_mtime = os.stat(SCRIPT_DIR).st_mtime
+    if dir_mtime != _debug_scripts_dir_mtime:
+        # Find all Python files that match known debug scripts, in one directory read
+        with os.scandir(SCRIPT_DIR) as entries:
+            present = {entry.name: entry.path for entry in entries if entry.name in KNOWN_DEBUG_SCRIPTS}
+        scripts = {
+            script_name: DebugScript(
                 name=script_name,
                 description=script_info["description"],
                 type=script_info["type"],
-                path=script_path
-            ))
+                path=present[script_name]
+            )
+            for script_name, script_info in KNOWN_DEBUG_SCRIPTS.items()
+            if script_name in present
+        }
+        _debug_scripts_cache = scripts
+        _debug_scripts_dir_mtime = dir_mtime
 
-    return scripts
+    return _debug_scripts_cache
+
+def get_debug_scripts() -> List[DebugScript]:
+    """Get list of available debug scripts"""
+    return list(get_debug_scripts_by_name().values())
 
 @debug_router.get("/scripts", response_model=List[DebugScript])
 async def list_debug_scripts():
@@ -865,7 +1026,7 @@ async def list_debug_scripts():
         scripts = get_debug_scripts()
         return scripts
     except Exception as e:
-        logger.error(f"Failed to list debug scripts: {e}")
+        logger.exception("Failed to list debug scripts: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to list debug scripts: {str(e)}"
@@ -877,11 +1038,8 @@ async def run_debug_script(script_name: str):
     start_time = time.time()
 
     try:
-        # Get all available scripts
-        scripts = get_debug_scripts()
-
         # Find the requested script
-        script = next((s for s in scripts if s.name == script_name), None)
+        script = get_debug_scripts_by_name().get(script_name)
         if not script:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -889,7 +1047,8 @@ async def run_debug_script(script_name: str):
             )
 
         # Run the script
-        result = await execute_script(script.path)
+        inproc = KNOWN_DEBUG_SCRIPTS.get(script_name, {}).get("inproc", False)
+        result = await execute_script(script.path, inproc=inproc)
 
         execution_time = time.time() - start_time
         return DebugScriptResult(
@@ -902,7 +1061,7 @@ async def run_debug_script(script_name: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to run debug script {script_name}: {e}")
+        logger.exception("Failed to run debug script %s: %s", script_name, e)
         execution_time = time.time() - start_time
         return DebugScriptResult(
             script_name=script_name,
@@ -912,7 +1071,11 @@ async def run_debug_script(script_name: str):
             execution_time=execution_time
         )
 
-async def execute_script(script_path: str) -> Dict[str, Any]:
+async def execute_script(
+    script_path: str,
+    timeout: float = SCRIPT_TIMEOUT_SECONDS,
+    inproc: bool = False
+) -> Dict[str, Any]:
     """Execute a Python script and return the result"""
     try:
         # Check if script exists
@@ -923,29 +1086,30 @@ async def execute_script(script_path: str) -> Dict[str, Any]:
                 "error": f"Script not found: {script_path}"
             }
 
-        # Run the script as a subprocess and capture output
-        process = await asyncio.create_subprocess_exec(
-            sys.executable, script_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        stdout, stderr = await process.communicate()
-
-        if process.returncode == 0:
+        # Run trusted scripts in-process, others (and trusted ones while the
+        # in-process thread is busy) in a pre-warmed worker, falling back to
+        # a fresh interpreter
+        result = await run_script_inproc(script_path, timeout) if inproc else None
+        if result is None:
+            result = await run_script(script_path, timeout)
+        if result is None:
+            result = await run_script_subprocess(script_path, timeout)
+        returncode, stdout, stderr = result["returncode"], result["stdout"], result["stderr"]
+
+        if returncode == 0:
             return {
                 "success": True,
-                "output": stdout.decode(),
+                "output": stdout,
                 "error": None
             }
         else:
             return {
                 "success": False,
-                "output": stdout.decode(),
-                "error": stderr.decode()
+                "output": stdout,
+                "error": stderr
             }
     except Exception as e:
-        logger.error(f"Script execution error: {e}")
+        logger.exception("Script execution error: %s", e)
         return {
             "success": False,
             "output": "",
@@ -954,7 +1118,7 @@ async def execute_script(script_path: str) -> Dict[str, Any]:
 
 # Debug data migration endpoint
 @debug_router.post("/migrate-debug-data")
-async def migrate_debug_data(
+def migrate_debug_data(
     conversation_id: Optional[int] = None,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
@@ -980,7 +1144,7 @@ async def migrate_debug_data(
                 "message": f"Migrated debug data for {fixed_count} messages across all conversations"
             }
     except Exception as e:
-        logger.error(f"Failed to migrate debug data: {e}")
+        logger.exception("Failed to migrate debug data: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to migrate debug data: {str(e)}"
@@ -995,12 +1159,112 @@ async def extract_and_store_enhanced_memories(
     conversation_id: int,
     enhanced_memory: EnhancedMemoryManager
 ):
-    """Enhanced background task to extract and store facts and memories"""
+    """Enhanced background task to extract and store facts and memories with deduplication"""
     try:
         memories = await enhanced_memory.extract_and_store_facts(
             user_id, user_message, assistant_response, conversation_id
         )
         if memories:
-            logger.info(f"Stored {len(memories)} enhanced memories for user {user_id}")
+            logger.info("Stored %s enhanced memories for user %s", len(memories), user_id)
+
+            # Trigger memory consolidation periodically
+            if len(memories) > 3:  # If we stored many memories, consolidate
+                try:
+                    # Consolidate if we have many memories
+                    total_memories = len(enhanced_memory.original_manager.get_user_memories(user_id))
+                    if total_memories > 50:
+                        enhanced_memory.original_manager.consolidate_memories(user_id)
+                        logger.info("Consolidated memories for user %s", user_id)
+                except Exception as e:
+                    logger.exception("Failed to consolidate memories: %s", e)
     except Exception as e:
-        logger.error(f"Failed to extract enhanced memories: {e}")
+        logger.exception("Failed to extract enhanced memories: %s", e)
+
+
+# Memory extraction worker pool; jobs are persisted so a restart doesn't drop them
+MEMORY_WORKER_COUNT = 4
+
+_memory_queue: Optional[asyncio.Queue] = None
+_memory_loop: Optional[asyncio.AbstractEventLoop] = None  # Owns _memory_queue; jobs may be queued from worker threads
+_memory_workers: List[asyncio.Task] = []
+
+
+async def _memory_worker():
+    """Process queued memory extraction jobs using a dedicated session per job"""
+    while True:
+        job_id = await _memory_queue.get()
+        db = get_db_direct()
+        try:
+            job = db.get(MemoryExtractionJob, job_id)
+            if job:
+                await extract_and_store_enhanced_memories(
+                    job.user_id, job.user_message, job.assistant_response, job.conversation_id,
+                    EnhancedMemoryManager(db)
+                )
+                # Extraction swallows its own errors; start the delete from a clean transaction
+                db.rollback()
+                db.query(MemoryExtractionJob).filter(MemoryExtractionJob.id == job_id).delete()
+                db.commit()
+        except Exception as e:
+            logger.exception("Memory extraction job %s failed: %s", job_id, e)
+        finally:
+            db.close()
+            _memory_queue.task_done()
+
+
+def enqueue_memory_extraction(
+    db: Session,
+    user_id: int,
+    user_message: str,
+    assistant_response: str,
+    conversation_id: int
+):
+    """Persist a memory extraction job and hand it to the worker pool"""
+    job = MemoryExtractionJob(
+        user_id=user_id,
+        conversation_id=conversation_id,
+        user_message=user_message,
+        assistant_response=assistant_response
+    )
+    db.add(job)
+    db.flush()
+    job_id = job.id
+    db.commit()
+
+    # Without a running pool the job waits in the table for the next startup
+    queue, loop = _memory_queue, _memory_loop
+    if queue is not None:
+        loop.call_soon_threadsafe(queue.put_nowait, job_id)
+
+
+async def start_memory_workers():
+    """Start the memory extraction worker pool, resuming jobs left from a previous run"""
+    global _memory_queue, _memory_loop
+    if _memory_workers:
+        return
+    _memory_queue = asyncio.Queue()
+    _memory_loop = asyncio.get_running_loop()
+
+    db = get_db_direct()
+    try:
+        pending = [job_id for (job_id,) in db.query(MemoryExtractionJob.id).order_by(MemoryExtractionJob.id)]
+    finally:
+        db.close()
+    for job_id in pending:
+        _memory_queue.put_nowait(job_id)
+    if pending:
+        logger.info("Resuming %s pending memory extraction jobs", len(pending))
+
+    for _ in range(MEMORY_WORKER_COUNT):
+        _memory_workers.append(asyncio.create_task(_memory_worker()))
+    logger.info("Started %s memory extraction workers", MEMORY_WORKER_COUNT)
+
+
+async def stop_memory_workers():
+    """Stop the memory extraction worker pool; unprocessed jobs stay persisted"""
+    global _memory_queue
+    for worker in _memory_workers:
+        worker.cancel()
+    await asyncio.gather(*_memory_workers, return_exceptions=True)
+    _memory_workers.clear()
+    _memory_queue = None
@@ -2,13 +2,18 @@
 Development utilities and scripts
 """
 import asyncio
-import json
+import orjson
+from itertools import groupby
 from datetime import datetime, timedelta
+from sqlalchemy import desc, func
 from database import get_db_session
 from models import User, Conversation, Message, UserMemory
 from memory_manager import MemoryManager
 from conversation_manager import ConversationManager
 
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 500
+
 
 def create_sample_data():
     """Create sample data for development/testing"""
@@ -89,40 +94,27 @@ def create_sample_data():
 def analyze_memory_patterns():
     """Analyze memory patterns in the database"""
     with get_db_session() as db:
-        memories = db.query(UserMemory).all()
-        
-        # Group by memory type
-        type_counts = {}
-        confidence_stats = {}
-        
-        for memory in memories:
-            # Count by type
-            if memory.memory_type not in type_counts:
-                type_counts[memory.memory_type] = 0
-            type_counts[memory.memory_type] += 1
-            
-            # Confidence stats
-            if memory.memory_type not in confidence_stats:
-                confidence_stats[memory.memory_type] = []
-            confidence_stats[memory.memory_type].append(memory.confidence)
+        # Count and average confidence per memory type, aggregated by the database
+        type_stats = db.query(
+            UserMemory.memory_type,
+            func.count(UserMemory.id),
+            func.avg(UserMemory.confidence)
+        ).group_by(UserMemory.memory_type).order_by(UserMemory.memory_type).all()
         
         print("📊 Memory Analysis")
         print("=================")
         
-        for mem_type, count in type_counts.items():
-            avg_confidence = sum(confidence_stats[mem_type]) / len(confidence_stats[mem_type])
-            print(f"{mem_type.capitalize()}: {count} entries, avg confidence: {avg_confidence:.2f}")
+        for mem_type, count, avg_confidence in type_stats:
+            print(f"{mem_type.capitalize()}: {count} entries, avg confidence: {avg_confidence or 0:.2f}")
         
         # Most common keys
-        key_counts = {}
-        for memory in memories:
-            if memory.key not in key_counts:
-                key_counts[memory.key] = 0
-            key_counts[memory.key] += 1
+        key_count = func.count(UserMemory.id).label("key_count")
+        top_keys = db.query(UserMemory.key, key_count).group_by(
+            UserMemory.key
+        ).order_by(desc(key_count), UserMemory.key).limit(10).all()
         
         print("\n🔑 Most Common Memory Keys:")
-        sorted_keys = sorted(key_counts.items(), key=lambda x: x[1], reverse=True)
-        for key, count in sorted_keys[:10]:
+        for key, count in top_keys:
             print(f"  {key}: {count}")
 
 
@@ -168,7 +160,7 @@ def simulate_conversation():
 
 
 def export_user_data(user_id: int, filename: str = None):
-    """Export user data to JSON file"""
+    """Export user data to JSON file, streaming one conversation at a time"""
     if not filename:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"user_{user_id}_export_{timestamp}.json"
@@ -183,65 +175,80 @@ def export_user_data(user_id: int, filename: str = None):
         conversations = db.query(Conversation).filter(
             Conversation.user_id == user_id,
             Conversation.is_active == True
-        ).all()
-        
-        memories = db.query(UserMemory).filter(UserMemory.user_id == user_id).all()
-        
-        # Build export data
-        export_data = {
-            "user": {
+        ).order_by(Conversation.id).all()
+        
+        # Stream every conversation's messages from one query in conversation order,
+        # so only one conversation's messages are held at a time
+        messages = db.query(
+            Message.conversation_id,
+            Message.role,
+            Message.content,
+            Message.timestamp,
+            Message.processing_time
+        ).filter(
+            Message.conversation_id.in_([conv.id for conv in conversations])
+        ).order_by(Message.conversation_id, Message.timestamp, Message.id).yield_per(EXPORT_BATCH_SIZE)
+        message_groups = groupby(messages, key=lambda msg: msg.conversation_id)
+        next_group = next(message_groups, None)
+        
+        # Write each section as it is read; orjson serializes the datetimes itself
+        memory_count = 0
+        with open(filename, 'wb') as f:
+            f.write(b'{"user": ')
+            f.write(orjson.dumps({
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
                 "full_name": user.full_name,
-                "created_at": user.created_at.isoformat(),
-            },
-            "conversations": [],
-            "memories": []
-        }
-        
-        # Add conversations with messages
-        for conv in conversations:
-            messages = db.query(Message).filter(Message.conversation_id == conv.id).all()
+                "created_at": user.created_at,
+            }))
             
-            conv_data = {
-                "id": conv.id,
-                "title": conv.title,
-                "created_at": conv.created_at.isoformat(),
-                "updated_at": conv.updated_at.isoformat(),
-                "messages": [
-                    {
-                        "role": msg.role,
-                        "content": msg.content,
-                        "timestamp": msg.timestamp.isoformat(),
-                        "processing_time": msg.processing_time
-                    }
-                    for msg in messages
-                ]
-            }
-            export_data["conversations"].append(conv_data)
-        
-        # Add memories
-        for memory in memories:
-            memory_data = {
-                "memory_type": memory.memory_type,
-                "key": memory.key,
-                "value": memory.value,
-                "confidence": memory.confidence,
-                "source": memory.source,
-                "created_at": memory.created_at.isoformat(),
-                "access_count": memory.access_count
-            }
-            export_data["memories"].append(memory_data)
-        
-        # Write to file
-        with open(filename, 'w') as f:
-            json.dump(export_data, f, indent=2)
+            # Add conversations with messages
+            f.write(b',\n"conversations": [')
+            for index, conv in enumerate(conversations):
+                conv_messages = []
+                if next_group is not None and next_group[0] == conv.id:
+                    conv_messages = [
+                        {
+                            "role": msg.role,
+                            "content": msg.content,
+                            "timestamp": msg.timestamp,
+                            "processing_time": msg.processing_time
+                        }
+                        for msg in next_group[1]
+                    ]
+                    next_group = next(message_groups, None)
+                
+                f.write(b',\n' if index else b'\n')
+                f.write(orjson.dumps({
+                    "id": conv.id,
+                    "title": conv.title,
+                    "created_at": conv.created_at,
+                    "updated_at": conv.updated_at,
+                    "messages": conv_messages
+                }))
+            
+            # Add memories
+            f.write(b'],\n"memories": [')
+            memories = db.query(UserMemory).filter(UserMemory.user_id == user_id).yield_per(EXPORT_BATCH_SIZE)
+            for memory in memories:
+                f.write(b',\n' if memory_count else b'\n')
+                f.write(orjson.dumps({
+                    "memory_type": memory.memory_type,
+                    "key": memory.key,
+                    "value": memory.value,
+                    "confidence": memory.confidence,
+                    "source": memory.source,
+                    "created_at": memory.created_at,
+                    "access_count": memory.access_count
+                }))
+                memory_count += 1
+            f.write(b']}\n')
         
         print(f"✅ Exported user data to {filename}")
         print(f"   User: {user.username}")
-        print(f"   Conversations: {len(export_data['conversations'])}")
-        print(f"   Memories: {len(export_data['memories'])}")
+        print(f"   Conversations: {len(conversations)}")
+        print(f"   Memories: {memory_count}")
 
 
 def cleanup_test_data():
@@ -1,14 +1,14 @@
 """
 Enhanced Conversation Manager with Optimized Context Building and Tool Selection
 """
+import asyncio
 import json
 import logging
 import re
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
 
 from conversation_manager import ConversationManager as BaseConversationManager
-from mcp_integration import get_mcp_tools_for_assistant, handle_mcp_tool_call
+from mcp_integration import get_cached_mcp_tools, handle_mcp_tool_call
 from lmstudio_client import lmstudio_client
 
 logger = logging.getLogger(__name__)
@@ -17,11 +17,6 @@ logger = logging.getLogger(__name__)
 class EnhancedConversationManager(BaseConversationManager):
     """Enhanced conversation manager with optimized context building and tool selection"""
     
-    def __init__(self, db: Session):
-        super().__init__(db)
-        self.mcp_tools_cache = []
-        self.mcp_tools_last_updated = None
-    
     async def build_conversation_context(
         self,
         conversation_id: int,
@@ -64,19 +59,11 @@ class EnhancedConversationManager(BaseConversationManager):
         return context
     
     async def _get_available_mcp_tools(self) -> List[Dict[str, Any]]:
-        """Get available MCP tools with caching"""
+        """Get available MCP tools from the process-wide cache"""
         try:
-            # Simple cache mechanism - in production, you'd want more sophisticated caching
-            import time
-            current_time = time.time()
-            
-            if (self.mcp_tools_last_updated is None or 
-                current_time - self.mcp_tools_last_updated > 60):  # Cache for 1 minute
-                
-                self.mcp_tools_cache = get_mcp_tools_for_assistant()
-                self.mcp_tools_last_updated = current_time
-            
-            return self.mcp_tools_cache
+            # Managers are built per request, so the cache has to live outside the instance
+            available_tools, _ = get_cached_mcp_tools()
+            return available_tools
             
         except Exception as e:
             logger.error(f"Failed to get MCP tools: {e}")
@@ -110,11 +97,13 @@ class EnhancedConversationManager(BaseConversationManager):
         self, 
         user_message: str, 
         conversation_context: List[Dict],
-        max_tools: int = 5
+        max_tools: int = 5,
+        all_tools: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict]:
         """Select only relevant tools based on conversation context"""
         
-        all_tools = await self._get_available_mcp_tools()
+        if all_tools is None:
+            all_tools = await self._get_available_mcp_tools()
         
         if not all_tools:
             return []
@@ -224,7 +213,8 @@ Return only the numbers, nothing else."""
         conversation_id: int,
         user_id: int,
         max_messages: int = 20,
-        include_historical_context: bool = True
+        include_historical_context: bool = True,
+        available_tools: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
         """Build optimized context with structured information and relevant tools"""
         
@@ -248,28 +238,38 @@ Return only the numbers, nothing else."""
                     break
         
         # Get consolidated user profile
-        try:
-            from memory_manager import EnhancedMemoryManager
-            enhanced_memory = EnhancedMemoryManager(self.db)
-            user_profile = await enhanced_memory.get_consolidated_user_profile(user_id)
-        except Exception as e:
-            logger.error(f"Failed to get user profile: {e}")
-            user_profile = {}
-        
-        # Get relevant tools only
-        relevant_tools = await self.get_relevant_tools(current_message, context, max_tools=5)
+        async def get_user_profile() -> Dict[str, Any]:
+            try:
+                from memory_manager import EnhancedMemoryManager
+                enhanced_memory = EnhancedMemoryManager(self.db)
+                return await enhanced_memory.get_consolidated_user_profile(user_id)
+            except Exception as e:
+                logger.error(f"Failed to get user profile: {e}")
+                return {}
         
         # Get structured historical context
-        historical_context = {}
-        if include_historical_context:
+        async def get_historical_context() -> Dict[str, Any]:
+            if not include_historical_context:
+                return {}
             try:
                 from search_manager import SearchManager
                 search_manager = SearchManager(self.db)
-                historical_context = await search_manager.get_structured_historical_context(
+                return await search_manager.get_structured_historical_context(
                     user_id, current_message, limit=2
                 )
             except Exception as e:
                 logger.error(f"Failed to get historical context: {e}")
+                return {}
+        
+        # The profile, relevant tools and historical context are independent, and tool
+        # selection and historical insights may each wait on the LLM, so fetch them together
+        user_profile, relevant_tools, historical_context = await asyncio.gather(
+            get_user_profile(),
+            self.get_relevant_tools(
+                current_message, context, max_tools=5, all_tools=available_tools
+            ),
+            get_historical_context()
+        )
         
         # Build optimized system message
         system_content = self._build_structured_system_message(
@@ -350,16 +350,21 @@ Return only the numbers, nothing else."""
         conversation_id: int,
         user_id: int,
         max_messages: int = 50,
-        include_historical_context: bool = True
+        include_historical_context: bool = True,
+        available_tools: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
-        """Build conversation context specifically optimized for tool usage"""
+        """Build conversation context specifically optimized for tool usage.
+        
+        Pass available_tools when the caller already loaded them for the LLM request.
+        """
         
         # Use the new optimized context building
         return await self.build_optimized_context(
             conversation_id,
             user_id,
             max_messages,
-            include_historical_context
+            include_historical_context,
+            available_tools=available_tools
         )
     
     async def process_llm_response_with_tools(
@@ -370,11 +375,8 @@ Return only the numbers, nothing else."""
         """Process LLM response and handle tool calls"""
         
         # Check if the response contains tool calls
-        if "tool_calls" not in llm_response.get("choices", [{}])[0].get("message", {}):
-            return llm_response
-        
-        message = llm_response["choices"][0]["message"]
-        tool_calls = message.get("tool_calls", [])
+        message = llm_response.get("choices", [{}])[0].get("message", {})
+        tool_calls = message.get("tool_calls")
         
         if not tool_calls:
             return llm_response
@@ -14,6 +14,11 @@ from typing import Dict, Any, Optional, List, Union
 
 logger = logging.getLogger(__name__)
 
+# Compiled once; these run on every chat response and memory extraction
+_THINKING_BLOCK = re.compile(r'<think>(.*?)</think>', re.DOTALL | re.IGNORECASE)
+_EXTRA_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+_WHITESPACE = re.compile(r'\s+')
+
 
 class LLMResponseProcessor:
     """
@@ -35,15 +40,12 @@ class LLMResponseProcessor:
         if not text:
             return text
             
-        # Pattern to match <think>...</think> tags, including multi-line content
-        # Uses non-greedy matching to handle multiple think blocks
-        pattern = r'<think>.*?</think>'
-        
-        # Remove all thinking blocks
-        cleaned_text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
+        # Remove all <think>...</think> blocks, including multi-line content;
+        # non-greedy matching handles multiple think blocks
+        cleaned_text = _THINKING_BLOCK.sub('', text)
         
         # Clean up extra whitespace that might be left behind
-        cleaned_text = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned_text)  # Multiple newlines
+        cleaned_text = _EXTRA_BLANK_LINES.sub('\n\n', cleaned_text)  # Multiple newlines
         cleaned_text = cleaned_text.strip()
         
         return cleaned_text
@@ -146,8 +148,7 @@ class LLMResponseProcessor:
         if not text:
             return []
             
-        pattern = r'<think>(.*?)</think>'
-        matches = re.findall(pattern, text, flags=re.DOTALL | re.IGNORECASE)
+        matches = _THINKING_BLOCK.findall(text)
         
         return [match.strip() for match in matches]
     
@@ -165,7 +166,7 @@ class LLMResponseProcessor:
         if not text:
             return False
             
-        return bool(re.search(r'<think>.*?</think>', text, flags=re.DOTALL | re.IGNORECASE))
+        return bool(_THINKING_BLOCK.search(text))
     
     @staticmethod
     def process_summary_text(text: str) -> str:
@@ -182,7 +183,7 @@ class LLMResponseProcessor:
         
         # Additional cleaning for summary generation
         # Remove excessive whitespace and normalize
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+        cleaned_text = _WHITESPACE.sub(' ', cleaned_text)
         cleaned_text = cleaned_text.strip()
         
         return cleaned_text
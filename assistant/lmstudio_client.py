@@ -1,10 +1,15 @@
 """
 LMStudio Integration Client - Fixed with MCP Tool Support
 """
+import asyncio
+import copy
+import hashlib
 import httpx
 import json
 import logging
-from typing import Dict, Any, Optional, AsyncGenerator, List
+import orjson
+import socket
+from typing import Dict, Any, Optional, AsyncGenerator, List, Tuple
 from config import settings
 from llm_response_processor import LLMResponseProcessor, ThinkingModelHandler
 
@@ -18,7 +23,21 @@ class LMStudioClient:
         self.base_url = settings.lmstudio_base_url
         self.model = settings.lmstudio_model
         self.timeout = settings.lmstudio_timeout
-        self.client = httpx.AsyncClient(timeout=self.timeout)
+        # One pooled client for the app's lifetime so LLM calls reuse warm keep-alive
+        # connections; HTTP/2 is only negotiated when LMStudio sits behind TLS
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+                retries=1,
+                socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=5.0)
+        )
+        
+        # Identical non-streaming requests currently in flight, keyed by payload hash
+        self._inflight: Dict[bytes, Tuple[asyncio.Future, Dict[str, Any]]] = {}
         
         # Initialize thinking model handler
         self.thinking_handler = ThinkingModelHandler(enable_thinking_logs=False)
@@ -30,7 +49,7 @@ class LMStudioClient:
             response = await self.client.get(f"{self.base_url}/v1/models")
             return response.status_code == 200
         except Exception as e:
-            logger.error(f"LMStudio health check failed: {e}")
+            logger.error("LMStudio health check failed: %s", e)
             return False
     
     async def get_models(self) -> List[Dict[str, Any]]:
@@ -40,7 +59,7 @@ class LMStudioClient:
             response.raise_for_status()
             return response.json().get("data", [])
         except Exception as e:
-            logger.error(f"Failed to get models: {e}")
+            logger.error("Failed to get models: %s", e)
             return []
     
     async def chat_completion(
@@ -63,6 +82,10 @@ class LMStudioClient:
             "stream": stream
         }
         
+        # Follow-up calls resend the same conversation prefix; let the server skip re-evaluating it
+        if settings.lmstudio_cache_prompt:
+            payload["cache_prompt"] = True
+        
         # Add tools if provided (for MCP integration)
         if tools:
             payload["tools"] = tools
@@ -76,19 +99,45 @@ class LMStudioClient:
             debug_context['llm_request_timestamp'] = datetime.now().isoformat()
             debug_context['llm_request_messages_count'] = len(messages)
             debug_context['llm_request_tools_count'] = len(tools) if tools else 0
-            logger.info(f"LLM Request captured: {payload['model']} - {len(messages)} messages, {len(tools) if tools else 0} tools")
+            logger.info("LLM Request captured: %s - %s messages, %s tools", payload['model'], len(messages), len(tools) if tools else 0)
         
         try:
             if stream:
                 return await self._stream_completion(payload, debug_context)
+            elif settings.lmstudio_coalesce_requests and payload["temperature"] == 0:
+                # Sampled replies must stay independent, so only greedy requests are shared
+                return await self._coalesced_completion(payload, debug_context)
             else:
                 return await self._single_completion(payload, debug_context)
         except Exception as e:
-            logger.error(f"Chat completion failed: {e}")
+            logger.error("Chat completion failed: %s", e)
             if debug_context:
                 debug_context['llm_request_error'] = str(e)
             raise
     
+    async def _coalesced_completion(self, payload: Dict[str, Any], debug_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Share one in-flight completion between concurrent callers sending an identical payload"""
+        key = hashlib.blake2b(
+            orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16
+        ).digest()
+        
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            response_debug: Dict[str, Any] = {}
+            task = asyncio.ensure_future(self._single_completion(payload, response_debug))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            inflight = self._inflight[key] = (task, response_debug)
+        else:
+            logger.info("Joining identical in-flight LLM request")
+        
+        task, response_debug = inflight
+        # Shielded so one caller going away doesn't cancel the request for the others
+        response = await asyncio.shield(task)
+        if debug_context is not None:
+            debug_context.update(copy.deepcopy(response_debug))
+        return copy.deepcopy(response)
+    
     async def _single_completion(self, payload: Dict[str, Any], debug_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Handle single (non-streaming) completion"""
         import time
@@ -97,7 +146,8 @@ class LMStudioClient:
         
         response = await self.client.post(
             f"{self.base_url}/v1/chat/completions",
-            json=payload
+            content=orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS),
+            headers={"Content-Type": "application/json"}
         )
         response.raise_for_status()
         raw_response = response.json()
@@ -114,9 +164,9 @@ class LMStudioClient:
             debug_context['llm_response_tokens'] = raw_response.get('usage', {}).get('total_tokens', 0)
             
             # Log the full request/response for debugging
-            logger.info(f"LLM Request completed in {processing_time_ms}ms, {debug_context['llm_response_tokens']} tokens")
-            logger.debug(f"Full LLM Request: {debug_context.get('llm_request_payload', {})}")
-            logger.debug(f"Full LLM Response: {raw_response}")
+            logger.info("LLM Request completed in %sms, %s tokens", processing_time_ms, debug_context['llm_response_tokens'])
+            logger.debug("Full LLM Request: %s", debug_context.get('llm_request_payload', {}))
+            logger.debug("Full LLM Response: %s", raw_response)
         
         # Process response to remove thinking tags
         processed_response = self.response_processor.process_chat_response(raw_response)
@@ -132,7 +182,8 @@ class LMStudioClient:
         async with self.client.stream(
             "POST",
             f"{self.base_url}/v1/chat/completions",
-            json=payload
+            content=orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS),
+            headers={"Content-Type": "application/json"}
         ) as response:
             response.raise_for_status()
             
@@ -242,14 +293,18 @@ class LMStudioClient:
             result = response.json()
             return result["data"][0]["embedding"]
         except Exception as e:
-            logger.warning(f"Embedding creation failed: {e}")
+            logger.warning("Embedding creation failed: %s", e)
             return []
     
+    async def close(self):
+        """Close the pooled HTTP connections"""
+        await self.client.aclose()
+    
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        await self.close()
 
 
 # Global client instance
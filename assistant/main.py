@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from httpx import TimeoutException
@@ -37,22 +38,25 @@ from enhanced_message_schemas import (
     EnhancedMessage
 )
 from debug_conversation_manager import DebugConversationManager
-from tool_usage_manager import ToolUsageManager
+from tool_usage_manager import ToolUsageManager, tool_usage_manager
 from lmstudio_client import lmstudio_client
-from memory_manager import MemoryManager, EnhancedMemoryManager
+from memory_manager import MemoryManager
 from enhanced_conversation_manager import EnhancedConversationManager
 
 # MCP Integration imports
 from mcp_integration import (
     register_mcp_routes, initialize_mcp_system, shutdown_mcp_system,
-    get_mcp_tools_for_assistant, handle_mcp_tool_call
+    get_cached_mcp_tools, handle_mcp_tool_call, get_mcp_manager,
+    build_mcp_status_payload, build_mcp_servers_payload, build_mcp_tools_payload
 )
+from mcp_client_manager import MCPClientManager
 
 # Admin routes import
 from admin_routes import admin_router
 
 # Debug routes import
-from debug_routes import debug_router
+from debug_routes import debug_router, enqueue_memory_extraction, start_memory_workers, stop_memory_workers
+from script_worker import start_script_workers, stop_script_workers
 
 # Power user routes import
 from power_user_routes import power_user_router
@@ -79,6 +83,12 @@ async def lifespan(app: FastAPI):
     # Initialize MCP system
     await initialize_mcp_system()
 
+    # Start memory extraction workers
+    await start_memory_workers()
+
+    # Start pre-warmed debug script workers
+    await start_script_workers()
+
     # Check LMStudio connection
     lmstudio_connected = await lmstudio_client.health_check()
     if lmstudio_connected:
@@ -90,7 +100,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down AI Assistant API...")
+    await stop_memory_workers()
+    await stop_script_workers()
     await shutdown_mcp_system()
+    await lmstudio_client.close()
 
 
 # Create FastAPI app
@@ -136,19 +149,8 @@ def get_memory_manager(db: Session = Depends(get_db)) -> MemoryManager:
     return MemoryManager(db)
 
 
-def get_enhanced_memory_manager(db: Session = Depends(get_db)) -> EnhancedMemoryManager:
-    return EnhancedMemoryManager(db)
-
-
-# Global tool usage manager
-tool_usage_manager = None
-
-
-def get_tool_usage_manager(db: Session = Depends(get_db)) -> ToolUsageManager:
+def get_tool_usage_manager() -> ToolUsageManager:
     """Get tool usage manager instance"""
-    global tool_usage_manager
-    if tool_usage_manager is None:
-        tool_usage_manager = ToolUsageManager(db)
     return tool_usage_manager
 
 
@@ -290,24 +292,23 @@ async def chat_with_mcp_tools(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     conv_manager: EnhancedConversationManager = Depends(get_enhanced_conversation_manager),
-    memory_manager: MemoryManager = Depends(get_memory_manager),
-    enhanced_memory: EnhancedMemoryManager = Depends(get_enhanced_memory_manager)
+    memory_manager: MemoryManager = Depends(get_memory_manager)
 ):
     """Enhanced chat endpoint with MCP tool integration"""
     start_time = time.time()
 
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.id == request.user_id).first()
+        # Verify user exists and get or create conversation
+        user, conversation = conv_manager.get_conversation_with_user(
+            request.conversation_id or None, request.user_id
+        )
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        # Get or create conversation
         if request.conversation_id:
-            conversation = conv_manager.get_conversation(request.conversation_id, request.user_id)
             if not conversation:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -323,17 +324,18 @@ async def chat_with_mcp_tools(
             request.message
         )
 
+        # Get available MCP tools for this request
+        available_tools, llm_tools = get_cached_mcp_tools()
+
         # Build enhanced conversation context with optimized structure
         context = await conv_manager.build_optimized_context(
             conversation.id,
             request.user_id,
             max_messages=settings.max_conversation_history,
-            include_historical_context=True
+            include_historical_context=True,
+            available_tools=available_tools
         )
 
-        # Get available MCP tools for this request
-        available_tools = get_mcp_tools_for_assistant()
-
         # Prepare LLM request with tools
         debug_context = {}
         llm_request_params = {
@@ -346,12 +348,7 @@ async def chat_with_mcp_tools(
 
         # Add tools if available
         if available_tools:
-            llm_request_params["tools"] = [
-                {
-                    "type": "function",
-                    "function": tool["function"]
-                } for tool in available_tools
-            ]
+            llm_request_params["tools"] = llm_tools
             llm_request_params["tool_choice"] = "auto"
 
         # Get initial LLM response
@@ -376,7 +373,7 @@ async def chat_with_mcp_tools(
                 "content": initial_message.get("content", "")  # Always include content, default to empty string
             }
 
-            followup_context = context + [followup_message] + tool_results
+            followup_context = [*context, followup_message, *tool_results]
 
             # Get final response incorporating tool results
             final_response = await lmstudio_client.chat_completion(
@@ -411,15 +408,18 @@ async def chat_with_mcp_tools(
             }
         )
 
-        # Background tasks
-        background_tasks.add_task(
-            extract_and_store_enhanced_memories,
-            request.user_id,
-            request.message,
-            response_content,
-            conversation.id,
-            enhanced_memory
-        )
+        # Queue memory extraction for the worker pool
+        try:
+            enqueue_memory_extraction(
+                db,
+                request.user_id,
+                request.message,
+                response_content,
+                conversation.id
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue memory extraction: {e}")
+            db.rollback()
 
         # Auto-generate conversation title if it's the first exchange
         if len(conv_manager.get_conversation_messages(conversation.id)) == 2:
@@ -445,6 +445,8 @@ async def chat_with_mcp_tools(
             token_count=final_response.get("usage", {}).get("total_tokens")
         )
 
+    except HTTPException:
+        raise
     except TimeoutException as e:
         logger.error(f"LMStudio timeout error: {e}")
         raise HTTPException(
@@ -462,11 +464,9 @@ async def chat_with_mcp_tools(
 @app.post("/chat/stream")
 async def chat_stream_with_mcp_tools(
     request: ChatRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     conv_manager: EnhancedConversationManager = Depends(get_enhanced_conversation_manager),
-    memory_manager: MemoryManager = Depends(get_memory_manager),
-    enhanced_memory: EnhancedMemoryManager = Depends(get_enhanced_memory_manager)
+    memory_manager: MemoryManager = Depends(get_memory_manager)
 ):
     """Enhanced streaming chat endpoint with MCP tool integration"""
     if not request.stream:
@@ -479,13 +479,14 @@ async def chat_stream_with_mcp_tools(
 
         try:
             # Verify user and get/create conversation
-            user = db.query(User).filter(User.id == request.user_id).first()
+            user, conversation = conv_manager.get_conversation_with_user(
+                request.conversation_id or None, request.user_id
+            )
             if not user:
                 yield f"data: {json.dumps({'error': 'User not found'})}\\n\\n"
                 return
 
             if request.conversation_id:
-                conversation = conv_manager.get_conversation(request.conversation_id, request.user_id)
                 if not conversation:
                     yield f"data: {json.dumps({'error': 'Conversation not found'})}\\n\\n"
                     return
@@ -499,17 +500,18 @@ async def chat_stream_with_mcp_tools(
                 request.message
             )
 
+            # Get available MCP tools
+            available_tools, llm_tools = get_cached_mcp_tools()
+
             # Build optimized context with relevant tools
             context = await conv_manager.build_optimized_context(
                 conversation.id,
                 request.user_id,
                 max_messages=settings.max_conversation_history,
-                include_historical_context=True
+                include_historical_context=True,
+                available_tools=available_tools
             )
 
-            # Get available MCP tools
-            available_tools = get_mcp_tools_for_assistant()
-
             # Prepare streaming request
             debug_context = {}
             stream_params = {
@@ -522,12 +524,7 @@ async def chat_stream_with_mcp_tools(
 
             # Add tools if available
             if available_tools:
-                stream_params["tools"] = [
-                    {
-                        "type": "function", 
-                        "function": tool["function"]
-                    } for tool in available_tools
-                ]
+                stream_params["tools"] = llm_tools
                 stream_params["tool_choice"] = "auto"
 
             # Stream LLM response
@@ -594,15 +591,18 @@ async def chat_stream_with_mcp_tools(
                 }
             )
 
-            # Background tasks for enhanced memory extraction
-            background_tasks.add_task(
-                extract_and_store_enhanced_memories,
-                request.user_id,
-                request.message,
-                full_response,
-                conversation.id,
-                enhanced_memory
-            )
+            # Queue enhanced memory extraction for the worker pool
+            try:
+                enqueue_memory_extraction(
+                    db,
+                    request.user_id,
+                    request.message,
+                    full_response,
+                    conversation.id
+                )
+            except Exception as e:
+                logger.error(f"Failed to queue memory extraction: {e}")
+                db.rollback()
 
         except TimeoutException as e:
             logger.error(f"LMStudio stream timeout error: {e}")
@@ -623,8 +623,7 @@ async def chat_with_debug(
     request: MessageDebugRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    debug_conv_manager: DebugConversationManager = Depends(get_debug_conversation_manager),
-    enhanced_memory: EnhancedMemoryManager = Depends(get_enhanced_memory_manager)
+    debug_conv_manager: DebugConversationManager = Depends(get_debug_conversation_manager)
 ):
     """Enhanced chat endpoint with comprehensive debug information"""
     try:
@@ -634,15 +633,18 @@ async def chat_with_debug(
             lmstudio_client
         )
         
-        # Background tasks for memory extraction
-        background_tasks.add_task(
-            extract_and_store_enhanced_memories,
-            request.user_id,
-            request.message,
-            debug_response.message.content,
-            debug_response.conversation_id,
-            enhanced_memory
-        )
+        # Queue memory extraction for the worker pool
+        try:
+            enqueue_memory_extraction(
+                db,
+                request.user_id,
+                request.message,
+                debug_response.message.content,
+                debug_response.conversation_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue memory extraction: {e}")
+            db.rollback()
         
         # Auto-generate conversation title if needed
         if len(debug_conv_manager.get_conversation_messages(debug_response.conversation_id)) == 2:
@@ -816,7 +818,7 @@ async def get_system_status(db: Session = Depends(get_db)):
             mcp_servers = []
 
         # Get available tools
-        available_tools = get_mcp_tools_for_assistant()
+        available_tools, _ = get_cached_mcp_tools()
         tool_list = [
             {
                 "name": tool.get("function", {}).get("name", "unknown"),
@@ -828,9 +830,7 @@ async def get_system_status(db: Session = Depends(get_db)):
 
         # Get tool usage debug info
         try:
-            tool_debug_info = {}
-            if tool_usage_manager:
-                tool_debug_info = tool_usage_manager.get_system_debug_info()
+            tool_debug_info = tool_usage_manager.get_system_debug_info()
         except Exception as e:
             logger.error(f"Failed to get tool debug info: {e}")
             tool_debug_info = {}
@@ -862,6 +862,36 @@ async def get_system_status(db: Session = Depends(get_db)):
         )
 
 
+# Debug bundle combining the status probes used by debug_mcp.py
+@app.get("/mcp/debug/bundle")
+async def get_mcp_debug_bundle(
+    db: Session = Depends(get_db),
+    manager: MCPClientManager = Depends(get_mcp_manager)
+):
+    """Get system status, MCP status, servers and tools in a single response"""
+    bundle = {}
+    probes = {
+        "mcp_status": build_mcp_status_payload,
+        "servers": build_mcp_servers_payload,
+        "tools": build_mcp_tools_payload
+    }
+
+    try:
+        bundle["system_status"] = jsonable_encoder(await get_system_status(db))
+    except Exception as e:
+        logger.error(f"Failed to get system status for debug bundle: {e}")
+        bundle["system_status"] = {"error": str(e)}
+
+    for key, build_payload in probes.items():
+        try:
+            bundle[key] = jsonable_encoder(build_payload(manager))
+        except Exception as e:
+            logger.error(f"Failed to build {key} for debug bundle: {e}")
+            bundle[key] = {"error": str(e)}
+
+    return bundle
+
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
@@ -918,39 +948,6 @@ def health_check():
 
 
 # Background task functions
-async def extract_and_store_enhanced_memories(
-    user_id: int,
-    user_message: str,
-    assistant_response: str,
-    conversation_id: int,
-    enhanced_memory: EnhancedMemoryManager
-):
-    """Enhanced background task to extract and store facts and memories with deduplication"""
-    try:
-        memories = await enhanced_memory.extract_and_store_facts(
-            user_id, user_message, assistant_response, conversation_id
-        )
-        if memories:
-            logger.info(f"Stored {len(memories)} enhanced memories for user {user_id}")
-            
-            # Trigger memory consolidation periodically
-            if len(memories) > 3:  # If we stored many memories, consolidate
-                try:
-                    # Get total memory count for user
-                    total_memories = len(enhanced_memory.original_manager.get_user_memories(user_id))
-                    
-                    # Consolidate if we have many memories
-                    if total_memories > 50:
-                        enhanced_memory.original_manager.consolidate_memories(user_id)
-                        logger.info(f"Consolidated memories for user {user_id}")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to consolidate memories: {e}")
-                    
-    except Exception as e:
-        logger.error(f"Failed to extract enhanced memories: {e}")
-
-
 async def auto_generate_title(conversation_id: int, conv_manager: EnhancedConversationManager):
     """Background task to auto-generate conversation title with better context"""
     try:
@@ -410,6 +410,7 @@ class MCPClientManager:
         self.config_path = config_path or "mcp_servers.json"
         self.clients: Dict[str, MCPClient] = {}
         self.configurations: Dict[str, MCPServerConfig] = {}
+        self.tools_version = 0  # Bumped whenever the set of connected clients changes
         
     async def initialize(self):
         """Initialize the MCP client manager"""
@@ -575,6 +576,7 @@ class MCPClientManager:
             
             if success:
                 self.clients[server_id] = client
+                self.tools_version += 1
                 logger.info(f"Successfully connected to MCP server {server_id}")
             else:
                 logger.error(f"Failed to connect to MCP server {server_id}: Connection attempt failed")
@@ -590,6 +592,7 @@ class MCPClientManager:
         if server_id in self.clients:
             await self.clients[server_id].disconnect()
             del self.clients[server_id]
+            self.tools_version += 1
             logger.info(f"Disconnected from MCP server {server_id}")
     
     async def connect_all_servers(self):
@@ -4,7 +4,7 @@ FastAPI integration for MCP (Model Context Protocol) functionality
 import json
 import logging
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -73,6 +73,63 @@ async def get_mcp_manager() -> MCPClientManager:
     return mcp_manager
 
 
+def build_mcp_status_payload(manager: MCPClientManager) -> Dict[str, Any]:
+    """Build the response body for the MCP status endpoint"""
+    status = manager.get_server_status()
+    return {
+        "success": True,
+        "data": {
+            "servers": status,
+            "total_servers": len(status),
+            "connected_servers": sum(1 for s in status.values() if s["status"] == MCPServerStatus.CONNECTED)
+        }
+    }
+
+
+def build_mcp_servers_payload(manager: MCPClientManager) -> Dict[str, Any]:
+    """Build the response body for the MCP server listing endpoint"""
+    servers = []
+    for server_id, config in manager.configurations.items():
+        client = manager.clients.get(server_id)
+        servers.append({
+            "server_id": server_id,
+            "name": config.name,
+            "description": config.description,
+            "type": config.type,
+            "enabled": config.enabled,
+            "status": client.status if client else MCPServerStatus.DISCONNECTED,
+            "error": client.error_message if client else None,
+            "capabilities": {
+                "tools": len(client.tools) if client else 0,
+                "resources": len(client.resources) if client else 0,
+                "prompts": len(client.prompts) if client else 0
+            }
+        })
+
+    return {"success": True, "data": {"servers": servers}}
+
+
+def build_mcp_tools_payload(manager: MCPClientManager) -> Dict[str, Any]:
+    """Build the response body for the MCP tool listing endpoint"""
+    tools_data = [
+        {
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.input_schema,
+            "server_id": tool.server_id
+        }
+        for tool in manager.get_all_tools()
+    ]
+
+    return {
+        "success": True,
+        "data": {
+            "tools": tools_data,
+            "total_count": len(tools_data)
+        }
+    }
+
+
 def register_mcp_routes(app: FastAPI):
     """Register MCP-related routes with the FastAPI app"""
     
@@ -80,18 +137,7 @@ def register_mcp_routes(app: FastAPI):
     async def get_mcp_status(manager: MCPClientManager = Depends(get_mcp_manager)):
         """Get status of all MCP servers"""
         try:
-            status = manager.get_server_status()
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": True,
-                    "data": {
-                        "servers": status,
-                        "total_servers": len(status),
-                        "connected_servers": sum(1 for s in status.values() if s["status"] == MCPServerStatus.CONNECTED)
-                    }
-                }
-            )
+            return JSONResponse(status_code=200, content=build_mcp_status_payload(manager))
         except Exception as e:
             logger.error(f"Failed to get MCP status: {e}")
             raise HTTPException(
@@ -103,28 +149,7 @@ def register_mcp_routes(app: FastAPI):
     async def list_mcp_servers(manager: MCPClientManager = Depends(get_mcp_manager)):
         """List all configured MCP servers"""
         try:
-            servers = []
-            for server_id, config in manager.configurations.items():
-                client = manager.clients.get(server_id)
-                servers.append({
-                    "server_id": server_id,
-                    "name": config.name,
-                    "description": config.description,
-                    "type": config.type,
-                    "enabled": config.enabled,
-                    "status": client.status if client else MCPServerStatus.DISCONNECTED,
-                    "error": client.error_message if client else None,
-                    "capabilities": {
-                        "tools": len(client.tools) if client else 0,
-                        "resources": len(client.resources) if client else 0,
-                        "prompts": len(client.prompts) if client else 0
-                    }
-                })
-            
-            return JSONResponse(
-                status_code=200,
-                content={"success": True, "data": {"servers": servers}}
-            )
+            return JSONResponse(status_code=200, content=build_mcp_servers_payload(manager))
         except Exception as e:
             logger.error(f"Failed to list MCP servers: {e}")
             raise HTTPException(
@@ -334,27 +359,7 @@ def register_mcp_routes(app: FastAPI):
     async def list_mcp_tools(manager: MCPClientManager = Depends(get_mcp_manager)):
         """List all available MCP tools"""
         try:
-            tools = manager.get_all_tools()
-            tools_data = []
-            
-            for tool in tools:
-                tools_data.append({
-                    "name": tool.name,
-                    "description": tool.description,
-                    "input_schema": tool.input_schema,
-                    "server_id": tool.server_id
-                })
-            
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "success": True,
-                    "data": {
-                        "tools": tools_data,
-                        "total_count": len(tools_data)
-                    }
-                }
-            )
+            return JSONResponse(status_code=200, content=build_mcp_tools_payload(manager))
         except Exception as e:
             logger.error(f"Failed to list MCP tools: {e}")
             raise HTTPException(
@@ -579,6 +584,33 @@ def get_mcp_tools_for_assistant() -> List[Dict[str, Any]]:
     return assistant_tools
 
 
+# MCP tools and their LLM request payload, rebuilt only when the registry changes
+# Shared across requests, so the cached lists are stored as tuples to keep
+# callers from mutating them in place
+_mcp_tools_cache: Dict[str, Any] = {"key": None, "tools": (), "llm_tools": ()}
+
+
+def get_cached_mcp_tools() -> Tuple[Sequence[Dict[str, Any]], Sequence[Dict[str, Any]]]:
+    """Get MCP tools and their LLM request shape, cached per tools_version"""
+    key = (id(mcp_manager), mcp_manager.tools_version) if mcp_manager else None
+    if key is None or key != _mcp_tools_cache["key"]:
+        tools = tuple(get_mcp_tools_for_assistant())
+        _mcp_tools_cache["tools"] = tools
+        _mcp_tools_cache["llm_tools"] = tuple(
+            {
+                "type": "function",
+                "function": tool["function"]
+            } for tool in tools
+        )
+        _mcp_tools_cache["key"] = key
+    return _mcp_tools_cache["tools"], _mcp_tools_cache["llm_tools"]
+
+
+def invalidate_mcp_tools_cache():
+    """Force the next get_cached_mcp_tools call to rebuild the tool list"""
+    _mcp_tools_cache["key"] = None
+
+
 async def handle_mcp_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Handle MCP tool call from the assistant"""
     global mcp_manager
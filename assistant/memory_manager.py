@@ -16,6 +16,44 @@ from llm_response_processor import LLMResponseProcessor
 
 logger = logging.getLogger(__name__)
 
+# Patterns used on every chat turn, compiled once at import
+_CATEGORY_PATTERNS = {
+    category: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for category, patterns in {
+        "personal": [
+            r"^name$", r"^pet_", r"^family_", r"^location$", r"^age$", r"^has_pet$"
+        ],
+        "preferences": [
+            r"^response_style$", r"^technical_level$", r"^favorite_", r"^likes_",
+            r"^prefers_", r"^communication_"
+        ],
+        "skills": [
+            r"^skill_", r"^expertise_", r"^programming_", r"^language_", r"^technology_"
+        ],
+        "projects": [
+            r"^goal_", r"^project_", r"^working_on", r"^current_"
+        ],
+        "context": [
+            r"^allowed_directory", r"^recent_", r"^last_", r"^current_topic"
+        ]
+    }.items()
+}
+_MEMORY_KEY_PREFIX = re.compile(r'^(pet_|family_|skill_|interest_|goal_|project_)')
+_JSON_ARRAY = re.compile(r'\[.*\]', re.DOTALL)
+
+_NAME_PATTERNS = [
+    re.compile(r"(?:my name is|i'm|i am|call me) ([A-Z][a-z]+)", re.IGNORECASE),
+    re.compile(r"name[':]\s*([A-Z][a-z]+)", re.IGNORECASE)
+]
+_PET_PATTERNS = [
+    re.compile(r"(?:my|i have a?) (dog|cat|bird|fish|hamster|rabbit|turtle|pet) (?:is )?(?:named|called) ([A-Z][a-z]+)", re.IGNORECASE),
+    re.compile(r"([A-Z][a-z]+) is my (dog|cat|bird|fish|hamster|rabbit|turtle|pet)", re.IGNORECASE)
+]
+_LOCATION_PATTERNS = [
+    re.compile(r"(?:i|I) (?:live|reside|stay) in ([A-Za-z\s]+)", re.IGNORECASE),
+    re.compile(r"(?:i|I) am from ([A-Za-z\s]+)", re.IGNORECASE)
+]
+
 
 class EnhancedMemoryManager:
     """Enhanced memory management with consolidated user profiles and conflict resolution"""
@@ -67,29 +105,9 @@ class EnhancedMemoryManager:
     async def _categorize_memories(self, memories: List[UserMemory], profile: Dict[str, Any]):
         """Categorize memories into structured profile sections"""
         
-        # Category patterns for automatic classification
-        category_patterns = {
-            "personal": [
-                r"^name$", r"^pet_", r"^family_", r"^location$", r"^age$", r"^has_pet$"
-            ],
-            "preferences": [
-                r"^response_style$", r"^technical_level$", r"^favorite_", r"^likes_", 
-                r"^prefers_", r"^communication_"
-            ],
-            "skills": [
-                r"^skill_", r"^expertise_", r"^programming_", r"^language_", r"^technology_"
-            ],
-            "projects": [
-                r"^goal_", r"^project_", r"^working_on", r"^current_"
-            ],
-            "context": [
-                r"^allowed_directory", r"^recent_", r"^last_", r"^current_topic"
-            ]
-        }
-
         for memory in memories:
             # Determine category
-            category = self._determine_memory_category(memory.key, category_patterns)
+            category = self._determine_memory_category(memory.key, _CATEGORY_PATTERNS)
             
             # Clean up the key for better presentation
             clean_key = self._clean_memory_key(memory.key)
@@ -98,18 +116,18 @@ class EnhancedMemoryManager:
             if category and clean_key:
                 profile[category][clean_key] = memory.value
 
-    def _determine_memory_category(self, key: str, patterns: Dict[str, List[str]]) -> str:
+    def _determine_memory_category(self, key: str, patterns: Dict[str, List[re.Pattern]]) -> str:
         """Determine which category a memory key belongs to"""
         for category, pattern_list in patterns.items():
             for pattern in pattern_list:
-                if re.match(pattern, key, re.IGNORECASE):
+                if pattern.match(key):
                     return category
         return "context"  # Default category
 
     def _clean_memory_key(self, key: str) -> str:
         """Clean memory key for better presentation"""
         # Remove common prefixes
-        key = re.sub(r'^(pet_|family_|skill_|interest_|goal_|project_)', '', key)
+        key = _MEMORY_KEY_PREFIX.sub('', key)
         
         # Convert underscores to spaces and title case
         key = key.replace('_', ' ').title()
@@ -399,7 +417,7 @@ Example:
             content = processed_response["choices"][0]["message"]["content"].strip()
 
             # Extract and validate JSON
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
+            json_match = _JSON_ARRAY.search(content)
             if json_match:
                 facts = json.loads(json_match.group())
                 return [fact for fact in facts if self._validate_extracted_fact(fact)]
@@ -520,16 +538,17 @@ class MemoryManager:
     def _extract_preferences(self, message: str, response: str) -> List[Dict[str, Any]]:
         """Extract user preferences with improved detection"""
         preferences = []
+        message_lower = message.lower()
 
         # Communication style
-        if any(phrase in message.lower() for phrase in ["brief", "short", "concise", "quick"]):
+        if any(phrase in message_lower for phrase in ["brief", "short", "concise", "quick"]):
             preferences.append({
                 "key": "communication_style",
                 "value": "concise",
                 "confidence": 0.7
             })
 
-        if any(phrase in message.lower() for phrase in ["detailed", "thorough", "comprehensive"]):
+        if any(phrase in message_lower for phrase in ["detailed", "thorough", "comprehensive"]):
             preferences.append({
                 "key": "communication_style",
                 "value": "detailed",
@@ -537,14 +556,14 @@ class MemoryManager:
             })
 
         # Technical level
-        if any(phrase in message.lower() for phrase in ["beginner", "new to", "don't understand"]):
+        if any(phrase in message_lower for phrase in ["beginner", "new to", "don't understand"]):
             preferences.append({
                 "key": "technical_level",
                 "value": "beginner",
                 "confidence": 0.6
             })
 
-        if any(phrase in message.lower() for phrase in ["advanced", "expert", "professional"]):
+        if any(phrase in message_lower for phrase in ["advanced", "expert", "professional"]):
             preferences.append({
                 "key": "technical_level",
                 "value": "advanced",
@@ -558,13 +577,8 @@ class MemoryManager:
         personal_info = []
 
         # Name extraction
-        name_patterns = [
-            r"(?:my name is|i'm|i am|call me) ([A-Z][a-z]+)",
-            r"name[':]\s*([A-Z][a-z]+)"
-        ]
-
-        for pattern in name_patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
+        for pattern in _NAME_PATTERNS:
+            match = pattern.search(message)
             if match:
                 personal_info.append({
                     "key": "name",
@@ -573,13 +587,8 @@ class MemoryManager:
                 })
 
         # Pet information with improved accuracy
-        pet_patterns = [
-            r"(?:my|i have a?) (dog|cat|bird|fish|hamster|rabbit|turtle|pet) (?:is )?(?:named|called) ([A-Z][a-z]+)",
-            r"([A-Z][a-z]+) is my (dog|cat|bird|fish|hamster|rabbit|turtle|pet)"
-        ]
-
-        for pattern in pet_patterns:
-            matches = re.finditer(pattern, message, re.IGNORECASE)
+        for pattern in _PET_PATTERNS:
+            matches = pattern.finditer(message)
             for match in matches:
                 groups = match.groups()
                 if len(groups) == 2:
@@ -597,13 +606,8 @@ class MemoryManager:
                     })
 
         # Location extraction
-        location_patterns = [
-            r"(?:i|I) (?:live|reside|stay) in ([A-Za-z\s]+)",
-            r"(?:i|I) am from ([A-Za-z\s]+)"
-        ]
-
-        for pattern in location_patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
+        for pattern in _LOCATION_PATTERNS:
+            match = pattern.search(message)
             if match:
                 location = match.group(1).strip()
                 personal_info.append({
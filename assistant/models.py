@@ -1,7 +1,11 @@
 """
 Enhanced Database Models with Debug Data Persistence
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, JSON
+import zlib
+import orjson
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, JSON, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -10,6 +14,47 @@ from typing import Optional, Dict, Any
 
 Base = declarative_base()
 
+# Binary, indexable JSONB on PostgreSQL; plain JSON elsewhere
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as zlib-compressed bytes.
+
+    Values smaller than COMPRESS_MIN_BYTES are stored as plain JSON bytes,
+    where compression would cost more than it saves. PostgreSQL gets a plain
+    JSONB column instead, which TOAST already compresses. Rows written as
+    uncompressed JSON before the switch are still readable.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    COMPRESS_MIN_BYTES = 512
+    # Every zlib stream with the default window starts with this byte; JSON never does
+    ZLIB_HEADER = b"\x78"
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        if len(payload) < self.COMPRESS_MIN_BYTES:
+            return payload
+        return zlib.compress(payload, 3)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        if isinstance(value, str):
+            return orjson.loads(value)
+        if value[:1] == self.ZLIB_HEADER:
+            return orjson.loads(zlib.decompress(value))
+        return orjson.loads(value)
+
 
 class User(Base):
     """User model for storing user information and preferences"""
@@ -65,23 +110,28 @@ class Message(Base):
 
     # Debug information
     debug_enabled = Column(Boolean, default=False)
-    debug_data = Column(JSON, nullable=True)  # Store debug information
+    debug_data = Column(JSONVariant, nullable=True)  # Store debug information
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
-    debug_steps = relationship("DebugStep", back_populates="message", cascade="all, delete-orphan")
-    llm_requests = relationship("LLMRequest", back_populates="message", cascade="all, delete-orphan")
+    debug_steps = relationship("DebugStep", back_populates="message", cascade="all, delete-orphan",
+                               order_by="DebugStep.step_order")
+    llm_requests = relationship("LLMRequest", back_populates="message", cascade="all, delete-orphan",
+                                order_by="LLMRequest.timestamp")
 
 
 class DebugSession(Base):
     """Debug session tracking for conversations"""
     __tablename__ = "debug_sessions"
+    __table_args__ = (
+        Index("ix_debug_sessions_conv_user_active", "conversation_id", "user_id", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     session_id = Column(String(100), nullable=False, index=True)  # Unique session identifier
-    started_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, default=func.now(), server_default=func.now())
     ended_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
 
@@ -100,6 +150,10 @@ class DebugSession(Base):
 class DebugStep(Base):
     """Individual debug steps within a message processing"""
     __tablename__ = "debug_steps"
+    __table_args__ = (
+        Index("ix_debug_steps_session_id_order", "debug_session_id", "step_order"),
+        Index("ix_debug_steps_metadata", "step_metadata", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
@@ -113,7 +167,7 @@ class DebugStep(Base):
     description = Column(Text, nullable=True)
 
     # Timing
-    timestamp = Column(DateTime, default=func.now())
+    timestamp = Column(DateTime, default=func.now(), server_default=func.now())
     duration_ms = Column(Integer, nullable=True)
 
     # Status
@@ -121,9 +175,9 @@ class DebugStep(Base):
     error_message = Column(Text, nullable=True)
 
     # Data
-    input_data = Column(JSON, nullable=True)
-    output_data = Column(JSON, nullable=True)
-    step_metadata = Column(JSON, nullable=True)
+    input_data = Column(CompressedJSON, nullable=True)
+    output_data = Column(CompressedJSON, nullable=True)
+    step_metadata = Column(JSONVariant, nullable=True)
 
     # Relationships
     message = relationship("Message", back_populates="debug_steps")
@@ -133,6 +187,9 @@ class DebugStep(Base):
 class LLMRequest(Base):
     """LLM request/response tracking for debug purposes"""
     __tablename__ = "llm_requests"
+    __table_args__ = (
+        Index("ix_llm_requests_message_time", "message_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
@@ -145,24 +202,34 @@ class LLMRequest(Base):
     stream = Column(Boolean, default=False)
 
     # Request/Response data
-    request_messages = Column(JSON, nullable=False)  # Full request context
-    response_data = Column(JSON, nullable=False)  # Full response
+    request_messages = Column(CompressedJSON, nullable=True)  # Inline request context (older rows)
+    request_message_hashes = Column(JSONVariant, nullable=True)  # Ordered LLMMessageBlob hashes
+    response_data = Column(CompressedJSON, nullable=False)  # Full response
 
     # Timing and usage
-    timestamp = Column(DateTime, default=func.now())
+    timestamp = Column(DateTime, default=func.now(), server_default=func.now())
     processing_time_ms = Column(Integer, nullable=True)
-    token_usage = Column(JSON, nullable=True)
+    token_usage = Column(JSONVariant, nullable=True)
 
     # Tools information
-    tools_available = Column(JSON, nullable=True)
-    tools_used = Column(JSON, nullable=True)
-    tool_calls = Column(JSON, nullable=True)
-    tool_results = Column(JSON, nullable=True)
+    tools_available = Column(CompressedJSON, nullable=True)
+    tools_used = Column(JSONVariant, nullable=True)
+    tool_calls = Column(CompressedJSON, nullable=True)
+    tool_results = Column(CompressedJSON, nullable=True)
 
     # Relationships
     message = relationship("Message", back_populates="llm_requests")
 
 
+class LLMMessageBlob(Base):
+    """Content-addressed LLM request message shared by every request that sent it"""
+    __tablename__ = "llm_message_blobs"
+
+    hash = Column(String(64), primary_key=True)  # blake2b-256 of the canonical message JSON
+    payload = Column(CompressedJSON, nullable=False)
+    last_used_at = Column(DateTime, default=func.now(), index=True)  # Touched by every request that stores it
+
+
 class UserMemory(Base):
     """User memory entries for personalization"""
     __tablename__ = "user_memory"
@@ -183,6 +250,18 @@ class UserMemory(Base):
     user = relationship("User", back_populates="user_memory")
 
 
+class MemoryExtractionJob(Base):
+    """Pending memory extraction for a chat exchange, kept until a worker has processed it"""
+    __tablename__ = "memory_extraction_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)  # No foreign keys: deleting a user or conversation must not fail on queued jobs
+    conversation_id = Column(Integer, nullable=False)
+    user_message = Column(Text, nullable=False)
+    assistant_response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+
 class UserPreference(Base):
     """User preferences and settings"""
     __tablename__ = "user_preferences"
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func, desc, and_, or_, text
 import json
 import csv
@@ -15,6 +15,7 @@ import io
 from database import get_db
 from models import User, Conversation, Message, UserMemory, UserPreference, ConversationSummary
 from schemas import User as UserSchema, UserCreate, UserMemory as UserMemorySchema, UserPreference as UserPreferenceSchema
+from conversation_manager import forget_user_conversation_owners
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     # Delete user (cascades to conversations, messages, memories, preferences)
     db.delete(user)
     db.commit()
+    forget_user_conversation_owners(user_id)
 
     logger.info(f"Deleted user {user_id} and all associated data")
     return {"success": True, "message": "User deleted successfully"}
@@ -334,7 +336,9 @@ def get_conversation_summaries(user_id: int, db: Session = Depends(get_db)):
             detail="User not found"
         )
 
-    summaries = db.query(ConversationSummary).join(Conversation).filter(
+    summaries = db.query(ConversationSummary).join(Conversation).options(
+        contains_eager(ConversationSummary.conversation)
+    ).filter(
         Conversation.user_id == user_id
     ).all()
 
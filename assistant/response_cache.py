@@ -0,0 +1,134 @@
+"""
+Semantic response cache for repeated chat prompts
+"""
+import copy
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from config import settings
+from lmstudio_client import lmstudio_client
+
+logger = logging.getLogger(__name__)
+
+# After an embedding failure, semantic matching pauses for this long, doubling
+# on each further failure up to the maximum; exact matches keep working
+EMBEDDING_RETRY_SECONDS = 30.0
+EMBEDDING_RETRY_MAX_SECONDS = 600.0
+
+
+class SemanticResponseCache:
+    """Cache LLM responses by prompt scope and user message similarity.
+
+    The scope pins everything besides the user message that shapes the reply
+    (system prompt, recent history, sampling settings, tools), so only
+    near-identical questions asked in the same situation share an answer.
+    """
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._embedding_retry_at = 0.0
+        self._embedding_backoff = EMBEDDING_RETRY_SECONDS
+        # scope -> [(message text, normalized embedding or None, response)]
+        self._entries: "OrderedDict[str, List[Tuple[str, Optional[List[float]], Dict[str, Any]]]]" = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def scope_key(context: List[Dict[str, Any]], **params) -> str:
+        """Hash the system prompt, the two messages before the user message and request params"""
+        history = context[:-1]
+        scope = {
+            "system": [m for m in history if m.get("role") == "system"],
+            "tail": [m for m in history if m.get("role") != "system"][-2:],
+            "params": params
+        }
+        payload = orjson.dumps(scope, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Get a unit-length embedding, or None while embeddings are failing"""
+        if time.monotonic() < self._embedding_retry_at:
+            return None
+        vector = await lmstudio_client.create_embedding(text)
+        if not vector:
+            logger.info(
+                "Embeddings unavailable, response cache will only match identical messages "
+                f"for {self._embedding_backoff:.0f}s"
+            )
+            self._embedding_retry_at = time.monotonic() + self._embedding_backoff
+            self._embedding_backoff = min(self._embedding_backoff * 2, EMBEDDING_RETRY_MAX_SECONDS)
+            return None
+        self._embedding_backoff = EMBEDDING_RETRY_SECONDS
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    async def lookup(
+        self, scope: str, message: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Get a cached response for a message within a scope
+
+        Also returns the message embedding if one was computed, so a miss can
+        be stored without embedding the message again.
+        """
+        entries = self._entries.get(scope)
+        if not entries:
+            return None, None
+        self._entries.move_to_end(scope)
+
+        text = message.strip()
+        for cached_text, _, response in entries:
+            if cached_text == text:
+                return copy.deepcopy(response), None
+
+        vector = await self._embed(text)
+        if vector is None:
+            return None, None
+        best_score, best_response = 0.0, None
+        for _, cached_vector, response in entries:
+            if cached_vector is not None and len(cached_vector) == len(vector):
+                score = sum(a * b for a, b in zip(vector, cached_vector))
+                if score > best_score:
+                    best_score, best_response = score, response
+        if best_score >= self.threshold:
+            return copy.deepcopy(best_response), vector
+        return None, vector
+
+    async def store(
+        self,
+        scope: str,
+        message: str,
+        response: Dict[str, Any],
+        vector: Optional[List[float]] = None
+    ):
+        """Cache a response unless it called tools
+
+        The response is kept as given, so pass a copy the caller won't modify.
+        The message is only embedded if lookup didn't already return its vector.
+        """
+        choices = response.get("choices") or [{}]
+        if choices[0].get("message", {}).get("tool_calls"):
+            return
+
+        text = message.strip()
+        if vector is None:
+            vector = await self._embed(text)
+        self._entries.setdefault(scope, []).append((text, vector, response))
+        self._entries.move_to_end(scope)
+        self._size += 1
+
+        # Evict least recently used scopes
+        while self._size > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+response_cache = SemanticResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    threshold=settings.response_cache_threshold
+)
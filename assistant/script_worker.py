@@ -0,0 +1,372 @@
+"""
+Pre-warmed worker processes for running debug scripts
+
+Each worker imports the heavy dependencies once, then forks a fresh child per
+script so runs stay isolated without paying interpreter start-up every time.
+"""
+import asyncio
+import contextlib
+import importlib
+import json
+import logging
+import os
+import runpy
+import signal
+import sys
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_WORKER_COUNT = 2
+SCRIPT_TIMEOUT_SECONDS = 300
+SCRIPT_OUTPUT_MAX_BYTES = 1024 * 1024  # Keep only the tail of each output stream
+SCRIPT_OUTPUT_LIMIT = 16 * SCRIPT_OUTPUT_MAX_BYTES  # Worker result line, both streams JSON-escaped
+
+# Imported once per worker so forked script runs start with them loaded. The project
+# modules are the ones the debug scripts import; none of them connect at import time,
+# so forked children still open their own connections
+SCRIPT_WORKER_PRELOAD = [
+    "sqlalchemy", "sqlalchemy.orm", "httpx", "pydantic", "fastapi",
+    "config", "models", "schemas", "database", "memory_manager", "conversation_manager"
+]
+
+_idle_workers: Optional[asyncio.Queue] = None
+# Every running worker, idle or busy, so stopping the pool can reach them all
+_all_workers: Set[asyncio.subprocess.Process] = set()
+
+# A single thread runs in-process scripts: runpy swaps the process-wide
+# sys.modules['__main__'] and sys.argv[0] for the length of a run
+_inproc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-script")
+# The run holding that thread, which keeps going past its timeout since threads can't be killed
+_inproc_run: Optional[asyncio.Future] = None
+
+
+class _TailBuffer:
+    """Text sink that keeps only about the last SCRIPT_OUTPUT_MAX_BYTES characters written"""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def write(self, text: str) -> int:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size > 2 * SCRIPT_OUTPUT_MAX_BYTES:
+            tail = "".join(self._parts)[-SCRIPT_OUTPUT_MAX_BYTES:]
+            self._parts, self._size = [tail], len(tail)
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)[-SCRIPT_OUTPUT_MAX_BYTES:]
+
+
+class _ThreadCapturedStream:
+    """sys.stdout/sys.stderr stand-in that sends writes from capturing threads to their own buffer"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self, buffer: Optional[_TailBuffer]):
+        self._local.buffer = buffer
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _captured_stream(name: str) -> _ThreadCapturedStream:
+    """Install (once) and return the capturing wrapper around sys.stdout or sys.stderr"""
+    stream = getattr(sys, name)
+    if not isinstance(stream, _ThreadCapturedStream):
+        stream = _ThreadCapturedStream(stream)
+        setattr(sys, name, stream)
+    return stream
+
+
+def _run_forked(script_path: str) -> Dict[str, Any]:
+    """Run a script as __main__ in a forked child and collect its output"""
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            returncode = 1
+            try:
+                # Match `python script_path`: own stdio, script directory first on sys.path
+                devnull = os.open(os.devnull, os.O_RDONLY)
+                os.dup2(devnull, 0)
+                os.dup2(stdout.fileno(), 1)
+                os.dup2(stderr.fileno(), 2)
+                sys.argv = [script_path]
+                sys.path.insert(0, os.path.dirname(script_path))
+                returncode = 0
+                try:
+                    runpy.run_path(script_path, run_name="__main__")
+                except SystemExit as e:
+                    if isinstance(e.code, int):
+                        returncode = e.code
+                    elif e.code is not None:
+                        print(e.code, file=sys.stderr)
+                        returncode = 1
+                except BaseException:
+                    traceback.print_exc()
+                    returncode = 1
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(returncode & 0xFF)
+
+        _, wait_status = os.waitpid(pid, 0)
+        return {
+            "returncode": os.waitstatus_to_exitcode(wait_status),
+            "stdout": _read_file_tail(stdout),
+            "stderr": _read_file_tail(stderr)
+        }
+
+
+def _read_file_tail(f) -> str:
+    """Read the last SCRIPT_OUTPUT_MAX_BYTES of a file"""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(max(0, size - SCRIPT_OUTPUT_MAX_BYTES))
+    return f.read().decode(errors="replace")
+
+
+async def _read_stream_tail(stream: asyncio.StreamReader, buffer: bytearray):
+    """Read a stream to EOF, keeping only about the last SCRIPT_OUTPUT_MAX_BYTES in buffer"""
+    while chunk := await stream.read(64 * 1024):
+        buffer += chunk
+        if len(buffer) > 2 * SCRIPT_OUTPUT_MAX_BYTES:
+            del buffer[:-SCRIPT_OUTPUT_MAX_BYTES]
+
+
+def _kill_process_group(process: asyncio.subprocess.Process):
+    """Kill a process started in its own session along with its children"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+def worker_main():
+    """Worker loop: read script paths from stdin, write JSON results to stdout"""
+    # stdout carries results, so anything printed while importing goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        for module_name in SCRIPT_WORKER_PRELOAD:
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                # A script that needs the module will import it, and report the error, itself
+                logger.warning(f"Script worker could not preload {module_name}: {e}")
+
+    for line in sys.stdin:
+        script_path = json.loads(line)
+        sys.stdout.write(json.dumps(_run_forked(script_path)) + "\n")
+        sys.stdout.flush()
+
+
+async def _spawn_worker() -> asyncio.subprocess.Process:
+    """Start one worker process"""
+    worker = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        limit=SCRIPT_OUTPUT_LIMIT,
+        start_new_session=True
+    )
+    _all_workers.add(worker)
+    return worker
+
+
+def _discard_worker(worker: asyncio.subprocess.Process):
+    """Kill a worker along with any script it is running and forget it"""
+    _kill_process_group(worker)
+    _all_workers.discard(worker)
+
+
+async def run_script(script_path: str, timeout: float = SCRIPT_TIMEOUT_SECONDS) -> Optional[Dict[str, Any]]:
+    """Run a script on an idle worker; returns None if no worker could run it"""
+    pool = _idle_workers
+    if pool is None:
+        return None
+
+    worker = await pool.get()
+    if worker is None:
+        # The pool stopped while this run waited; pass the wake-up on to the next waiter
+        pool.put_nowait(None)
+        return None
+
+    failed = False
+    try:
+        worker.stdin.write((json.dumps(script_path) + "\n").encode())
+        await worker.stdin.drain()
+        line = await asyncio.wait_for(worker.stdout.readline(), timeout)
+        if not line:
+            raise RuntimeError(f"worker exited with code {await worker.wait()}")
+        result = json.loads(line)
+    except asyncio.TimeoutError:
+        # The worker is mid-script; it is killed with the script's child and replaced
+        failed = True
+        return {
+            "returncode": -int(signal.SIGKILL),
+            "stdout": "",
+            "stderr": f"Script timed out after {timeout} seconds"
+        }
+    except asyncio.CancelledError:
+        failed = True
+        raise
+    except Exception as e:
+        logger.warning(f"Script worker failed running {script_path}: {e}")
+        failed = True
+        return None
+    finally:
+        if failed and _idle_workers is pool:
+            _discard_worker(worker)
+            worker = await _spawn_worker()
+        if _idle_workers is pool:
+            pool.put_nowait(worker)
+        else:
+            # The pool stopped while this worker was busy
+            _discard_worker(worker)
+
+    return result
+
+
+def _run_inproc(script_path: str) -> Dict[str, Any]:
+    """Run a trusted script as __main__ in this process, capturing what it prints"""
+    stdout, stderr = _TailBuffer(), _TailBuffer()
+    captured_stdout, captured_stderr = _captured_stream("stdout"), _captured_stream("stderr")
+    captured_stdout.capture(stdout)
+    captured_stderr.capture(stderr)
+    returncode = 0
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            returncode = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        captured_stdout.capture(None)
+        captured_stderr.capture(None)
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue()
+    }
+
+
+async def run_script_inproc(script_path: str, timeout: float = SCRIPT_TIMEOUT_SECONDS) -> Optional[Dict[str, Any]]:
+    """Run a lightweight trusted script in-process, skipping interpreter start-up.
+
+    Returns None while another in-process script is still running, including
+    one that timed out: a thread can't be killed, so it keeps running in the
+    background until it finishes; only mark scripts that finish fast.
+    """
+    global _inproc_run
+    if _inproc_run is not None and not _inproc_run.done():
+        return None
+
+    loop = asyncio.get_running_loop()
+    _inproc_run = loop.run_in_executor(_inproc_executor, _run_inproc, script_path)
+    try:
+        # Shielded so the run stays tracked until its thread is actually free
+        return await asyncio.wait_for(asyncio.shield(_inproc_run), timeout)
+    except asyncio.TimeoutError:
+        return {
+            "returncode": 1,
+            "stdout": "",
+            "stderr": f"Script timed out after {timeout} seconds"
+        }
+
+
+async def run_script_subprocess(script_path: str, timeout: float = SCRIPT_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """Run a script in a fresh interpreter, keeping only the tail of its output"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, script_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=hasattr(os, "killpg")
+    )
+    stdout, stderr = bytearray(), bytearray()
+    readers = asyncio.gather(
+        _read_stream_tail(process.stdout, stdout),
+        _read_stream_tail(process.stderr, stderr)
+    )
+    timed_out = False
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        # Killing the whole group closes the pipes so the readers reach EOF
+        _kill_process_group(process)
+        await process.wait()
+        await readers
+
+    stderr_text = stderr[-SCRIPT_OUTPUT_MAX_BYTES:].decode(errors="replace")
+    if timed_out:
+        stderr_text += f"\nScript timed out after {timeout} seconds"
+    return {
+        "returncode": process.returncode,
+        "stdout": stdout[-SCRIPT_OUTPUT_MAX_BYTES:].decode(errors="replace"),
+        "stderr": stderr_text
+    }
+
+
+async def start_script_workers():
+    """Start the script worker pool (POSIX only, it relies on fork)"""
+    global _idle_workers
+    if _idle_workers is not None or not hasattr(os, "fork"):
+        return
+    _idle_workers = asyncio.Queue()
+    for _ in range(SCRIPT_WORKER_COUNT):
+        _idle_workers.put_nowait(await _spawn_worker())
+    logger.info(f"Started {SCRIPT_WORKER_COUNT} script workers")
+
+
+async def stop_script_workers():
+    """Stop the script worker pool, including workers still running a script"""
+    global _idle_workers
+    if _idle_workers is None:
+        return
+    pool, _idle_workers = _idle_workers, None
+    while not pool.empty():
+        pool.get_nowait()
+    # Runs still waiting for a worker wake up, see the pool is gone and fall back
+    pool.put_nowait(None)
+
+    async def stop_worker(worker: asyncio.subprocess.Process):
+        # Idle workers exit when stdin closes; busy ones get a moment to finish
+        worker.stdin.close()
+        try:
+            await asyncio.wait_for(worker.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            _kill_process_group(worker)
+            await worker.wait()
+
+    workers = list(_all_workers)
+    _all_workers.clear()
+    await asyncio.gather(*(stop_worker(worker) for worker in workers))
+
+
+if __name__ == "__main__":
+    worker_main()
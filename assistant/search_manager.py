@@ -11,7 +11,8 @@ This version addresses the key issues in the RAG pipeline:
 import logging
 import re
 from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy import and_, or_, desc, func, text
 from datetime import datetime, timedelta
 from llm_response_processor import LLMResponseProcessor
@@ -184,14 +185,16 @@ class SearchManager:
                 "limit": limit
             }).fetchall()
 
-            # Convert to ConversationSummary objects
-            summaries = []
-            for row in fts_results:
-                summary = self.db.query(ConversationSummary).filter(
-                    ConversationSummary.id == row.id
-                ).first()
-                if summary:
-                    summaries.append(summary)
+            # Convert to ConversationSummary objects in one query, keeping the rank order
+            summaries_by_id = {
+                summary.id: summary
+                for summary in self.db.query(ConversationSummary).options(
+                    selectinload(ConversationSummary.conversation)
+                ).filter(
+                    ConversationSummary.id.in_([row.id for row in fts_results])
+                )
+            } if fts_results else {}
+            summaries = [summaries_by_id[row.id] for row in fts_results if row.id in summaries_by_id]
 
             logger.info(f"FTS search returned {len(summaries)} summaries")
             return summaries
@@ -228,7 +231,9 @@ class SearchManager:
                 conditions.extend(term_conditions)
 
             # Search with OR conditions
-            summaries = self.db.query(ConversationSummary).join(Conversation).filter(
+            summaries = self.db.query(ConversationSummary).join(Conversation).options(
+                contains_eager(ConversationSummary.conversation)
+            ).filter(
                 and_(
                     Conversation.user_id == user_id,
                     Conversation.is_active == True,
@@ -276,10 +281,9 @@ class SearchManager:
 
             # Convert to summaries (create pseudo-summaries if needed)
             summaries = []
+            existing_summaries = self._get_summaries_by_conversation(conversations)
             for conv in conversations:
-                existing_summary = self.db.query(ConversationSummary).filter(
-                    ConversationSummary.conversation_id == conv.id
-                ).first()
+                existing_summary = existing_summaries.get(conv.id)
 
                 if existing_summary:
                     summaries.append(existing_summary)
@@ -332,10 +336,9 @@ class SearchManager:
 
             # Convert to summaries
             summaries = []
+            existing_summaries = self._get_summaries_by_conversation(matching_conversations)
             for conv in matching_conversations:
-                existing_summary = self.db.query(ConversationSummary).filter(
-                    ConversationSummary.conversation_id == conv.id
-                ).first()
+                existing_summary = existing_summaries.get(conv.id)
 
                 if existing_summary:
                     summaries.append(existing_summary)
@@ -358,6 +361,20 @@ class SearchManager:
             logger.error(f"Content search failed: {e}")
             return []
 
+    def _get_summaries_by_conversation(self, conversations: List) -> Dict[int, Any]:
+        """Load the summaries of several conversations in one query, with their conversation attached"""
+        from models import ConversationSummary
+
+        if not conversations:
+            return {}
+        conversations_by_id = {conv.id: conv for conv in conversations}
+        summaries = self.db.query(ConversationSummary).filter(
+            ConversationSummary.conversation_id.in_(list(conversations_by_id))
+        ).all()
+        for summary in summaries:
+            set_committed_value(summary, "conversation", conversations_by_id[summary.conversation_id])
+        return {summary.conversation_id: summary for summary in summaries}
+
     def _prepare_fts_query(self, query: str) -> str:
         """Prepare query for FTS search"""
         # Remove special characters and normalize
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test keyset paging over the tool usage manager's stored traces
+"""
+import os
+import sys
+
+# Add the current directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tool_usage_manager import ToolUsageManager
+
+
+def _store_traces(manager: ToolUsageManager, count: int):
+    """Finalize count traces; trace i is in conversation 1 or 2 and belongs to user 1 or 3"""
+    trace_ids = []
+    for i in range(count):
+        trace_id = manager.create_trace(conversation_id=2 if i % 3 == 0 else 1, user_id=1 if i % 2 else 3)
+        manager.finalize_trace(trace_id)
+        trace_ids.append(trace_id)
+    return trace_ids
+
+
+def _walk(get_page):
+    """Follow cursors from the first page to the last, returning every page"""
+    pages, cursor = [], None
+    while True:
+        traces, cursor = get_page(cursor)
+        pages.append(traces)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_walk_visits_every_trace_newest_first():
+    manager = ToolUsageManager()
+    trace_ids = _store_traces(manager, 7)
+
+    pages = _walk(lambda cursor: manager.get_user_trace_page(1, limit=2, before=cursor))
+
+    assert [[trace_ids.index(t.trace_id) for t in page] for page in pages] == [[5, 3], [1]]
+
+
+def test_full_last_page_returns_no_cursor():
+    manager = ToolUsageManager()
+    _store_traces(manager, 4)
+
+    traces, cursor = manager.get_user_trace_page(1, limit=2)
+
+    assert len(traces) == 2
+    assert cursor is None
+
+
+def test_conversation_page_filters_by_user():
+    manager = ToolUsageManager()
+    trace_ids = _store_traces(manager, 10)
+
+    pages = _walk(lambda cursor: manager.get_conversation_trace_page(1, limit=2, user_id=3, before=cursor))
+
+    assert [[trace_ids.index(t.trace_id) for t in page] for page in pages] == [[8, 4], [2]]
+
+
+def test_evicted_traces_drop_out_and_stale_cursor_ends_paging():
+    manager = ToolUsageManager()
+    manager.max_traces = 8
+    trace_ids = _store_traces(manager, 10)
+
+    traces = [t for page in _walk(lambda cursor: manager.get_user_trace_page(1, limit=2, before=cursor)) for t in page]
+
+    assert [trace_ids.index(t.trace_id) for t in traces] == [9, 7, 5, 3]
+    # Sequence 1 belonged to the first, now evicted, trace; nothing older is left
+    assert manager.get_user_trace_page(1, limit=2, before=1) == ([], None)
+
+
+def test_non_positive_limit_returns_empty_page():
+    manager = ToolUsageManager()
+    _store_traces(manager, 3)
+
+    assert manager.get_conversation_trace_page(1, limit=0, user_id=1) == ([], None)
+    assert manager.get_user_trace_page(1, limit=-1) == ([], None)
+
+
+if __name__ == "__main__":
+    test_cursor_walk_visits_every_trace_newest_first()
+    test_full_last_page_returns_no_cursor()
+    test_conversation_page_filters_by_user()
+    test_evicted_traces_drop_out_and_stale_cursor_ends_paging()
+    test_non_positive_limit_returns_empty_page()
+    print("✓ Tool trace paging tests passed")
@@ -5,9 +5,11 @@ import json
 import time
 import uuid
 import logging
-from typing import Dict, List, Any, Optional, AsyncGenerator
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, AsyncGenerator, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
 
 from models import Message, Conversation, User, UserMemory
@@ -19,11 +21,23 @@ logger = logging.getLogger(__name__)
 class ToolUsageManager:
     """Manages tool usage tracing and analytics for debugging RAG pipeline"""
     
-    def __init__(self, db: Session):
-        self.db = db
-        self.active_traces: Dict[str, ToolUsageTrace] = {}
-        self.trace_storage: Dict[str, ToolUsageTrace] = {}  # In-memory storage
+    def __init__(self):
+        # Traces of requests still in flight, oldest first; bounded so a trace that is
+        # never finalized can't keep memory forever
+        self.active_traces: "OrderedDict[str, ToolUsageTrace]" = OrderedDict()
+        self.max_active_traces = 100
+        self.trace_storage: Dict[str, ToolUsageTrace] = {}  # In-memory storage, oldest first
         self.max_traces = 1000  # Maximum traces to keep in memory
+        # Stored trace ids per conversation and per user, oldest first
+        self.conversation_trace_ids: Dict[int, List[str]] = {}
+        self.user_trace_ids: Dict[int, List[str]] = {}
+        # Storage order of each stored trace; increasing along every index, so it
+        # doubles as a keyset cursor for paging through them
+        self.trace_sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+        # The manager is shared by all requests; guards the dicts and indexes above
+        # so callers on worker threads don't see them mid-update
+        self._lock = threading.Lock()
     
     def create_trace(self, conversation_id: int, user_id: int, message_id: Optional[int] = None) -> str:
         """Create a new tool usage trace"""
@@ -35,7 +49,17 @@ class ToolUsageManager:
             message_id=message_id,
             start_time=datetime.now()
         )
-        self.active_traces[trace_id] = trace
+        with self._lock:
+            self.active_traces[trace_id] = trace
+            evicted = None
+            if len(self.active_traces) > self.max_active_traces:
+                evicted_id, evicted = self.active_traces.popitem(last=False)
+        
+        if evicted is not None:
+            logger.warning(
+                f"Evicted unfinished trace {evicted_id} for conversation {evicted.conversation_id}, "
+                f"more than {self.max_active_traces} traces active"
+            )
         return trace_id
     
     def add_step(
@@ -50,7 +74,8 @@ class ToolUsageManager:
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         """Add a new step to an active trace"""
-        if trace_id not in self.active_traces:
+        trace = self.active_traces.get(trace_id)
+        if trace is None:
             logger.warning(f"Trace {trace_id} not found in active traces")
             return ""
         
@@ -67,7 +92,7 @@ class ToolUsageManager:
             metadata=metadata or {}
         )
         
-        self.active_traces[trace_id].steps.append(step)
+        trace.steps.append(step)
         return step_id
     
     def update_step(
@@ -80,10 +105,10 @@ class ToolUsageManager:
         duration_ms: Optional[int] = None
     ):
         """Update an existing step with results"""
-        if trace_id not in self.active_traces:
+        trace = self.active_traces.get(trace_id)
+        if trace is None:
             return
         
-        trace = self.active_traces[trace_id]
         for step in trace.steps:
             if step.step_id == step_id:
                 step.status = status
@@ -94,10 +119,12 @@ class ToolUsageManager:
     
     def finalize_trace(self, trace_id: str) -> Optional[ToolUsageTrace]:
         """Finalize a trace and move it to storage"""
-        if trace_id not in self.active_traces:
+        # Claim the trace first so concurrent finalize calls only store it once
+        with self._lock:
+            trace = self.active_traces.pop(trace_id, None)
+        if trace is None:
             return None
         
-        trace = self.active_traces[trace_id]
         trace.end_time = datetime.now()
         
         # Calculate summary statistics
@@ -130,52 +157,119 @@ class ToolUsageManager:
             if step.step_type == "retrieval" and "memory" in step.tool_name.lower()
         ]
         
-        # Store trace
-        self.trace_storage[trace_id] = trace
-        
-        # Clean up old traces if necessary
-        if len(self.trace_storage) > self.max_traces:
-            oldest_trace_id = min(self.trace_storage.keys(), 
-                                key=lambda x: self.trace_storage[x].start_time)
-            del self.trace_storage[oldest_trace_id]
-        
-        # Remove from active traces
-        del self.active_traces[trace_id]
+        with self._lock:
+            # Store trace
+            self.trace_storage[trace_id] = trace
+            self._next_sequence += 1
+            self.trace_sequence[trace_id] = self._next_sequence
+            self.conversation_trace_ids.setdefault(trace.conversation_id, []).append(trace_id)
+            self.user_trace_ids.setdefault(trace.user_id, []).append(trace_id)
+            
+            # Clean up old traces if necessary; storage is in insertion order, so the first is the oldest
+            if len(self.trace_storage) > self.max_traces:
+                oldest_trace_id = next(iter(self.trace_storage))
+                oldest_trace = self.trace_storage.pop(oldest_trace_id)
+                del self.trace_sequence[oldest_trace_id]
+                self._remove_from_index(self.conversation_trace_ids, oldest_trace.conversation_id, oldest_trace_id)
+                self._remove_from_index(self.user_trace_ids, oldest_trace.user_id, oldest_trace_id)
         
         return trace
     
+    @staticmethod
+    def _remove_from_index(index: Dict[int, List[str]], key: int, trace_id: str):
+        """Drop a trace id from a per-conversation or per-user index"""
+        trace_ids = index.get(key)
+        if trace_ids:
+            trace_ids.remove(trace_id)
+            if not trace_ids:
+                del index[key]
+    
     def get_trace(self, trace_id: str) -> Optional[ToolUsageTrace]:
         """Get a trace by ID"""
-        if trace_id in self.active_traces:
-            return self.active_traces[trace_id]
-        return self.trace_storage.get(trace_id)
+        with self._lock:
+            return self.active_traces.get(trace_id) or self.trace_storage.get(trace_id)
     
-    def get_conversation_traces(self, conversation_id: int, limit: int = 10) -> List[ToolUsageTrace]:
-        """Get all traces for a conversation"""
+    def _page_traces(
+        self,
+        trace_ids: List[str],
+        limit: int,
+        before: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Tuple[List[ToolUsageTrace], Optional[int]]:
+        """Walk an index newest first from a cursor; caller holds the lock.
+
+        Returns up to limit traces stored before the cursor and the cursor of
+        the next page, or None when this page is the last.
+        """
+        if limit <= 0:
+            return [], None
+        
+        end = len(trace_ids)
+        if before is not None:
+            end = bisect_left(trace_ids, before, key=self.trace_sequence.__getitem__)
+        
         traces = []
-        for trace in self.trace_storage.values():
-            if trace.conversation_id == conversation_id:
+        for position in range(end - 1, -1, -1):
+            if len(traces) >= limit:
+                return traces, self.trace_sequence[traces[-1].trace_id]
+            trace = self.trace_storage[trace_ids[position]]
+            if user_id is None or trace.user_id == user_id:
                 traces.append(trace)
-        
-        # Sort by start time, most recent first
-        traces.sort(key=lambda x: x.start_time, reverse=True)
-        return traces[:limit]
+        return traces, None
+    
+    def get_conversation_trace_page(
+        self,
+        conversation_id: int,
+        limit: int = 10,
+        user_id: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> Tuple[List[ToolUsageTrace], Optional[int]]:
+        """Get a page of a conversation's traces, most recently stored first"""
+        with self._lock:
+            return self._page_traces(
+                self.conversation_trace_ids.get(conversation_id, []), limit, before, user_id
+            )
+    
+    def get_user_trace_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[int] = None
+    ) -> Tuple[List[ToolUsageTrace], Optional[int]]:
+        """Get a page of a user's traces, most recently stored first"""
+        with self._lock:
+            return self._page_traces(self.user_trace_ids.get(user_id, []), limit, before)
+    
+    def get_conversation_traces(
+        self,
+        conversation_id: int,
+        limit: int = 10,
+        user_id: Optional[int] = None
+    ) -> List[ToolUsageTrace]:
+        """Get all traces for a conversation, optionally only those recorded for user_id"""
+        return self.get_conversation_trace_page(conversation_id, limit, user_id)[0]
     
     def get_user_traces(self, user_id: int, limit: int = 20) -> List[ToolUsageTrace]:
         """Get all traces for a user"""
-        traces = []
-        for trace in self.trace_storage.values():
-            if trace.user_id == user_id:
-                traces.append(trace)
-        
-        # Sort by start time, most recent first
-        traces.sort(key=lambda x: x.start_time, reverse=True)
-        return traces[:limit]
+        return self.get_user_trace_page(user_id, limit)[0]
     
     def get_analytics(self, conversation_id: int) -> ToolUsageAnalytics:
         """Generate analytics for a conversation"""
-        traces = self.get_conversation_traces(conversation_id, limit=100)
-        
+        return self._build_analytics(conversation_id, self.get_conversation_traces(conversation_id, limit=100))
+    
+    def get_analytics_for_owner(self, conversation_id: int, user_id: int) -> Optional[ToolUsageAnalytics]:
+        """Generate analytics from the owner's traces, or None if there are none.
+
+        Traces are only recorded once the conversation's ownership has been
+        checked, so a trace for (conversation_id, user_id) proves ownership.
+        """
+        traces = self.get_conversation_traces(conversation_id, limit=100, user_id=user_id)
+        if not traces:
+            return None
+        return self._build_analytics(conversation_id, traces)
+    
+    def _build_analytics(self, conversation_id: int, traces: List[ToolUsageTrace]) -> ToolUsageAnalytics:
+        """Build analytics from a conversation's traces"""
         if not traces:
             return ToolUsageAnalytics(
                 conversation_id=conversation_id,
@@ -418,11 +512,15 @@ class ToolUsageManager:
     
     def get_system_debug_info(self) -> Dict[str, Any]:
         """Get comprehensive system debug information"""
+        with self._lock:
+            active_traces = list(self.active_traces.values())
+            stored_traces = list(self.trace_storage.values())
+        active_ids = {trace.trace_id for trace in active_traces}
         return {
-            "active_traces": len(self.active_traces),
-            "stored_traces": len(self.trace_storage),
+            "active_traces": len(active_traces),
+            "stored_traces": len(stored_traces),
             "total_memory_usage": sum(
-                len(trace.steps) for trace in self.trace_storage.values()
+                len(trace.steps) for trace in stored_traces
             ),
             "recent_activity": [
                 {
@@ -430,12 +528,16 @@ class ToolUsageManager:
                     "conversation_id": trace.conversation_id,
                     "start_time": trace.start_time.isoformat(),
                     "steps": len(trace.steps),
-                    "status": "active" if trace.trace_id in self.active_traces else "completed"
+                    "status": "active" if trace.trace_id in active_ids else "completed"
                 }
                 for trace in sorted(
-                    list(self.trace_storage.values()) + list(self.active_traces.values()),
+                    stored_traces + active_traces,
                     key=lambda x: x.start_time,
                     reverse=True
                 )[:10]
             ]
         }
+
+
+# Global tool usage manager instance shared by all routers
+tool_usage_manager = ToolUsageManager()